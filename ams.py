@@ -2,23 +2,22 @@
 # NOTE: Helper functions & DB logic are preserved
 
 import streamlit as st
-import base64
 import time
-import hmac
-import hashlib
 import urllib.parse
-import requests
 import pandas as pd
 import io
-from supabase import create_client, Client
-import datetime  # Module
-from datetime import datetime as dt, timedelta, time as dt_time, date  # Class dengan alias
-import time as time_module  # ✅ Import time module dengan alias
-import pytz
+import os
+import shutil
+import tempfile
+import importlib.util
+import uuid
+import zipfile
+from supabase import Client
+from datetime import datetime as dt, timedelta  # Class dengan alias
 
+from myams import archive, categories, commission, compare, db, dedup, explore, export, fetcher, instrument, jobs, periods, pipeline, progress, resources, result_cache, rollup, shopee, sync_store, tokens
 
-WIB = pytz.timezone('Asia/Jakarta')
-UTC = pytz.UTC
+WIB = periods.WIB
 
 # ===============================
 # PAGE CONFIG
@@ -30,7 +29,51 @@ st.set_page_config(page_title="myAMS - Shopee Affiliate AMS", layout="wide")
 # ===============================
 SUPABASE_URL = st.secrets["SUPABASE_URL"]
 SUPABASE_KEY = st.secrets["SUPABASE_KEY"]
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
+
+@st.cache_resource
+def get_supabase_client():
+    # Satu client untuk semua rerun & user (bukan dibuat ulang tiap interaksi)
+    return resources.get_supabase(SUPABASE_URL, SUPABASE_KEY)
+
+supabase: Client = get_supabase_client()
+
+@st.cache_resource
+def get_report_archive():
+    # REPORT_ARCHIVE = "supabase" (tabel + storage bucket, default) atau "local"
+    if st.secrets.get("REPORT_ARCHIVE", "supabase") == "local":
+        return archive.LocalReportArchive(st.secrets.get("REPORT_ARCHIVE_PATH", archive.DEFAULT_LOCAL_DIR))
+    return archive.SupabaseReportArchive(get_supabase_client(), st.secrets.get("REPORT_BUCKET", archive.DEFAULT_BUCKET))
+
+@st.cache_resource
+def get_sync_store():
+    # SYNC_STORE = "supabase" atau "local" (SQLite, default)
+    if st.secrets.get("SYNC_STORE", "local") == "supabase":
+        return sync_store.SupabaseSyncStore(get_supabase_client())
+    return sync_store.LocalSyncStore(st.secrets.get("SYNC_STORE_PATH", sync_store.DEFAULT_LOCAL_PATH))
+
+@st.cache_resource
+def get_rollup_store():
+    # ROLLUP_STORE = "supabase" atau "local" (SQLite, default)
+    if st.secrets.get("ROLLUP_STORE", "local") == "supabase":
+        return rollup.SupabaseRollupStore(get_supabase_client())
+    return rollup.LocalRollupStore(st.secrets.get("ROLLUP_STORE_PATH", rollup.DEFAULT_LOCAL_PATH))
+
+@st.cache_resource
+def get_token_cache():
+    # Token per toko di memori, di-refresh otomatis sebelum 4 jam habis
+    client = get_supabase_client()
+    return tokens.TokenCache(
+        load_token=lambda name: db.get_shop_token(client, name),
+        save_token=lambda name, shop_id, access, refresh: db.save_token(client, name, shop_id, access, refresh),
+    )
+
+@st.cache_resource
+def get_job_runner():
+    # Satu pool job untuk semua sesi: tarikan jalan terus walau rerun / tab ditutup
+    return jobs.JobRunner(
+        max_workers=int(st.secrets.get("JOB_WORKERS", jobs.DEFAULT_WORKERS)),
+        max_bytes=int(st.secrets.get("JOB_RESULT_MB", jobs.DEFAULT_MAX_BYTES // (1024 * 1024))) * 1024 * 1024,
+    )
 
 # ===============================
 # SHOPEE CONFIG (AFFILIATE APP)
@@ -38,7 +81,12 @@ supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
 PARTNER_ID = st.secrets.get("PARTNER_ID", "")
 PARTNER_KEY = st.secrets.get("PARTNER_KEY", "")
 REDIRECT_URL = st.secrets.get("REDIRECT_URL", "")
-BASE_URL = "https://partner.shopeemobile.com"
+PENGELUARAN_MULTIPLIER = float(st.secrets.get("PENGELUARAN_MULTIPLIER", commission.PENGELUARAN_MULTIPLIER))
+JOB_REFRESH_SECONDS = 1
+CATEGORY_RELOAD_SECONDS = 3600
+RESULT_CACHE_MB = int(st.secrets.get("RESULT_CACHE_MB", result_cache.DEFAULT_MAX_BYTES // (1024 * 1024)))
+shopee.configure(PARTNER_ID, PARTNER_KEY)
+BASE_URL = shopee.BASE_URL
 
 # ===============================
 # OAUTH PARAMS (AUTO-FILL SUPPORT)
@@ -61,63 +109,112 @@ if oauth_shop_id:
     st.session_state.oauth_shop_id = oauth_shop_id
 
 # ===============================
-# SIGNATURE HELPERS
-# ===============================
-def generate_sign_basic(path, timestamp):
-    base = f"{PARTNER_ID}{path}{timestamp}"
-    return hmac.new(PARTNER_KEY.encode(), base.encode(), hashlib.sha256).hexdigest()
-
-def generate_sign_full(path, timestamp, access_token, shop_id):
-    base = f"{PARTNER_ID}{path}{timestamp}{access_token}{shop_id}"
-    return hmac.new(PARTNER_KEY.encode(), base.encode(), hashlib.sha256).hexdigest()
-
-# ===============================
-# DB HELPERS (UNCHANGED)
+# DB HELPERS
 # ===============================
 def save_token_to_db(shop_name, shop_id, access_token, refresh_token):
-    supabase.table("shopee_tokens").upsert({
-        "shop_name": shop_name,
-        "shop_id": int(shop_id),
-        "access_token": access_token,
-        "refresh_token": refresh_token,
-        "updated_at": "now()"
-    }).execute()
+    db.save_token(supabase, shop_name, shop_id, access_token, refresh_token)
+    get_token_cache().invalidate(shop_name)
+    get_all_shops.clear()
 
+@st.cache_data(ttl=300, show_spinner=False)
 def get_all_shops():
-    res = supabase.table("shopee_tokens").select("shop_name").execute()
-    return [r["shop_name"] for r in res.data] if res.data else []
+    return db.list_shops(supabase)
 
 def get_shop_token(shop_name):
-    res = supabase.table("shopee_tokens").select("*").eq("shop_name", shop_name).execute()
-    return res.data[0] if res.data else None
+    # access_token berupa sumber token (refresh otomatis), bukan string
+    return get_token_cache().token(shop_name)
 
-def save_report_to_db(shop_name, date_range, excel_bytes):
-    supabase.table("shopee_reports").insert({
-        "shop_name": shop_name,
-        "date_range": date_range,
-        "csv_content": base64.b64encode(excel_bytes).decode(),
-        "created_at": "now()"
-    }).execute()
+def save_report_to_db(shop_name, start_date, end_date, df, order_count, excel_bytes):
+    """Arsipkan laporan (metadata + xlsx), return (metadata, baru_disimpan)"""
+    meta = archive.build_metadata(shop_name, start_date, end_date, df, order_count, excel_bytes, fmt="xlsx")
+    return get_report_archive().save_report(meta, excel_bytes)
 
-def get_report_history(shop_name):
-    res = supabase.table("shopee_reports").select("*").eq("shop_name", shop_name).order("created_at", desc=True).limit(10).execute()
-    return res.data
+def get_result_cache():
+    # Hasil tarikan per sesi, key (toko, start, end); rerun tidak menarik ulang dari API
+    if "ams_results" not in st.session_state:
+        st.session_state.ams_results = result_cache.ResultCache(max_bytes=RESULT_CACHE_MB * 1024 * 1024)
+    return st.session_state.ams_results
 
-def format_to_wib(time_str):
-    """Konversi string timestamp ke format WIB"""
-    if not time_str:
-        return ""
+@st.cache_resource(ttl=CATEGORY_RELOAD_SECONDS, show_spinner=False)
+def get_category_tree():
+    # Pohon kategori satu untuk semua toko: cache disk → API get_category (token toko mana pun
+    # yang masih valid, dicoba berurutan) → snapshot; dipakai semua flatten.
+    # TTL pendek: kalau API gagal, dicoba lagi nanti; selama cache disk segar tidak ada request.
+    fetch = lambda: categories.fetch_tree_any([lambda s=s: get_shop_token(s) for s in get_all_shops()])
+    tree = categories.load_tree(
+        cache_path=st.secrets.get("CATEGORY_CACHE_PATH", categories.DEFAULT_CACHE_PATH),
+        snapshot_path=st.secrets.get("CATEGORY_SNAPSHOT"), fetch=fetch,
+    )
+    categories.configure(tree)
+    return tree
+
+def get_streamed_results():
+    # Hasil mode streaming per sesi: hanya ringkasan + path file di folder temp
+    if "ams_streamed" not in st.session_state:
+        st.session_state.ams_streamed = {}
+    return st.session_state.ams_streamed
+
+def discard_streamed(key):
+    summary = get_streamed_results().pop(key, None)
+    # File hasil job background bisa dipakai sesi lain, dibiarkan di folder temp
+    if summary and summary["files"] and not summary.get("job_id"):
+        shutil.rmtree(os.path.dirname(summary["files"][0]), ignore_errors=True)
+
+def stream_formats():
+    # Parquet hanya kalau pyarrow terpasang
+    return [fmt for fmt in pipeline.STREAM_WRITERS if fmt != "parquet" or importlib.util.find_spec("pyarrow")]
+
+def job_subscriber():
+    # ID sesi ini sebagai pelanggan hasil job di runner bersama
+    return st.session_state.setdefault("ams_job_subscriber", uuid.uuid4().hex)
+
+def remember_job(job):
+    # Key job milik sesi ini (untuk panel antrean); hasilnya dipegang runner sampai sesi ini mengambilnya
+    keys = st.session_state.setdefault("ams_job_keys", [])
+    if job.key not in keys:
+        keys.append(job.key)
+    get_job_runner().subscribe(job, job_subscriber())
+
+def forget_job(job):
+    st.session_state["ams_job_keys"].remove(job.key)
+    get_job_runner().unsubscribe(job, job_subscriber())
+
+def comparison_rows(shop_name, shop_id, start_date, end_date):
+    # Sumber termurah dulu: laporan yang sudah dimuat (cache sesi / job selesai), baru rollup store
+    results = get_result_cache()
+    for key in results.keys():
+        if key[0] == shop_name and key[1] <= str(start_date) and key[2] >= str(end_date):
+            entry = results.get(key)
+            rows = entry.derive("rollup", lambda: rollup.aggregate(entry.df))
+            return compare.period_rows(None, start_date, end_date, rows=rows), "laporan dimuat"
+    job = get_job_runner().get((shop_name, str(start_date), str(end_date)))
+    if job is not None and job.status == jobs.DONE and job.meta.get("mode") == "pull":
+        if "rollup" not in job.meta and job.result is not None:
+            job.meta["rollup"] = rollup.aggregate(job.result["df"])
+        if "rollup" in job.meta:
+            return job.meta["rollup"], "tarikan background"
+    return load_rollup(shop_id, start_date, end_date), "rollup"
+
+@st.cache_data(ttl=300, show_spinner=False)
+def load_rollup(shop_id, start_date, end_date):
+    return get_rollup_store().load(shop_id, start_date, end_date)
+
+def update_rollup(shop_name, shop_id, df, start_date, end_date, errors, rows=None):
+    # Rollup harian ikut diperbarui setiap tarikan; gagal rollup tidak menggagalkan laporan
     try:
-        # Parse string timestamp (biasanya dari API dalam format tertentu)
-        # Jika API mengembalikan UTC timestamp dalam string
-        if isinstance(time_str, (int, float)):
-            dt_utc = dt.fromtimestamp(time_str, UTC)  # ✅ Gunakan alias dt
-            dt_wib = dt_utc.astimezone(WIB)
-            return dt_wib.strftime('%Y-%m-%d %H:%M:%S')
-        return str(time_str)
-    except:
-        return str(time_str)
-    
+        rollup.update_rollup(get_rollup_store(), shop_id, df, start_date, end_date, errors, rows=rows)
+        load_rollup.clear()
+    except Exception as e:
+        st.warning(f"⚠️ Rollup harian {shop_name} gagal diperbarui: {e}")
+
+def get_report_history(shop_name):
+    # Metadata saja, payload diunduh saat diminta
+    return get_report_archive().list_reports(shop_name, limit=10)
+
+def get_legacy_report_history(shop_name):
+    # Laporan lama di tabel shopee_reports (sebelum arsip baru), hanya dibaca
+    return archive.list_legacy_reports(supabase, shop_name, limit=10)
+
 # ===============================
 # UI
 # ===============================
@@ -142,7 +239,7 @@ with tab1:
     if st.button("🔐 Generate Authorization URL"):
         path = "/api/v2/shop/auth_partner"
         ts = int(time.time())
-        sign = generate_sign_basic(path, ts)
+        sign = shopee.generate_sign_basic(path, ts)
 
         params = {
             "partner_id": PARTNER_ID,
@@ -174,16 +271,11 @@ with tab2:
             if not code or not shop_id:
                 st.error("Code dan Shop ID harus diisi!")
             else:
-                path = "/api/v2/auth/token/get"
-                ts = int(time.time())
-                sign = generate_sign_basic(path, ts)
-
                 try:
-                    res = requests.post(
-                        BASE_URL + path,
-                        params={"partner_id": PARTNER_ID, "timestamp": ts, "sign": sign},
+                    res = shopee.call(
+                        "POST", "/api/v2/auth/token/get",
                         json={"code": code, "shop_id": int(shop_id), "partner_id": int(PARTNER_ID)}
-                    ).json()
+                    )
 
                     st.json(res)
 
@@ -195,6 +287,9 @@ with tab2:
                         st.session_state.oauth_shop_id = ""
                     else:
                         st.error(f"Gagal mendapatkan token: {res.get('message', 'Unknown error')}")
+                except shopee.ShopeeAPIError as e:
+                    st.json(e.response)
+                    st.error(f"Gagal mendapatkan token: {e.message}")
                 except Exception as e:
                     st.error(f"Error: {str(e)}")
     
@@ -214,8 +309,15 @@ with tab6:
     if not shops:
         st.warning("Belum ada toko. Silakan authorize dan tukar token di Tab 1 & 2.")
         st.stop()
+    category_tree = get_category_tree()
     
-    selected_shop = st.selectbox("🏪 Pilih Toko", shops)
+    fetch_mode = st.radio("Mode", ["🏪 Satu Toko", "🏬 Multi Toko"], horizontal=True)
+    multi_shop = fetch_mode == "🏬 Multi Toko"
+    if multi_shop:
+        selected_shops = st.multiselect("🏬 Pilih Toko", shops, default=shops)
+        selected_shop = selected_shops[0] if selected_shops else shops[0]
+    else:
+        selected_shop = st.selectbox("🏪 Pilih Toko", shops)
     
     # =====================================================
     # DATE RANGE SELECTOR (FLEXIBLE + TIMEZONE INDONESIA)
@@ -226,35 +328,14 @@ with tab6:
     
     with date_col1:
         # Preset cepat
-        preset = st.selectbox(
-            "Preset Cepat",
-            ["Custom Range", "Hari Ini", "Kemarin", "7 Hari Terakhir", "30 Hari Terakhir", "Bulan Ini", "Bulan Lalu"],
-            index=3
-        )
+        preset = st.selectbox("Preset Cepat", periods.PRESETS, index=3)
     
     # Default values - Gunakan timezone Indonesia (WIB/UTC+7)
-    now_id = dt.now(WIB)  # Gunakan WIB yang sudah didefinisikan di global
-    today = now_id.date()
+    today = periods.today_wib()
     
-    if preset == "Hari Ini":
-        start_date = today
-        end_date = today
-    elif preset == "Kemarin":
-        start_date = today - timedelta(days=1)
-        end_date = today - timedelta(days=1)
-    elif preset == "7 Hari Terakhir":
-        start_date = today - timedelta(days=7)
-        end_date = today
-    elif preset == "30 Hari Terakhir":
-        start_date = today - timedelta(days=30)
-        end_date = today
-    elif preset == "Bulan Ini":
-        start_date = today.replace(day=1)
-        end_date = today
-    elif preset == "Bulan Lalu":
-        first_day_this_month = today.replace(day=1)
-        end_date = first_day_this_month - timedelta(days=1)
-        start_date = end_date.replace(day=1)
+    preset_range = periods.resolve_preset(preset, today)
+    if preset_range:
+        start_date, end_date = preset_range
     else:  # Custom Range
         with date_col2:
             start_date = st.date_input("Dari Tanggal", today - timedelta(days=7))
@@ -274,356 +355,673 @@ with tab6:
     delta_days = (end_date - start_date).days + 1
     st.info(f"📆 Periode: **{start_date.strftime('%d %b %Y')}** s/d **{end_date.strftime('%d %b %Y')}** ({delta_days} hari) | 🕐 Waktu Indonesia (WIB)")
     
-    # Validate range (Shopee biasanya limit 30-90 hari)
+    # Pengaturan fetch: periode dipecah per window & ditarik paralel
+    with st.expander("⚙️ Pengaturan Fetch"):
+        fetch_col1, fetch_col2 = st.columns(2)
+        with fetch_col1:
+            window_label = st.selectbox("Ukuran Window", ["Mingguan (7 hari)", "Harian (1 hari)"])
+        with fetch_col2:
+            max_workers = st.slider(
+                "Request Paralel (total semua toko)" if multi_shop else "Request Paralel", 1, 8,
+                fetcher.DEFAULT_MAX_WORKERS
+            )
+        pengeluaran_multiplier = st.number_input(
+            "Faktor Pengeluaran (komisi affiliate × pajak)", min_value=1.0, max_value=2.0,
+            value=PENGELUARAN_MULTIPLIER, step=0.01, format="%.2f"
+        )
+        incremental = st.checkbox(
+            "♻️ Sinkronisasi inkremental (hari yang sudah tutup diambil dari data tersimpan)", value=True
+        )
+        background = st.checkbox(
+            "🧵 Jalankan di background (tetap jalan saat halaman di-rerun / ditutup)", value=True, disabled=multi_shop
+        )
+        stream_mode = st.checkbox(
+            "🌊 Mode hemat memori (ditulis per chunk ke file, tanpa explorer & sinkronisasi inkremental)",
+            value=False, disabled=multi_shop,
+            help="Duplikat order digabung dengan status terakhir per window; order yang muncul lagi di window "
+                 "lain setelah ditulis memakai status salinan pertama."
+        )
+        instr_col1, instr_col2 = st.columns(2)
+        with instr_col1:
+            instrumented = st.checkbox("⏱️ Catat waktu per tahap", value=False)
+        with instr_col2:
+            capture_profile = st.checkbox("🔬 Snapshot cProfile", value=False, disabled=not instrumented)
+        st.caption(f"🗂️ Pohon kategori: {len(category_tree):,} kategori · versi {category_tree.version} "
+                   f"· sumber {category_tree.source}")
+    window_days = 1 if window_label.startswith("Harian") else 7
+
+    # Rentang panjang (Shopee biasanya limit 30-90 hari) otomatis dipecah per window
     if delta_days > 90:
-        st.warning("⚠️ Rentang waktu > 90 hari mungkin akan error dari API Shopee. Pertimbangkan untuk memecah periode.")
-
-    # TAMBAHKAN DI AWAL TAB 6 (sebelum while loop) - Dictionary mapping
-    STATUS_MAPPING = {
-        "Completed": "Selesai",
-        "Cancelled": "Dibatalkan", 
-        "To Confirm": "Belum Dibayar",
-        "To Ship": "Sedang Diproses",
-        "Shipping": "Dikirim",
-        "To Receive": "Dikirim",
-        "Unpaid": "Belum Dibayar"
-    }
+        st.info(f"ℹ️ Rentang waktu > 90 hari akan otomatis dipecah per {window_days} hari.")
+
+    # =====================================================
+    # MULTI TOKO (SCHEDULER BERSAMA, ADIL PER TOKO)
+    # =====================================================
+    if multi_shop:
+        output_mode = st.radio("Output", ["Gabungan (kolom Toko)", "Per Toko (ZIP)"], horizontal=True)
+        
+        if st.button("🚀 Tarik Data Semua Toko", type="primary"):
+            if not selected_shops:
+                st.warning("Pilih minimal satu toko.")
+                st.stop()
+            
+            shop_tokens = [t for t in (get_shop_token(name) for name in selected_shops) if t]
+            missing = [name for name in selected_shops if name not in {t["shop_name"] for t in shop_tokens}]
+            if missing:
+                st.warning(f"⚠️ Token tidak ditemukan untuk: {', '.join(missing)}")
+            
+            progress_bar = st.progress(0)
+            status_text = st.empty()
+            shop_progress = st.empty()
+            
+            def show_multi_progress(stats):
+                progress_bar.progress(min(stats["fraction"], 0.95))
+                status_text.text(
+                    f"🏬 {len(shop_tokens)} toko | Window {stats['windows_done']}/{stats['windows_total']} "
+                    f"| Page {stats['pages']} (+{stats['pages_in_flight']} jalan) | Orders: {stats['orders']} "
+                    f"| Items: {stats['items']} ({stats['items_per_sec']:.0f}/s) | Retry: {stats['retries']} "
+                    f"| Duplikat: {stats['duplicates']} | Tarik ulang: {stats['refetched']} "
+                    f"| ETA {progress.format_eta(stats['eta'])}"
+                )
+                shop_progress.dataframe(
+                    pd.DataFrame.from_dict(stats["shops"], orient="index")[
+                        ["windows_done", "windows_total", "pages_in_flight", "orders", "items", "items_per_sec",
+                         "retries", "duplicates", "refetched"]
+                    ],
+                    use_container_width=True
+                )
+            
+            with st.spinner("Mengambil data semua toko dari Shopee API..."):
+                pulled = pipeline.pull_many(
+                    shop_tokens, start_date, end_date,
+                    store=get_sync_store() if incremental else None,
+                    window_days=window_days, max_workers=max_workers,
+                    on_progress=show_multi_progress
+                )
+            
+            progress_bar.empty()
+            status_text.empty()
+            shop_progress.empty()
+            
+            for name, (_, errors) in pulled.items():
+                for err in errors:
+                    st.error(f"❌ {name}: window {dt.fromtimestamp(err.window[0], WIB):%d %b %Y} gagal ({err})")
+            
+            shop_ids = {t["shop_name"]: t["shop_id"] for t in shop_tokens}
+            file_prefix = f"AMS_{len(pulled)}toko_{start_date}_{end_date}"
+            if output_mode.startswith("Gabungan"):
+                df_all = pipeline.build_combined_report(
+                    {name: orders for name, (orders, _) in pulled.items()}, pengeluaran_multiplier
+                )
+                st.success(f"✅ Berhasil! {len(df_all)} item dari {len(pulled)} toko")
+                for name, (_, errors) in pulled.items():
+                    update_rollup(name, shop_ids[name], df_all[df_all[pipeline.SHOP_COLUMN] == name],
+                                  start_date, end_date, errors)
+                
+                shop_summary = df_all.groupby(pipeline.SHOP_COLUMN, observed=True).agg(**{
+                    "Orders": ("Kode Pesanan", "nunique"),
+                    "Items": ("Kode Pesanan", "size"),
+                    "Nilai Pembelian(Rp)": ("Nilai Pembelian(Rp)", "sum"),
+                    "Pengeluaran(Rp)": ("Pengeluaran(Rp)", "sum"),
+                    "Komisi Affiliate(Rp)": ("Estimasi Komisi Affiliate per Produk(Rp)", "sum"),
+                })
+                st.dataframe(shop_summary, use_container_width=True)
+                st.dataframe(df_all, use_container_width=True, height=500)
+                
+                excel_buffer = io.BytesIO()
+                export.write_excel(df_all, excel_buffer, sheet_name='AMS Conversion')
+                st.download_button(
+                    label="📥 Download Excel Gabungan",
+                    data=excel_buffer.getvalue(),
+                    file_name=f"{file_prefix}.xlsx",
+                    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+                )
+            else:
+                # xlsx sudah terkompresi, ZIP cukup menyimpan (tanpa deflate ulang)
+                zip_buffer = io.BytesIO()
+                with zipfile.ZipFile(zip_buffer, "w", zipfile.ZIP_STORED) as zf:
+                    for name, (orders, errors) in pulled.items():
+                        shop_df = pipeline.build_report(orders, pengeluaran_multiplier)
+                        update_rollup(name, shop_ids[name], shop_df, start_date, end_date, errors)
+                        shop_buffer = io.BytesIO()
+                        export.write_excel(shop_df, shop_buffer)
+                        zf.writestr(pipeline.report_filename(name, start_date, end_date, "xlsx"), shop_buffer.getvalue())
+                st.success(f"✅ Berhasil! {sum(len(o) for o, _ in pulled.values())} order dari {len(pulled)} toko")
+                st.download_button(
+                    label="📥 Download ZIP per Toko",
+                    data=zip_buffer.getvalue(),
+                    file_name=f"{file_prefix}.zip",
+                    mime="application/zip"
+                )
+        
+        st.stop()
+
+    # =====================================================
+    # TREN HARIAN (DARI ROLLUP, TANPA TARIK ULANG)
+    # =====================================================
+    with st.expander("📈 Tren Harian (Rollup)"):
+        trend_days = st.selectbox("Rentang", [30, 90, 180, 365], index=1, format_func=lambda d: f"{d} hari terakhir")
+        trend_token = get_shop_token(selected_shop)
+        trend_end = periods.today_wib()
+        trend_rows = (
+            load_rollup(trend_token["shop_id"], trend_end - timedelta(days=trend_days - 1), trend_end)
+            if trend_token else pd.DataFrame(columns=rollup.ROLLUP_COLUMNS)
+        )
+        if trend_rows.empty:
+            st.caption("Belum ada rollup untuk toko ini. Rollup terisi otomatis setiap kali data ditarik.")
+        else:
+            trend = rollup.daily_totals(trend_rows)
+            trend_cols = st.columns(3)
+            trend_cols[0].metric("💰 Purchase", f"Rp {trend['purchase'].sum():,.0f}")
+            trend_cols[1].metric("💸 Pengeluaran", f"Rp {trend['pengeluaran'].sum():,.0f}")
+            trend_cols[2].metric("📦 Item", f"{int(trend['items'].sum()):,}")
+            st.line_chart(trend.set_index("day")[["purchase", "pengeluaran", "commission_affiliate"]])
+            top_col1, top_col2 = st.columns(2)
+            with top_col1:
+                st.markdown("**Top Affiliate**")
+                st.dataframe(rollup.top(trend_rows, "affiliate_name")[["affiliate_name", "items", "purchase", "pengeluaran"]],
+                             use_container_width=True, hide_index=True)
+            with top_col2:
+                st.markdown("**Top Produk**")
+                st.dataframe(rollup.top(trend_rows, "item_name")[["item_name", "items", "purchase", "pengeluaran"]],
+                             use_container_width=True, hide_index=True)
     
-    VERIFIED_STATUS_MAPPING = {
-        "Valid": "Terverifikasi",
-        "Invalid": "Tidak Valid",
-        "Pending": "Belum Diverifikasi",
-        "Processing": "Sedang Diproses"
-    }
+    # =====================================================
+    # BANDINGKAN PERIODE (DATA YANG SUDAH ADA, TANPA TARIK ULANG)
+    # =====================================================
+    with st.expander("⚖️ Bandingkan Periode"):
+        compare_token = get_shop_token(selected_shop)
+        period_choices = {
+            "Periode sebelumnya": periods.previous_period(start_date, end_date),
+            "Periode terpilih": (start_date, end_date),
+            **{p: periods.resolve_preset(p, today) for p in periods.PRESETS if p != "Custom Range"},
+        }
+        chosen = st.multiselect("Periode (yang pertama jadi pembanding)", list(period_choices),
+                                default=["Periode sebelumnya", "Periode terpilih"])
+        if not compare_token:
+            st.caption("Token toko tidak ditemukan.")
+        elif len(chosen) < 2:
+            st.caption("Pilih minimal dua periode.")
+        else:
+            compare_frames, missing_periods = {}, []
+            for name in chosen:
+                period_start, period_end = period_choices[name]
+                period_label = f"{name} ({period_start:%d %b} - {period_end:%d %b %Y})"
+                period_rows, source = comparison_rows(selected_shop, compare_token["shop_id"], period_start, period_end)
+                compare_frames[period_label] = period_rows
+                st.caption(f"{period_label}: {source}, {compare.days_with_data(period_rows)}/"
+                           f"{(period_end - period_start).days + 1} hari berisi data")
+                if not len(period_rows):
+                    missing_periods.append((period_start, period_end))
+            
+            if missing_periods and st.button("🧵 Tarik periode yang belum ada di background"):
+                for period_start, period_end in missing_periods:
+                    remember_job(get_job_runner().submit(
+                        (selected_shop, str(period_start), str(period_end)), pipeline.pull_report,
+                        compare_token, period_start, period_end, store=get_sync_store() if incremental else None,
+                        rollup_store=get_rollup_store(), pengeluaran_multiplier=pengeluaran_multiplier,
+                        window_days=window_days, max_workers=max_workers,
+                        label=f"{selected_shop} · {period_start:%d %b} - {period_end:%d %b %Y}",
+                        meta={"mode": "pull", "multiplier": pengeluaran_multiplier, "profiler": None}
+                    ))
+                st.info("ℹ️ Tarikan dijalankan di background, progresnya ada di panel Tarikan Background di bawah.")
+            
+            base_label, *target_labels = compare_frames
+            compare_col1, compare_col2, compare_col3 = st.columns(3)
+            with compare_col1:
+                compare_by = st.radio("Per", list(compare.DIMENSIONS), horizontal=True,
+                                      format_func={"affiliate": "Affiliate", "product": "Produk", "status": "Status"}.get)
+            with compare_col2:
+                compare_measure = st.selectbox("Nilai", compare.MEASURES, index=compare.MEASURES.index("purchase"),
+                                               format_func=compare.MEASURE_LABELS.get)
+            with compare_col3:
+                target_label = st.selectbox("Dibandingkan", target_labels, index=len(target_labels) - 1)
+            
+            period_totals = compare.totals(compare_frames)
+            metric_cols = st.columns(4)
+            for metric_col, measure in zip(metric_cols, ["purchase", "commission_affiliate", "commission_mcn", "pengeluaran"]):
+                pct = period_totals.at[target_label, f"Δ% {measure}"]
+                metric_col.metric(compare.MEASURE_LABELS[measure], f"Rp {period_totals.at[target_label, measure]:,.0f}",
+                                  delta=f"{pct:+.1f}%" if pct == pct else None)
+            
+            compare_table = compare.compare(compare_frames, compare_by)
+            keys, name_col = compare.DIMENSIONS[compare_by]
+            mover_cols = keys + ([name_col] if name_col else []) + [
+                compare.value_column(compare_measure, base_label), compare.value_column(compare_measure, target_label),
+                compare.delta_column(compare_measure, target_label), compare.pct_column(compare_measure, target_label),
+            ]
+            gainers, losers = compare.top_movers(compare_table, compare_measure, target_label)
+            movers_col1, movers_col2 = st.columns(2)
+            with movers_col1:
+                st.markdown("**📈 Naik Terbesar**")
+                st.dataframe(gainers[mover_cols], use_container_width=True, hide_index=True)
+            with movers_col2:
+                st.markdown("**📉 Turun Terbesar**")
+                st.dataframe(losers[mover_cols], use_container_width=True, hide_index=True)
+            if st.checkbox(f"Tampilkan semua {len(compare_table):,} grup"):
+                st.dataframe(compare_table.head(explore.SUMMARY_LIMIT), use_container_width=True, hide_index=True)
     
-    ORDER_TYPE_MAPPING = {
-        "Direct Order": "Pesanan Langsung",
-        "Indirect Order": "Pesanan Tidak Langsung"
-    }
-
-    CATEGORY_MAPPING = {
-        "100643": "Buku & Majalah",
-        "100777": "Buku Bacaan", 
-        "101564": "Agama & Filsafat"
-        # Tambahkan mapping lainnya sesuai kebutuhan
-    }
-
-    NOTES_MAPPING = {
-        "Completed": "",
-        "To Confirm": "Pesanan ini belum dibayar. Menunggu Pembeli untuk menyelesaikan pembayaran.",
-        "To Ship": "Status produk ini sedang ditinjau. Komisi hanya akan dibayarkan ketika pesanan selesai.",
-        "Shipping": "Pesanan sedang dikirim.",
-        "Cancelled": "Pesanan dibatalkan."
-    }
-
-    CAMPAIGN_TYPE_MAPPING = {
-        "Seller Open Campaign": "Komisi XTRA Produk Penjual",
-        "Open Campaign": "Komisi XTRA",
-        "Live Campaign": "Komisi Live"
-    }
+    # =====================================================
+    # RIWAYAT LAPORAN (METADATA SAJA, PAYLOAD ON DEMAND)
+    # =====================================================
+    with st.expander("🗂️ Riwayat Laporan Tersimpan"):
+        try:
+            history = get_report_history(selected_shop)
+        except Exception as e:
+            history = []
+            st.error(f"Gagal memuat riwayat: {e}")
+        if not history:
+            st.caption("Belum ada laporan tersimpan di arsip untuk toko ini.")
+        for report in history:
+            hist_col1, hist_col2 = st.columns([4, 1])
+            with hist_col1:
+                st.markdown(
+                    f"**{report['date_range']}** · {report['row_count']} item / {report['order_count']} order · "
+                    f"Purchase Rp {report['total_purchase']:,.0f} · Pengeluaran Rp {report['total_pengeluaran']:,.0f} · "
+                    f"{report['stored_bytes'] / 1024:,.0f} KB · {report['created_at']}"
+                )
+            with hist_col2:
+                payload_key = f"archive_payload_{report['content_hash']}"
+                if payload_key in st.session_state:
+                    st.download_button(
+                        label="📥 Download",
+                        data=st.session_state[payload_key],
+                        file_name=f"AMS_{selected_shop}_{report['start_date']}_{report['end_date']}.{report['format']}",
+                        key=f"dl_{payload_key}"
+                    )
+                elif st.button("📂 Muat", key=f"load_{payload_key}"):
+                    st.session_state[payload_key] = get_report_archive().load_payload(report)
+                    st.rerun()
+        
+        try:
+            legacy_history = get_legacy_report_history(selected_shop)
+        except Exception as e:
+            legacy_history = []
+            st.caption(f"Riwayat lama (shopee_reports) tidak bisa dimuat: {e}")
+        if legacy_history:
+            st.markdown("**Riwayat lama** (shopee_reports, hanya baca)")
+        for report in legacy_history:
+            hist_col1, hist_col2 = st.columns([4, 1])
+            with hist_col1:
+                st.markdown(f"**{report['date_range']}** · {report['created_at']}")
+            with hist_col2:
+                payload_key = f"legacy_payload_{report['created_at']}"
+                if st.session_state.get(payload_key):
+                    st.download_button(
+                        label="📥 Download",
+                        data=st.session_state[payload_key],
+                        file_name=f"AMS_{selected_shop}_{report['date_range'].replace(' ', '_')}.xlsx",
+                        key=f"dl_{payload_key}"
+                    )
+                elif st.button("📂 Muat", key=f"load_{payload_key}"):
+                    st.session_state[payload_key] = archive.load_legacy_payload(supabase, report)
+                    st.rerun()
     
     # =====================================================
     # FETCH DATA
     # =====================================================
-    if st.button("🚀 Tarik Data Conversion", type="primary"):
+    result_key = (selected_shop, str(start_date), str(end_date))
+    results = get_result_cache()
+    
+    def show_fetch_errors(fetch_errors):
+        for err in fetch_errors:
+            err_window = f"{dt.fromtimestamp(err.window[0], WIB):%d %b} - {dt.fromtimestamp(err.window[1], WIB):%d %b %Y}"
+            if isinstance(err.cause, shopee.ShopeeAPIError):
+                error_msg = err.cause.message
+                st.error(f"❌ API Error ({err_window}): {error_msg}")
+                if "too late" in error_msg.lower() or "has not been updated" in error_msg.lower():
+                    st.info("💡 Solusi: Data untuk tanggal tersebut belum tersedia. Coba gunakan preset 'Kemarin' atau periode yang sudah lewat.")
+                st.json(err.cause.response)
+            elif isinstance(err.cause, dedup.CountMismatch):
+                st.warning(f"⚠️ Jumlah order tidak cocok ({err_window}): {err.cause}. "
+                           "Tarik ulang periode ini; hari tersebut tidak dimasukkan ke rollup.")
+            else:
+                st.error(f"🌐 Network Error ({err_window}): {str(err.cause)}")
+    
+    streamed = get_streamed_results()
+    runner = get_job_runner()
+    fetch_clicked = st.button("🚀 Tarik Data Conversion", type="primary")
+    
+    def new_profiler(fetch_progress, **meta):
+        # Instrumentasi opt-in: waktu/baris/byte per tahap + latency per page
+        if not instrumented:
+            return None
+        profiler = instrument.Profiler(profile=capture_profile)
+        profiler.attach(fetch_progress)
+        profiler.meta.update(shop=selected_shop, start_date=start_date, end_date=end_date,
+                             window_days=window_days, max_workers=max_workers, **meta)
+        return profiler
+    
+    def adopt_pull(result, meta):
+        # Hasil pull_report (foreground atau job) → cache sesi, siap ditampilkan
+        if result["rollup_error"]:
+            st.warning(f"⚠️ Rollup harian {selected_shop} gagal diperbarui: {result['rollup_error']}")
+        else:
+            load_rollup.clear()
+        discard_streamed(result_key)
+        if not result["orders"]:
+            results.discard(result_key)
+            show_fetch_errors(result["errors"])
+            st.warning("📭 Tidak ada data conversion untuk periode ini.")
+            st.info("💡 Tips: Coba perpanjang rentang tanggal atau cek apakah ada order completed.")
+            return
+        results.put(result_key, result_cache.ResultEntry(result["orders"], result["df"], result["errors"], meta={
+            "multiplier": meta["multiplier"], "profiler": meta["profiler"], "sync_info": result["sync_info"]
+        }))
+    
+    def adopt_stream(summary, meta):
+        summary = dict(summary, multiplier=meta["multiplier"], profiler=meta["profiler"], job_id=meta.get("job_id"))
+        results.discard(result_key)
+        discard_streamed(result_key)
+        streamed[result_key] = summary
+    
+    if fetch_clicked:
         token = get_shop_token(selected_shop)
         if not token:
             st.error("❌ Token tidak ditemukan. Silakan authorize ulang.")
             st.stop()
+    
+    # =====================================================
+    # BACKGROUND: JOB DI POOL BERSAMA, UI TIDAK MENUNGGU
+    # =====================================================
+    if fetch_clicked and background:
+        fetch_progress = progress.FetchProgress()
+        profiler = new_profiler(fetch_progress, incremental=incremental and not stream_mode,
+                                streaming=stream_mode, background=True)
+        job_meta = {"mode": "stream" if stream_mode else "pull", "multiplier": pengeluaran_multiplier,
+                    "profiler": profiler}
+        label = f"{selected_shop} · {start_date:%d %b} - {end_date:%d %b %Y}"
+        if stream_mode:
+            job = runner.submit(
+                result_key, pipeline.run_pull_streaming, token, start_date, end_date,
+                formats=stream_formats(), output_dir=tempfile.mkdtemp(prefix="myams-"),
+                pengeluaran_multiplier=pengeluaran_multiplier, rollup_store=get_rollup_store(),
+                window_days=window_days, max_workers=max_workers,
+                label=label, meta=job_meta, progress=fetch_progress
+            )
+        else:
+            job = runner.submit(
+                result_key, pipeline.pull_report, token, start_date, end_date,
+                store=get_sync_store() if incremental else None, rollup_store=get_rollup_store(),
+                pengeluaran_multiplier=pengeluaran_multiplier, window_days=window_days, max_workers=max_workers,
+                profiler=profiler, label=label, meta=job_meta, progress=fetch_progress
+            )
+        if job.progress is not fetch_progress:
+            st.info("ℹ️ Tarikan untuk toko & periode ini sudah berjalan, progresnya ditampilkan di bawah.")
+        remember_job(job)
+    
+    # =====================================================
+    # MODE STREAMING: PAGE → CHUNK → FILE, ORDER MENTAH TIDAK DITAHAN
+    # =====================================================
+    if fetch_clicked and not background and stream_mode:
+        fetch_progress = progress.FetchProgress()
+        profiler = new_profiler(fetch_progress, streaming=True)
+        progress_bar = st.progress(0)
+        status_text = st.empty()
         
-        shop_id = token["shop_id"]
-        access_token = token["access_token"]
-        
-        # Helper: Convert date to timestamp (UTC untuk API Shopee)
-        def to_ts(d, end=False):
-            # Buat datetime dengan timezone WIB (Asia/Jakarta)
-            if end:
-                dt_obj = dt.combine(d, dt_time(23, 59, 59))  # ✅ Gunakan dt_time
-            else:
-                dt_obj = dt.combine(d, dt_time(0, 0, 0))     # ✅ Gunakan dt_time
-            
-            # Localize ke WIB kemudian convert ke UTC
-            dt_wib = WIB.localize(dt_obj)
-            dt_utc = dt_wib.astimezone(UTC)
-            return int(dt_utc.timestamp())
+        def show_chunk(summary):
+            stats = fetch_progress.snapshot()
+            progress_bar.progress(min(stats["fraction"], 0.95))
+            status_text.text(
+                f"🪟 Window {stats['windows_done']}/{stats['windows_total']} | Chunk {summary['chunks']} "
+                f"| Orders: {summary['orders']} | Items: {summary['items']} | ETA {progress.format_eta(stats['eta'])}"
+            )
         
-        start_ts = to_ts(start_date)
-        end_ts = to_ts(end_date, end=True)
+        output_dir = tempfile.mkdtemp(prefix="myams-")
+        with st.spinner("Mengambil & menulis data per chunk..."), instrument.stage(profiler, "stream") as stream_stage:
+            summary = pipeline.run_pull_streaming(
+                token, start_date, end_date, formats=stream_formats(), output_dir=output_dir,
+                pengeluaran_multiplier=pengeluaran_multiplier, window_days=window_days, max_workers=max_workers,
+                progress=fetch_progress, on_chunk=show_chunk, rollup_rows=True
+            )
+            stream_stage["rows"] = summary["items"]
+        progress_bar.empty()
+        status_text.empty()
         
-        # Debug info
+        with instrument.stage(profiler, "rollup.update", rows=len(summary["rollup"])):
+            update_rollup(selected_shop, token["shop_id"], None, start_date, end_date, summary["errors"],
+                          rows=summary.pop("rollup"))
+        adopt_stream(summary, {"multiplier": pengeluaran_multiplier, "profiler": profiler})
+    
+    # =====================================================
+    # FOREGROUND: TARIK DI SCRIPT INI (MENUNGGU SAMPAI SELESAI)
+    # =====================================================
+    if fetch_clicked and not background and not stream_mode:
+        fetch_progress = progress.FetchProgress()
+        profiler = new_profiler(fetch_progress, incremental=incremental)
         
         # Progress tracking
         progress_bar = st.progress(0)
         status_text = st.empty()
         
-        path = "/api/v2/ams/get_conversion_report"
-        page_no = 1
-        page_size = 100
-        all_orders = []
+        def show_progress(stats):
+            progress_bar.progress(min(stats["fraction"], 0.95))
+            status_text.text(
+                f"🪟 Window {stats['windows_done']}/{stats['windows_total']} | Page {stats['pages']} "
+                f"(+{stats['pages_in_flight']} jalan) | Orders: {stats['orders']} ({stats['orders_per_sec']:.0f}/s) "
+                f"| Items: {stats['items']} | Retry: {stats['retries']} | Duplikat: {stats['duplicates']} "
+                f"| Tarik ulang: {stats['refetched']} | ETA {progress.format_eta(stats['eta'])}"
+            )
         
+        # Tanggal WIB → timestamp UTC, fetch/sync, flatten (vectorized) & rollup di pipeline.pull_report
         with st.spinner("Mengambil data dari Shopee API..."):
-            while True:
-                ts = int(time_module.time())
-                sign = generate_sign_full(path, ts, access_token, shop_id)
-                
-                params = {
-                    "partner_id": PARTNER_ID,
-                    "timestamp": ts,
-                    "access_token": access_token,
-                    "shop_id": int(shop_id),
-                    "sign": sign,
-                    "page_no": page_no,
-                    "page_size": page_size,
-                    "place_order_time_start": start_ts,
-                    "place_order_time_end": end_ts
-                    # "order_status": "Completed"
-                }
-                
-                try:
-                    resp = requests.get(BASE_URL + path, params=params, timeout=30).json()
-                except Exception as e:
-                    st.error(f"🌐 Network Error: {str(e)}")
-                    break
-                
-                if resp.get("error"):
-                    error_msg = resp.get('message', 'Unknown error')
-                    st.error(f"❌ API Error: {error_msg}")
-                    if "too late" in error_msg.lower() or "has not been updated" in error_msg.lower():
-                        st.info("💡 Solusi: Data untuk tanggal tersebut belum tersedia. Coba gunakan preset 'Kemarin' atau periode yang sudah lewat.")
-                    st.json(resp)
-                    break
-                
-                data = resp.get("response", {})
-                orders = data.get("list", [])
-                
-                if not orders:
-                    break
-                
-                all_orders.extend(orders)
-                
-                # Update progress
-                total_estimate = data.get("total_count", page_no * page_size)
-                progress = min(page_no * page_size / max(total_estimate, 1), 0.95)
-                progress_bar.progress(progress)
-                status_text.text(f"📄 Page {page_no} | Orders: {len(all_orders)} | Items: {sum(len(o.get('items', [])) for o in all_orders)}")
-                
-                if not data.get("has_more", False):
-                    break
-                
-                page_no += 1
-                time_module.sleep(0.3)
-        
+            pulled = pipeline.pull_report(
+                token, start_date, end_date, store=get_sync_store() if incremental else None,
+                rollup_store=get_rollup_store(), pengeluaran_multiplier=pengeluaran_multiplier,
+                window_days=window_days, max_workers=max_workers,
+                on_progress=show_progress, progress=fetch_progress, profiler=profiler
+            )
         progress_bar.empty()
         status_text.empty()
+        adopt_pull(pulled, {"multiplier": pengeluaran_multiplier, "profiler": profiler})
+    
+    # =====================================================
+    # ANTREAN JOB BACKGROUND (AUTO-REFRESH SELAMA ADA YANG JALAN)
+    # =====================================================
+    adopted_jobs = st.session_state.setdefault("ams_adopted_jobs", set())
+    current_job = runner.get(result_key) if result_key in st.session_state.get("ams_job_keys", []) else None
+    if current_job is not None and current_job.status == jobs.DONE and current_job.id not in adopted_jobs:
+        adopted_jobs.add(current_job.id)
+        job_meta = dict(current_job.meta, job_id=current_job.id)
+        # Hasil masuk ResultCache sesi (berbatas byte); runner melepasnya setelah semua sesi pelanggan mengambil
+        job_result = runner.adopt(current_job, job_subscriber())
+        if job_result is None:
+            st.info("ℹ️ Hasil tarikan background ini sudah dilepas dari memori server. Tarik ulang untuk melihatnya.")
+        elif job_meta["mode"] == "stream":
+            load_rollup.clear()
+            adopt_stream(job_result, job_meta)
+        else:
+            adopt_pull(job_result, job_meta)
+    
+    session_jobs = runner.jobs(keys=st.session_state.get("ams_job_keys", []))
+    if session_jobs:
+        job_status_labels = {
+            jobs.QUEUED: "⏳ Antre", jobs.RUNNING: "🔄 Berjalan", jobs.DONE: "✅ Selesai",
+            jobs.FAILED: "❌ Gagal", jobs.CANCELLED: "🚫 Dibatalkan",
+        }
         
-        # =====================================================
-        # PROCESS DATA
-        # =====================================================
-        if not all_orders:
-            st.warning("📭 Tidak ada data conversion untuk periode ini.")
-            st.info("💡 Tips: Coba perpanjang rentang tanggal atau cek apakah ada order completed.")
-            st.stop()
+        def render_jobs():
+            st.markdown("#### 🧵 Tarikan Background")
+            for job in session_jobs:
+                snap = job.snapshot()
+                stats = snap["progress"]
+                label_col, progress_col, action_col = st.columns([3, 5, 1])
+                label_col.markdown(f"**{snap['label']}**  \n{job_status_labels[snap['status']]}")
+                if job.active:
+                    progress_col.progress(
+                        min(stats["fraction"], 0.99),
+                        text=f"Window {stats['windows_done']}/{stats['windows_total']} · {stats['orders']} order "
+                             f"· {stats['items']} item · ETA {progress.format_eta(stats['eta'])}"
+                    )
+                    action_col.button("✖️", key=f"cancel_job_{job.id}", help="Batalkan", on_click=job.cancel)
+                elif snap["status"] == jobs.FAILED:
+                    progress_col.caption(f"⚠️ {snap['error']}")
+                elif snap["status"] == jobs.DONE:
+                    progress_col.caption(
+                        f"{stats['orders']} order · {stats['items']} item · {snap['finished'] - snap['started']:.0f} s"
+                        + ("" if job.key == result_key else " · pilih toko & periode yang sama untuk melihat hasil")
+                    )
+                if not job.active:
+                    action_col.button("🗑️", key=f"forget_job_{job.id}", help="Hapus dari daftar",
+                                      on_click=forget_job, args=(job,))
+            # Ada job yang baru selesai → rerun penuh (hasil diambil, auto-refresh berhenti kalau sudah tidak ada yang jalan)
+            if any(not job.active for job in session_jobs if job.id in running_ids):
+                st.rerun()
         
-        # Flatten data dengan mapping kolom lengkap
-        rows = []
-        for order in all_orders:
-            # Ambil data commission di level order (untuk kalkulasi)
-            order_commission = order.get("total_brand_commission", 0) or 0
-            order_commission_aff = order.get("total_brand_commission_to_affiliate", 0) or 0
-            order_commission_mcn = order.get("total_brand_commission_to_mcn", 0) or 0
-            
-            items = order.get("items", [])
-            item_count = len(items) if items else 1  # Hindari division by zero
-
-            def safe_float(val):
-                try:
-                    return float(val) if val is not None else 0.0
-                except (ValueError, TypeError):
-                    return 0.0
-
-            def safe_percent(val):
-                """Safely convert percentage value to formatted string"""
-                if val is None:
-                    return "0%"
-                try:
-                    # Jika sudah string dengan %, bersihkan dulu
-                    if isinstance(val, str):
-                        val = val.replace('%', '').strip()
-                    return f"{int(float(val))}%"
-                except (ValueError, TypeError):
-                    return "0%"
-            
-            # Hitung total komisi per order dari semua items
-            # total_order_commission = sum(
-            #     safe_float(i.get("item_brand_commission")) for i in items
-            # )
-            # total_order_commission_aff = sum(
-            #     safe_float(i.get("item_brand_commission_to_affiliate")) for i in items
-            # )
-            # total_order_commission_mcn = sum(
-            #     safe_float(i.get("item_brand_commission_to_mcn")) for i in items
-            # )
-            total_order_commission = sum(
-                safe_float(i.get("item_brand_commission")) for i in items
-            )
-            total_order_commission_aff = sum(
-                safe_float(i.get("item_brand_commission_to_affiliate")) for i in items
-            )
-            total_order_commission_mcn = sum(
-                safe_float(i.get("item_brand_commission_to_mcn")) for i in items
-            )
-            
-            # Jika total dari items 0, coba ambil dari order level
-            if total_order_commission_aff == 0:
-                total_order_commission_aff = safe_float(order.get("total_brand_commission_to_affiliate"))
-            if total_order_commission == 0:
-                total_order_commission = safe_float(order.get("total_brand_commission"))
-            if total_order_commission_mcn == 0:
-                total_order_commission_mcn = safe_float(order.get("total_brand_commission_to_mcn"))
-            
-            is_first_item = True
-            
-            for item in items:
-                # Kalkulasi komisi per produk (rata-rata jika multiple items)
-                item_commission = safe_float(item.get("item_brand_commission"))
-                item_commission_aff = safe_float(item.get("item_brand_commission_to_affiliate"))
-                item_commission_mcn = safe_float(item.get("item_brand_commission_to_mcn"))
-
-                if item_commission_aff > 0:
-                    pengeluaran = int(item_commission_aff * 1.11)
-                else:
-                    pengeluaran = 0
-
-                if is_first_item:
-                    order_commission_aff_val = total_order_commission_aff
-                    order_commission_val = total_order_commission
-                    order_commission_mcn_val = total_order_commission_mcn
-                    is_first_item = False  # Set flag ke False untuk item berikutnya
-                else:
-                    order_commission_aff_val = 0
-                    order_commission_val = 0
-                    order_commission_mcn_val = 0
-                
-                # Format waktu ke WIB
-                place_time = format_to_wib(order.get("place_order_time"))
-                completed_time = format_to_wib(order.get("order_completed_time"))
-                conv_time = format_to_wib(order.get("conversion_completed_time"))
-                
-                row = {
-                    # === IDENTITAS PESANAN ===
-                    "Kode Pesanan": order.get("order_sn"),
-                    "Status Pesanan": STATUS_MAPPING.get(order.get("order_status"), order.get("order_status")),
-                    "Status Terverifikasi": VERIFIED_STATUS_MAPPING.get(order.get("verified_status"), order.get("verified_status")),
-                    "Waktu Pesanan": place_time,
-                    "Waktu Pesanan Selesai": completed_time,
-                    "Waktu Pesanan Terverifikasi": conv_time,
-                    
-                    # === DETAIL PRODUK ===
-                    "Kode Produk": item.get("item_id"),
-                    "Nama Produk": item.get("item_name"),
-                    "ID Model": item.get("model_id"),
-                    "L1 Kategori Global": CATEGORY_MAPPING.get(str(item.get("l1_category_id")), item.get("l1_category_id")),
-                    "L2 Kategori Global": CATEGORY_MAPPING.get(str(item.get("l2_category_id")), item.get("l2_category_id")),
-                    "L3 Kategori Global": CATEGORY_MAPPING.get(str(item.get("l3_category_id")), item.get("l3_category_id")),
-                    
-                    # === PROMO & HARGA ===
-                    "Kode Promo": item.get("promotion_id"),
-                    "Harga(Rp)": item.get("price", 0),
-                    "Jumlah": item.get("qty", 0),
-                    
-                    # === AFFILIATE INFO ===
-                    "Nama Affiliate": order.get("affiliate_name"),
-                    "Username Affiliate": order.get("affiliate_username"),
-                    "MCN Terhubung": order.get("linked_mcn"),
-                    "ID Komisi Pesanan": item.get("commission_id") or order.get("commission_id") or order.get("open_id") or order.get("affiliate_id"),  # atau commission_id jika ada
-                    "Partner Promo": item.get("campaign_partner"),
-                    "Jenis Promo": CAMPAIGN_TYPE_MAPPING.get(item.get("seller_campaign_type"), item.get("seller_campaign_type")),
-                    
-                    # === FINANSIAL ===
-                    "Nilai Pembelian(Rp)": item.get("purchase_value", 0),
-                    "Jumlah Pengembalian(Rp)": item.get("refund_amount", 0),
-                    "Tipe Pesanan": ORDER_TYPE_MAPPING.get(order.get("order_type"), order.get("order_type")),
-                    
-                    # === KOMISI PER PRODUK (ITEM LEVEL) ===
-                    "Estimasi Komisi per Produk(Rp)": item_commission,
-                    "Estimasi Komisi Affiliate per Produk(Rp)": item_commission_aff,
-                    "Persentase Komisi Affiliate per Produk": safe_percent(item.get('item_brand_commission_rate_to_affiliate')),
-                    "Estimasi Komisi MCN per Produk(Rp)": item_commission_mcn,
-                    "Persentase Komisi MCN per Produk": safe_percent(item.get('item_brand_commission_rate_to_mcn')),
-                    
-                    # === KOMISI PER PESANAN (ORDER LEVEL) ===
-                    "Estimasi Komisi per Pesanan(Rp)": order_commission_val,
-                    "Estimasi Komisi Affiliate per Pesanan(Rp)": order_commission_aff_val,
-                    "Estimasi Komisi MCN per Pesanan(Rp)": order_commission_mcn_val,
-                    
-                    # === LAINNYA ===
-                    "Catatan Produk": NOTES_MAPPING.get(order.get("order_status"), ""),
-                    "Platform": order.get("channel"),
-                    "Pengeluaran(Rp)": pengeluaran,
-                    "Status Pemotongan": "Menunggu Pemotongan" if order.get("verified_status") != "Valid" else "Terverifikasi",
-                    "Metode Pemotongan": "" if order.get("verified_status") != "Valid" else "Otomatis",
-                    "Waktu Pemotongan": "" if not conv_time or conv_time == "--" else conv_time,
-                }
-                rows.append(row)
-        
-        # Create DataFrame dengan kolom terurut sesuai permintaan
-        desired_columns = [
-            "Kode Pesanan", "Status Pesanan", "Status Terverifikasi", "Waktu Pesanan", 
-            "Waktu Pesanan Selesai", "Waktu Pesanan Terverifikasi", "Kode Produk", 
-            "Nama Produk", "ID Model", "L1 Kategori Global", "L2 Kategori Global", 
-            "L3 Kategori Global", "Kode Promo", "Harga(Rp)", "Jumlah", "Nama Affiliate",
-            "Username Affiliate", "MCN Terhubung", "ID Komisi Pesanan", "Partner Promo",
-            "Jenis Promo", "Nilai Pembelian(Rp)", "Jumlah Pengembalian(Rp)", "Tipe Pesanan",
-            "Estimasi Komisi per Produk(Rp)", "Estimasi Komisi Affiliate per Produk(Rp)",
-            "Persentase Komisi Affiliate per Produk", "Estimasi Komisi MCN per Produk(Rp)",
-            "Persentase Komisi MCN per Produk", "Estimasi Komisi per Pesanan(Rp)",
-            "Estimasi Komisi Affiliate per Pesanan(Rp)", "Estimasi Komisi MCN per Pesanan(Rp)",
-            "Catatan Produk", "Platform", "Pengeluaran(Rp)", "Status Pemotongan",
-            "Metode Pemotongan", "Waktu Pemotongan"
+        running_ids = {job.id for job in session_jobs if job.active}
+        st.fragment(render_jobs, run_every=JOB_REFRESH_SECONDS if running_ids else None)()
+    
+    # =====================================================
+    # DISPLAY HASIL STREAMING (FILE DI DISK, TANPA DATAFRAME)
+    # =====================================================
+    stream_summary = streamed.get(result_key)
+    if stream_summary is not None:
+        show_fetch_errors(stream_summary["errors"])
+        st.success(f"✅ Berhasil! {stream_summary['items']} item dari {stream_summary['orders']} orders (mode hemat memori)")
+        stream_totals = stream_summary["totals"]
+        metric_cols = st.columns(4)
+        metrics = [
+            ("💰 Total Purchase", stream_totals["purchase"], "Rp {:,.0f}"),
+            ("💸 Total Pengeluaran", stream_totals["pengeluaran"], "Rp {:,.0f}"),
+            ("👥 Ke Affiliate", stream_totals["commission_affiliate"], "Rp {:,.0f}"),
+            ("🏢 Ke MCN", stream_totals["commission_mcn"], "Rp {:,.0f}")
         ]
-
-
-        df = pd.DataFrame(rows)
+        for col, (label, value, fmt) in zip(metric_cols, metrics):
+            with col:
+                st.metric(label, fmt.format(value))
+        if stream_summary["multiplier"] != pengeluaran_multiplier:
+            st.caption(f"ℹ️ File memakai faktor pengeluaran {stream_summary['multiplier']:.2f}; tarik ulang untuk faktor baru.")
+        st.caption("🌊 Data ditulis per chunk langsung ke file; filter & ringkasan per hari ada di 📈 Tren Harian.")
+        if stream_summary.get("skipped"):
+            st.warning(f"⚠️ {stream_summary['skipped']} order muncul lagi di window lain setelah window asalnya "
+                       "ditulis, jadi status salinan pertama yang dipakai. Tarik tanpa mode hemat memori untuk "
+                       "status terbaru.")
         
-        # =====================================================
-        # SAFE NUMERIC CONVERSION
-        # =====================================================
-        numeric_cols = [
-            'Harga(Rp)', 'Jumlah', 'Nilai Pembelian(Rp)', 'Jumlah Pengembalian(Rp)',
-            'Estimasi Komisi per Produk(Rp)', 'Estimasi Komisi Affiliate per Produk(Rp)',
-            'Persentase Komisi Affiliate per Produk', 'Estimasi Komisi MCN per Produk(Rp)',
-            'Persentase Komisi MCN per Produk', 'Estimasi Komisi per Pesanan(Rp)',
-            'Estimasi Komisi Affiliate per Pesanan(Rp)', 'Estimasi Komisi MCN per Pesanan(Rp)',
-            'Pengeluaran(Rp)'
-        ]
+        stream_labels = {
+            "xlsx": ("📥 Download Excel", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+            "parquet": ("🧱 Download Parquet", "application/vnd.apache.parquet"),
+            "csv.gz": ("🗜️ Download CSV (gzip)", "application/gzip"),
+            "ndjson.gz": ("🧾 Download Raw NDJSON (gzip)", "application/gzip"),
+        }
+        file_cols = st.columns(len(stream_summary["files"]))
+        for col, path in zip(file_cols, stream_summary["files"]):
+            fmt = next(f for f in stream_labels if path.endswith(f".{f}"))
+            with col, open(path, "rb") as fh:
+                st.download_button(label=stream_labels[fmt][0], data=fh, file_name=os.path.basename(path),
+                                   mime=stream_labels[fmt][1], key=f"stream_{fmt}")
         
-        for col in numeric_cols:
-            if col in df.columns:
-                df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0)
+        if stream_summary["profiler"]:
+            with st.expander("⏱️ Instrumentasi Pipeline", expanded=True):
+                report = stream_summary["profiler"].report()
+                st.caption(f"Total {report['total_seconds']:.2f} s")
+                st.dataframe(pd.DataFrame(report["stages"]), use_container_width=True)
+    
+    # =====================================================
+    # DISPLAY RESULTS (DARI CACHE SESI, BERTAHAN SAAT RERUN)
+    # =====================================================
+    result = results.get(result_key)
+    if result is not None:
+        all_orders, profiler = result.orders, result.meta["profiler"]
+        if result.meta["multiplier"] != pengeluaran_multiplier:
+            # Faktor pengeluaran diganti setelah tarik → hitung ulang kolomnya saja
+            result.replace_frame(commission.recompute_pengeluaran(result.df, pengeluaran_multiplier))
+            result.meta["multiplier"] = pengeluaran_multiplier
+        df = result.df
         
-        # Reorder columns sesuai permintaan
-        existing_cols = [c for c in desired_columns if c in df.columns]
-        df = df[existing_cols]
+        show_fetch_errors(result.errors)
+        sync_info = result.meta["sync_info"]
+        if sync_info:
+            st.caption(
+                f"♻️ {sync_info['days_fetched']} dari {sync_info['days_total']} hari ditarik dari API, "
+                "sisanya dari data tersimpan."
+            )
+        
+        def cached_export(fmt, writer, source):
+            # Bytes export dibuat sekali per hasil, rerun berikutnya pakai cache
+            def build():
+                buffer = io.BytesIO()
+                with instrument.stage(profiler, f"export.{fmt}", rows=len(source)) as rec:
+                    writer(source, buffer)
+                    rec["bytes"] = buffer.tell()
+                return buffer.getvalue()
+            return result.export(fmt, build)
+        
+        st.success(f"✅ Berhasil! {len(df)} item dari {len(all_orders)} orders")
         
         # =====================================================
-        # DISPLAY RESULTS
+        # EXPLORER (FILTER, RINGKASAN & PAGING DI SERVER)
         # =====================================================
-        st.success(f"✅ Berhasil! {len(df)} item dari {len(all_orders)} orders")
+        with st.expander("🔎 Filter Data"):
+            filter_col1, filter_col2 = st.columns(2)
+            with filter_col1:
+                f_status = st.multiselect("Status Pesanan", result.derive(
+                    "status_options", lambda: explore.options(df, "Status Pesanan")
+                ))
+                f_affiliate = st.multiselect("Affiliate", result.derive(
+                    "affiliate_options", lambda: explore.options(df, "Nama Affiliate")
+                ))
+            with filter_col2:
+                f_dates = st.date_input("Tanggal Pesanan", value=(start_date, end_date),
+                                        min_value=start_date, max_value=end_date)
+                f_product = st.text_input("Produk (nama / kode)")
+        
+        f_dates = tuple(f_dates) if isinstance(f_dates, (list, tuple)) else (f_dates,)
+        filters = {
+            "statuses": tuple(f_status) or None,
+            "affiliates": tuple(f_affiliate) or None,
+            "start_date": f_dates[0] if f_dates and f_dates[0] != start_date else None,
+            "end_date": f_dates[-1] if f_dates and f_dates[-1] != end_date else None,
+            "product": f_product.strip() or None,
+        }
+        filter_key = tuple(filters.items())
+        rows = result.derive(("rows", filter_key), lambda: explore.filter_rows(df, **filters))
+        filtered = len(rows) < len(df)
+        
+        def view_derive(name, build):
+            # Turunan dari baris terfilter, di-cache per kombinasi filter
+            return result.derive((name, filter_key), lambda: build(df.iloc[rows] if filtered else df))
         
         # Metrics Summary
+        view_totals = view_derive("totals", explore.totals)
         metric_cols = st.columns(4)
         metrics = [
-            ("💰 Total Purchase", df['Nilai Pembelian(Rp)'].sum(), "Rp {:,.0f}"),
-            ("💸 Total Pengeluaran", df['Pengeluaran(Rp)'].sum(), "Rp {:,.0f}"),
-            ("👥 Ke Affiliate", df['Estimasi Komisi Affiliate per Produk(Rp)'].sum(), "Rp {:,.0f}"),
-            ("🏢 Ke MCN", df['Estimasi Komisi MCN per Produk(Rp)'].sum(), "Rp {:,.0f}")
+            ("💰 Total Purchase", view_totals["purchase"], "Rp {:,.0f}"),
+            ("💸 Total Pengeluaran", view_totals["pengeluaran"], "Rp {:,.0f}"),
+            ("👥 Ke Affiliate", view_totals["commission_affiliate"], "Rp {:,.0f}"),
+            ("🏢 Ke MCN", view_totals["commission_mcn"], "Rp {:,.0f}")
         ]
         
         for col, (label, value, fmt) in zip(metric_cols, metrics):
             with col:
                 st.metric(label, fmt.format(value))
+        if filtered:
+            st.caption(f"Filter aktif: {view_totals['items']:,} item / {view_totals['orders']:,} order dari {len(df):,} item")
+        
+        data_tab, affiliate_tab, product_tab, day_tab = st.tabs(
+            ["📄 Data", "👥 Per Affiliate", "📦 Per Produk", "📅 Per Hari"]
+        )
+        
+        with data_tab:
+            page_col1, page_col2 = st.columns([1, 3])
+            with page_col1:
+                page_size = st.selectbox("Baris per halaman", explore.PAGE_SIZES,
+                                         index=explore.PAGE_SIZES.index(explore.DEFAULT_PAGE_SIZE))
+            n_pages = max((len(rows) + page_size - 1) // page_size, 1)
+            with page_col2:
+                page_no = st.number_input(f"Halaman (1-{n_pages})", min_value=1, max_value=n_pages, value=1, step=1)
+            page_df, _ = explore.page(df, page_no, page_size, rows=rows if filtered else None)
+            st.dataframe(page_df, use_container_width=True, height=500)
+            first_row = (page_no - 1) * page_size
+            st.caption(f"Baris {first_row + 1 if len(rows) else 0:,}-{first_row + len(page_df):,} dari {len(rows):,}")
         
-        st.dataframe(df, use_container_width=True, height=500)
+        for tab, by in ((affiliate_tab, "affiliate"), (product_tab, "product"), (day_tab, "day")):
+            with tab:
+                summary = view_derive(f"summary_{by}", lambda frame, by=by: explore.summarize(frame, by))
+                if by == "day" and not summary.empty:
+                    st.line_chart(summary.set_index("Tanggal")[["purchase", "pengeluaran"]])
+                st.dataframe(summary.head(explore.SUMMARY_LIMIT), use_container_width=True)
+                if len(summary) > explore.SUMMARY_LIMIT:
+                    st.caption(f"Menampilkan {explore.SUMMARY_LIMIT} dari {len(summary):,} grup teratas (urut purchase).")
         
         # =====================================================
         # EXPORT EXCEL
@@ -631,17 +1029,8 @@ with tab6:
         st.divider()
         st.subheader("📥 Export Data")
         
-        excel_buffer = io.BytesIO()
-        with pd.ExcelWriter(excel_buffer, engine='openpyxl') as writer:
-            df.to_excel(writer, index=False, sheet_name='AMS Conversion')
-            
-            # Auto-adjust
-            worksheet = writer.sheets['AMS Conversion']
-            for column in worksheet.columns:
-                max_length = max(len(str(cell.value) or "") for cell in column) + 2
-                worksheet.column_dimensions[column[0].column_letter].width = min(max_length, 50)
-        
-        excel_data = excel_buffer.getvalue()
+        # xlsxwriter constant_memory: baris ditulis streaming, lebar kolom dari statistik kolom
+        excel_data = cached_export("xlsx", lambda d, out: export.write_excel(d, out, sheet_name='AMS Conversion'), df)
         
         exp_col1, exp_col2, exp_col3 = st.columns([1, 1, 2])
         
@@ -656,11 +1045,78 @@ with tab6:
         with exp_col2:
             if st.button("💾 Simpan ke Database"):
                 try:
-                    save_report_to_db(selected_shop, f"{start_date} to {end_date}", excel_data)
-                    st.success("✅ Tersimpan!")
+                    with instrument.stage(profiler, "archive.upload", nbytes=len(excel_data)):
+                        _, created = save_report_to_db(selected_shop, start_date, end_date, df, len(all_orders), excel_data)
+                    st.success("✅ Tersimpan!" if created else "✅ Laporan identik sudah ada di arsip.")
                 except Exception as e:
                     st.error(f"Gagal simpan: {e}")
         
         with exp_col3:
-            with st.expander("🔍 Lihat Sample Data Raw (JSON)"):
-                st.json(all_orders[0] if all_orders else {})
+            with st.expander("🔍 Lihat Data Raw (JSON)"):
+                raw_sn = st.text_input("Kode Pesanan", placeholder="kosong = order pertama")
+                if raw_sn.strip():
+                    raw_pos = result.derive("order_index", lambda: explore.order_index(all_orders)).get(raw_sn.strip())
+                    if raw_pos is None:
+                        st.caption("Kode pesanan tidak ditemukan di hasil ini.")
+                    else:
+                        st.json(all_orders[raw_pos])
+                else:
+                    st.json(all_orders[0] if all_orders else {})
+        
+        # Format analitik: langsung dari DataFrame / order mentah, tanpa lewat Excel
+        file_prefix = f"AMS_{selected_shop}_{start_date}_{end_date}"
+        fmt_col1, fmt_col2, fmt_col3 = st.columns(3)
+        
+        with fmt_col1:
+            try:
+                st.download_button(
+                    label="🧱 Download Parquet",
+                    data=cached_export("parquet", export.write_parquet, df),
+                    file_name=f"{file_prefix}.parquet",
+                    mime="application/vnd.apache.parquet"
+                )
+            except RuntimeError as e:
+                st.caption(f"⚠️ {e}")
+        
+        with fmt_col2:
+            st.download_button(
+                label="🗜️ Download CSV (gzip)",
+                data=cached_export("csv_gz", export.write_csv_gz, df),
+                file_name=f"{file_prefix}.csv.gz",
+                mime="application/gzip"
+            )
+        
+        with fmt_col3:
+            st.download_button(
+                label="🧾 Download Raw NDJSON (gzip)",
+                data=cached_export("ndjson_gz", lambda orders, out: export.write_ndjson(orders, out, compress=True), all_orders),
+                file_name=f"{file_prefix}_raw.ndjson.gz",
+                mime="application/gzip"
+            )
+        
+        # =====================================================
+        # INSTRUMENTASI
+        # =====================================================
+        if profiler:
+            with st.expander("⏱️ Instrumentasi Pipeline", expanded=True):
+                report = profiler.report()
+                st.caption(f"Total {report['total_seconds']:.2f} s")
+                st.dataframe(pd.DataFrame(report["stages"]), use_container_width=True)
+                if report["page_latency"]:
+                    lat = report["page_latency"]
+                    st.caption(
+                        f"Latency page ({lat['pages']} page): rata-rata {lat['mean'] * 1000:.0f} ms · "
+                        f"p50 {lat['p50'] * 1000:.0f} ms · p95 {lat['p95'] * 1000:.0f} ms · max {lat['max'] * 1000:.0f} ms"
+                    )
+                if report["profile"]:
+                    st.code(report["profile"], language=None)
+                st.download_button(
+                    label="📊 Download Instrumentasi (JSON)",
+                    data=profiler.to_json(),
+                    file_name=f"{file_prefix}_profile.json",
+                    mime="application/json"
+                )
+        
+        # Export baru menambah ukuran entri → cek ulang batas memori cache
+        results.trim()
+        st.caption(f"🗃️ Cache sesi: {len(results)} hasil · {results.nbytes / 1024 / 1024:,.0f} MB")
@@ -0,0 +1,110 @@
+"""Benchmark end-to-end & per tahap terhadap mock server (offline, reproducible).
+
+    python -m benchmarks.run                       # 1k, 100k, 1M item
+    python -m benchmarks.run --sizes 1000 100000 --out bench.json
+    python -m benchmarks.run --no-fetch            # data dibangkitkan langsung, tanpa HTTP
+
+Tiap ukuran: fetch lewat HTTP ke mock (rate limiter dibuka lebar), flatten
+(kolom / DataFrame / numeric), lalu export xlsx / parquet / csv.gz ke memori.
+Hasil dicetak sebagai tabel dan bisa disimpan ke JSON (instrument.Profiler.report()).
+"""
+
+import argparse
+import io
+import json
+import sys
+from datetime import date
+
+from myams import export, fetcher, flatten, instrument, periods, progress, ratelimit, shopee
+from myams.mock_server import MockConfig, MockShopeeServer, generate_orders
+
+DEFAULT_SIZES = [1_000, 100_000, 1_000_000]
+ITEMS_PER_ORDER = 2
+DAYS = 30
+START_DATE = date(2024, 1, 1)
+SHOP_ID = 900001
+EXPORTS = {
+    "xlsx": export.write_excel,
+    "parquet": export.write_parquet,
+    "csv_gz": export.write_csv_gz,
+}
+
+
+def run_size(n_items, use_http=True, max_workers=fetcher.DEFAULT_MAX_WORKERS, latency=0.0, profile=False):
+    orders_per_day = max(1, round(n_items / ITEMS_PER_ORDER / DAYS))
+    config = MockConfig(orders_per_day=orders_per_day, items_per_order=(ITEMS_PER_ORDER, ITEMS_PER_ORDER),
+                        latency=latency)
+    start_ts, _ = periods.date_range_ts(START_DATE, START_DATE)
+    end_ts = start_ts + DAYS * fetcher.DAY_SECONDS - 1
+
+    profiler = instrument.Profiler(profile=profile)
+    profiler.meta.update(target_items=n_items, http=use_http, max_workers=max_workers, latency=latency)
+
+    if use_http:
+        ratelimit.configure_limiter(SHOP_ID, rate=1_000_000, capacity=1_000)
+        fetch_progress = profiler.attach(progress.FetchProgress())
+        with MockShopeeServer(config) as server:
+            shopee.configure("1", "mock-key", base_url=server.url)
+            with profiler.stage("fetch") as rec:
+                orders, errors = fetcher.fetch_conversion_report(
+                    SHOP_ID, "mock-access", start_ts, end_ts, max_workers=max_workers, progress=fetch_progress
+                )
+                rec["rows"] = len(orders)
+        if errors:
+            raise RuntimeError(f"{len(errors)} window gagal: {errors[0]}")
+    else:
+        with profiler.stage("generate") as rec:
+            orders = generate_orders(start_ts, end_ts, config)
+            rec["rows"] = len(orders)
+
+    df = flatten.flatten_orders(orders, profiler=profiler)
+    profiler.meta["items"] = len(df)
+
+    for name, writer in EXPORTS.items():
+        buffer = io.BytesIO()
+        try:
+            with profiler.stage(f"export.{name}", rows=len(df)) as rec:
+                writer(df, buffer)
+                rec["bytes"] = buffer.tell()
+        except RuntimeError as e:  # pyarrow tidak terpasang
+            print(f"  lewati {name}: {e}", file=sys.stderr)
+    return profiler.report()
+
+
+def print_report(report):
+    meta = report["meta"]
+    print(f"\n== {meta['items']:,} item (target {meta['target_items']:,}) | total {report['total_seconds']:.2f} s")
+    for s in report["stages"]:
+        rate = f"{s['rows'] / s['seconds']:>12,.0f} baris/s" if s["rows"] and s["seconds"] else " " * 20
+        size = f"{s['bytes'] / 1e6:>9.1f} MB" if s["bytes"] else ""
+        print(f"  {s['stage']:<20} {s['seconds']:>8.3f} s {rate} {size}")
+    if report["page_latency"]:
+        lat = report["page_latency"]
+        print(f"  page latency: {lat['pages']} page, p50 {lat['p50'] * 1000:.1f} ms, p95 {lat['p95'] * 1000:.1f} ms")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.run", description="Benchmark pipeline AMS")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="jumlah item per run")
+    parser.add_argument("--no-fetch", action="store_true", help="bangkitkan order langsung tanpa HTTP")
+    parser.add_argument("--workers", type=int, default=fetcher.DEFAULT_MAX_WORKERS)
+    parser.add_argument("--latency", type=float, default=0.0, help="latency mock per request (detik)")
+    parser.add_argument("--profile", action="store_true", help="sertakan snapshot cProfile")
+    parser.add_argument("--out", help="simpan hasil ke file JSON")
+    args = parser.parse_args(argv)
+
+    reports = []
+    for n_items in args.sizes:
+        report = run_size(n_items, use_http=not args.no_fetch, max_workers=args.workers,
+                          latency=args.latency, profile=args.profile)
+        print_report(report)
+        reports.append(report)
+
+    if args.out:
+        with open(args.out, "w") as fh:
+            json.dump(reports, fh, indent=2, default=str)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
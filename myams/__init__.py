@@ -0,0 +1 @@
+"""myAMS core - logic fetch & proses laporan AMS Shopee (tanpa Streamlit)."""
@@ -0,0 +1,249 @@
+"""Arsip laporan: metadata ramping di tabel, payload di storage, dedup via hash isi (+ toko & periode).
+
+Listing riwayat hanya membaca metadata; payload (xlsx) diunduh saat diminta.
+Payload yang sudah berupa arsip terkompresi (xlsx = zip, parquet, *.gz)
+disimpan apa adanya, format lain di-gzip. Arsip lama dengan path *.gz tetap
+dibaca lewat decompress.
+
+Baris tabel lama shopee_reports (xlsx base64 di kolom csv_content) tidak
+dimigrasi; list_legacy_reports / load_legacy_payload hanya membacanya supaya
+tetap muncul di riwayat.
+
+Tabel & bucket Supabase yang dipakai SupabaseReportArchive:
+
+    create table shopee_report_archive (
+        id bigserial primary key,
+        shop_name text not null,
+        date_range text,
+        start_date date,
+        end_date date,
+        row_count integer,
+        order_count integer,
+        total_purchase numeric,
+        total_pengeluaran numeric,
+        total_commission_affiliate numeric,
+        content_hash text not null unique,
+        format text,
+        size_bytes bigint,
+        stored_bytes bigint,
+        storage_path text,
+        created_at timestamptz default now()
+    );
+    -- bucket storage privat: ams-reports
+"""
+
+import base64
+import gzip
+import hashlib
+import os
+import sqlite3
+import threading
+
+import pandas as pd
+
+META_TABLE = "shopee_report_archive"
+LEGACY_TABLE = "shopee_reports"
+DEFAULT_BUCKET = "ams-reports"
+DEFAULT_LOCAL_DIR = os.path.join(".myams", "archive")
+
+META_COLUMNS = [
+    "id", "shop_name", "date_range", "start_date", "end_date", "row_count", "order_count",
+    "total_purchase", "total_pengeluaran", "total_commission_affiliate", "content_hash",
+    "format", "size_bytes", "stored_bytes", "storage_path", "created_at"
+]
+# Sudah terkompresi: gzip hanya menambah CPU tanpa memperkecil file
+STORED_AS_IS = {"xlsx", "parquet", "csv.gz", "ndjson.gz"}
+
+
+# ===============================
+# HELPERS
+# ===============================
+def content_hash(df, fmt="xlsx", shop_name="", start_date="", end_date=""):
+    """Hash isi laporan (bukan byte file, karena xlsx menyimpan waktu pembuatan).
+
+    Toko & periode ikut di-hash: laporan dengan isi sama (mis. kosong) dari
+    toko / periode lain tetap jadi arsip sendiri.
+    """
+    h = hashlib.sha256()
+    h.update(fmt.encode())
+    h.update(f"{shop_name}\x1f{start_date}\x1f{end_date}".encode())
+    h.update("\x1f".join(map(str, df.columns)).encode())
+    h.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return h.hexdigest()
+
+
+def build_metadata(shop_name, start_date, end_date, df, order_count, payload, fmt="xlsx"):
+    """Metadata arsip: periode, jumlah baris/order, total utama dan hash isi"""
+    return {
+        "shop_name": shop_name,
+        "date_range": f"{start_date} to {end_date}",
+        "start_date": str(start_date),
+        "end_date": str(end_date),
+        "row_count": int(len(df)),
+        "order_count": int(order_count),
+        "total_purchase": float(df["Nilai Pembelian(Rp)"].sum()),
+        "total_pengeluaran": float(df["Pengeluaran(Rp)"].sum()),
+        "total_commission_affiliate": float(df["Estimasi Komisi Affiliate per Produk(Rp)"].sum()),
+        "content_hash": content_hash(df, fmt, shop_name, start_date, end_date),
+        "format": fmt,
+        "size_bytes": len(payload),
+    }
+
+
+def _storage_path(meta):
+    suffix = "" if meta["format"] in STORED_AS_IS else ".gz"
+    return f"{meta['content_hash'][:2]}/{meta['content_hash']}.{meta['format']}{suffix}"
+
+
+def _gzipped(meta):
+    # Payload di-gzip oleh arsip (bukan format *.gz itu sendiri)
+    return meta["storage_path"].endswith(f".{meta['format']}.gz")
+
+
+def compress(payload):
+    return gzip.compress(payload, compresslevel=6, mtime=0)
+
+
+def decompress(blob):
+    return gzip.decompress(blob)
+
+
+def pack(meta, payload):
+    """(storage_path, blob) untuk disimpan"""
+    path = _storage_path(meta)
+    return path, payload if meta["format"] in STORED_AS_IS else compress(payload)
+
+
+def unpack(meta, blob):
+    return decompress(blob) if _gzipped(meta) else blob
+
+
+# ===============================
+# LOCAL (SQLITE + FILE)
+# ===============================
+class LocalReportArchive:
+    """Stand-in lokal: metadata di SQLite, payload di folder"""
+
+    def __init__(self, root=DEFAULT_LOCAL_DIR):
+        os.makedirs(root, exist_ok=True)
+        self.root = root
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(os.path.join(root, "archive.db"), check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock, self._conn:
+            self._conn.execute(f"""
+                create table if not exists {META_TABLE} (
+                    id integer primary key autoincrement,
+                    shop_name text not null,
+                    date_range text,
+                    start_date text,
+                    end_date text,
+                    row_count integer,
+                    order_count integer,
+                    total_purchase real,
+                    total_pengeluaran real,
+                    total_commission_affiliate real,
+                    content_hash text not null unique,
+                    format text,
+                    size_bytes integer,
+                    stored_bytes integer,
+                    storage_path text,
+                    created_at text default current_timestamp
+                )""")
+
+    def _find(self, digest):
+        row = self._conn.execute(
+            f"select * from {META_TABLE} where content_hash = ?", (digest,)
+        ).fetchone()
+        return dict(row) if row else None
+
+    def save_report(self, meta, payload):
+        """Simpan laporan; return (metadata, created). Isi identik → pakai arsip lama"""
+        with self._lock:
+            existing = self._find(meta["content_hash"])
+            if existing:
+                return existing, False
+            path, blob = pack(meta, payload)
+            os.makedirs(os.path.join(self.root, os.path.dirname(path)), exist_ok=True)
+            with open(os.path.join(self.root, path), "wb") as fh:
+                fh.write(blob)
+            record = dict(meta, stored_bytes=len(blob), storage_path=path)
+            cols = [c for c in META_COLUMNS if c in record]
+            with self._conn:
+                self._conn.execute(
+                    f"insert into {META_TABLE} ({', '.join(cols)}) values ({', '.join('?' for _ in cols)})",
+                    [record[c] for c in cols],
+                )
+            return self._find(meta["content_hash"]), True
+
+    def list_reports(self, shop_name, limit=10):
+        with self._lock:
+            rows = self._conn.execute(
+                f"select * from {META_TABLE} where shop_name = ? order by created_at desc, id desc limit ?",
+                (shop_name, limit),
+            ).fetchall()
+        return [dict(r) for r in rows]
+
+    def load_payload(self, meta):
+        with open(os.path.join(self.root, meta["storage_path"]), "rb") as fh:
+            return unpack(meta, fh.read())
+
+
+# ===============================
+# SUPABASE (TABEL + STORAGE BUCKET)
+# ===============================
+class SupabaseReportArchive:
+    """Metadata di tabel shopee_report_archive, payload di storage bucket"""
+
+    def __init__(self, client, bucket=DEFAULT_BUCKET):
+        self.client = client
+        self.bucket = bucket
+
+    def _find(self, digest):
+        res = self.client.table(META_TABLE).select(",".join(META_COLUMNS)).eq("content_hash", digest).execute()
+        return res.data[0] if res.data else None
+
+    def save_report(self, meta, payload):
+        """Simpan laporan; return (metadata, created). Isi identik → pakai arsip lama"""
+        existing = self._find(meta["content_hash"])
+        if existing:
+            return existing, False
+        path, blob = pack(meta, payload)
+        content_type = "application/gzip" if path.endswith(".gz") else "application/octet-stream"
+        self.client.storage.from_(self.bucket).upload(
+            path, blob, {"content-type": content_type, "upsert": "true"}
+        )
+        record = dict(meta, stored_bytes=len(blob), storage_path=path, created_at="now()")
+        res = self.client.table(META_TABLE).insert(record).execute()
+        return (res.data[0] if res.data else record), True
+
+    def list_reports(self, shop_name, limit=10):
+        res = (
+            self.client.table(META_TABLE).select(",".join(META_COLUMNS))
+            .eq("shop_name", shop_name).order("created_at", desc=True).limit(limit).execute()
+        )
+        return res.data or []
+
+    def load_payload(self, meta):
+        return unpack(meta, self.client.storage.from_(self.bucket).download(meta["storage_path"]))
+
+
+# ===============================
+# TABEL LAMA (HANYA BACA)
+# ===============================
+def list_legacy_reports(client, shop_name, limit=10):
+    """Baris shopee_reports lama (tanpa kolom payload)"""
+    res = (
+        client.table(LEGACY_TABLE).select("shop_name,date_range,created_at")
+        .eq("shop_name", shop_name).order("created_at", desc=True).limit(limit).execute()
+    )
+    return res.data or []
+
+
+def load_legacy_payload(client, report):
+    """xlsx satu baris shopee_reports (base64 di csv_content); None kalau barisnya sudah tidak ada"""
+    res = (
+        client.table(LEGACY_TABLE).select("csv_content")
+        .eq("shop_name", report["shop_name"]).eq("created_at", report["created_at"]).limit(1).execute()
+    )
+    return base64.b64decode(res.data[0]["csv_content"]) if res.data else None
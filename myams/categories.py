@@ -0,0 +1,258 @@
+"""Pohon kategori Shopee → label L1/L2/L3 di laporan.
+
+Pohon dimuat sekali (API get_category atau file snapshot) ke array ID terurut
++ nama, lalu dicari dengan searchsorted per ID unik. Hasil disimpan ke cache
+JSON di disk (berversi: skema + hash isi + waktu ambil) supaya start berikutnya
+tidak perlu memanggil API; cache lebih tua dari max_age diperbarui kalau ada
+sumber yang bisa dipanggil, kalau tidak cache lama tetap dipakai.
+
+Format snapshot yang diterima: file cache ini, response mentah get_category
+({"response": {"category_list": [...]}}), atau list record kategori.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from . import shopee
+
+CATEGORY_PATH = "/api/v2/product/get_category"
+DEFAULT_LANGUAGE = "id"
+DEFAULT_CACHE_PATH = os.path.join(".myams", "categories.json")
+DEFAULT_MAX_AGE = 7 * 24 * 3600
+# Naik kalau format file cache berubah (cache lama diabaikan)
+CACHE_SCHEMA = 1
+
+# Cadangan minimum kalau belum ada cache / snapshot / API: (id, parent, nama)
+BUILTIN_CATEGORIES = [
+    (100643, 0, "Buku & Majalah"),
+    (100777, 100643, "Buku Bacaan"),
+    (101564, 100777, "Agama & Filsafat"),
+]
+
+
+class CategoryTree:
+    """ID kategori → nama & parent, disimpan sebagai array terurut per ID"""
+
+    def __init__(self, ids, parents, names, fetched_at=None, source=None):
+        ids = np.asarray(ids, dtype=np.int64)
+        order = np.argsort(ids, kind="stable")
+        self.ids = ids[order]
+        self.parents = np.asarray(parents, dtype=np.int64)[order]
+        self.names = np.asarray(names, dtype=object)[order]
+        self.fetched_at = fetched_at
+        self.source = source
+        self.version = _content_version(self.ids, self.parents, self.names)
+
+    @classmethod
+    def from_records(cls, records, **meta):
+        """Record API (dict category_id / parent_category_id / *_category_name) atau [id, parent, nama]"""
+        ids, parents, names = [], [], []
+        for rec in records:
+            if isinstance(rec, dict):
+                category_id = rec.get("category_id")
+                parent = rec.get("parent_category_id") or 0
+                name = rec.get("display_category_name") or rec.get("original_category_name") or rec.get("name")
+            else:
+                category_id, parent, name = rec
+            if category_id is None:
+                continue
+            ids.append(int(category_id))
+            parents.append(int(parent or 0))
+            names.append(str(name) if name else str(category_id))
+        return cls(ids, parents, names, **meta)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _positions(self, values):
+        # (posisi di self.ids, mask ketemu) untuk nilai ID campuran int / teks / None
+        num = pd.to_numeric(pd.Series(values, dtype=object), errors="coerce").to_numpy(dtype=float)
+        valid = np.isfinite(num)
+        keys = np.where(valid, num, -1).astype(np.int64)
+        pos = np.searchsorted(self.ids, keys)
+        pos = np.minimum(pos, max(len(self.ids) - 1, 0))
+        found = valid & (self.ids[pos] == keys) if len(self.ids) else np.zeros(len(keys), dtype=bool)
+        return pos, found
+
+    def lookup(self, values):
+        """Nama per nilai (None kalau ID tidak dikenal)"""
+        pos, found = self._positions(values)
+        out = np.full(len(found), None, dtype=object)
+        out[found] = self.names[pos[found]]
+        return out
+
+    def label(self, values):
+        """Label laporan per nilai: nama kategori, ID asli (teks) kalau tidak dikenal, None tetap None"""
+        names = self.lookup(values)
+        return [
+            name if name is not None else (None if _is_missing(v) else str(v))
+            for v, name in zip(values, names)
+        ]
+
+    def path(self, category_id):
+        """Nama dari L1 sampai kategori ini"""
+        names, current, seen = [], category_id, set()
+        while current and current not in seen:
+            seen.add(current)
+            pos, found = self._positions([current])
+            if not found[0]:
+                break
+            names.append(self.names[pos[0]])
+            current = int(self.parents[pos[0]])
+        return names[::-1]
+
+    def to_records(self):
+        return [[int(i), int(p), n] for i, p, n in zip(self.ids, self.parents, self.names)]
+
+
+def _is_missing(value):
+    return value is None or (isinstance(value, float) and np.isnan(value))
+
+
+def _content_version(ids, parents, names):
+    digest = hashlib.sha1()
+    digest.update(ids.tobytes())
+    digest.update(parents.tobytes())
+    digest.update("\x00".join(names).encode())
+    return digest.hexdigest()[:12]
+
+
+def builtin_tree():
+    return CategoryTree.from_records(BUILTIN_CATEGORIES, source="builtin")
+
+
+# ===============================
+# SUMBER: API / SNAPSHOT / CACHE
+# ===============================
+def fetch_tree(shop_id, access_token, language=DEFAULT_LANGUAGE):
+    """Seluruh pohon kategori dari API get_category (satu request).
+
+    access_token boleh string atau sumber token (tokens.ShopToken).
+    """
+    if callable(getattr(access_token, "get", None)):
+        access_token = access_token.get()
+    resp = shopee.call("GET", CATEGORY_PATH, params={"language": language},
+                       access_token=access_token, shop_id=shop_id)
+    records = (resp.get("response") or {}).get("category_list") or []
+    return CategoryTree.from_records(records, fetched_at=time.time(), source="api")
+
+
+def fetch_tree_any(tokens, language=DEFAULT_LANGUAGE):
+    """fetch_tree dengan token toko pertama yang berhasil (pohon kategori sama untuk semua toko).
+
+    tokens: iterable token (dict shop_id / access_token) atau callable tanpa
+    argumen yang mengembalikan token, dicoba berurutan; token kosong / expired /
+    dicabut dilewati. Semua gagal → raise error terakhir.
+    """
+    error = LookupError("Tidak ada token toko untuk mengambil pohon kategori")
+    for token in tokens:
+        try:
+            token = token() if callable(token) else token
+            if not token:
+                continue
+            return fetch_tree(token["shop_id"], token["access_token"], language=language)
+        except Exception as e:
+            error = e
+    raise error
+
+
+def load_snapshot(path):
+    """Pohon dari file snapshot (format cache, response get_category, atau list record)"""
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    if isinstance(data, dict) and "categories" in data:
+        records = data["categories"]
+    elif isinstance(data, dict):
+        records = (data.get("response") or data).get("category_list") or []
+    else:
+        records = data
+    return CategoryTree.from_records(records, fetched_at=os.path.getmtime(path), source=f"snapshot:{path}")
+
+
+def read_cache(path=DEFAULT_CACHE_PATH):
+    """Pohon dari cache disk; None kalau tidak ada, rusak, atau skemanya beda"""
+    try:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(data, dict) or data.get("schema") != CACHE_SCHEMA:
+        return None
+    tree = CategoryTree.from_records(data.get("categories") or [], fetched_at=data.get("fetched_at"),
+                                     source=data.get("source"))
+    # Isi tidak cocok dengan versinya (file terpotong / diedit) → anggap tidak ada
+    return tree if tree.version == data.get("version") else None
+
+
+def write_cache(tree, path=DEFAULT_CACHE_PATH):
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    data = {
+        "schema": CACHE_SCHEMA,
+        "version": tree.version,
+        "fetched_at": tree.fetched_at,
+        "source": tree.source,
+        "categories": tree.to_records(),
+    }
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp, path)
+
+
+def load_tree(cache_path=DEFAULT_CACHE_PATH, fetch=None, snapshot_path=None, max_age=DEFAULT_MAX_AGE, now=None):
+    """Pohon kategori dari sumber termurah yang masih segar.
+
+    Urutan: cache disk (kalau umurnya < max_age) → fetch() (mis. fetch_tree
+    dengan token toko) → snapshot_path → cache lama → BUILTIN_CATEGORIES.
+    Hasil fetch / snapshot ditulis ke cache_path.
+    """
+    now = time.time() if now is None else now
+    cached = read_cache(cache_path) if cache_path else None
+    if cached is not None and len(cached) and now - (cached.fetched_at or 0) < max_age:
+        return cached
+
+    fresh = None
+    if fetch is not None:
+        try:
+            fresh = fetch()
+        except Exception:
+            # API gagal → jatuh ke snapshot / cache lama, laporan tetap jalan
+            fresh = None
+    if (fresh is None or not len(fresh)) and snapshot_path and os.path.exists(snapshot_path):
+        fresh = load_snapshot(snapshot_path)
+    if fresh is not None and len(fresh):
+        if cache_path:
+            write_cache(fresh, cache_path)
+        return fresh
+    if cached is not None and len(cached):
+        return cached
+    return builtin_tree()
+
+
+# ===============================
+# POHON AKTIF (DIPAKAI FLATTEN)
+# ===============================
+_tree = None
+_lock = threading.Lock()
+
+
+def configure(tree):
+    """Set pohon kategori yang dipakai flatten (dipanggil sekali saat app / worker start)"""
+    global _tree
+    with _lock:
+        _tree = tree
+
+
+def get_tree():
+    global _tree
+    with _lock:
+        if _tree is None:
+            _tree = builtin_tree()
+        return _tree
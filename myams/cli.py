@@ -0,0 +1,168 @@
+"""CLI headless untuk pull terjadwal (cron / worker), tanpa Streamlit.
+
+Contoh:
+    python -m myams pull --all-shops --preset Kemarin --format xlsx --format parquet --out reports/
+    python -m myams pull --shop TokoA --start 2024-01-01 --end 2024-03-31 --format csv.gz
+    python -m myams pull --all-shops --preset "Bulan Lalu" --combined --workers 12 --per-shop-rate 3
+
+Konfigurasi dibaca dari environment: SUPABASE_URL, SUPABASE_KEY, PARTNER_ID,
+PARTNER_KEY, opsional SHOPEE_BASE_URL dan PENGELUARAN_MULTIPLIER.
+"""
+
+import argparse
+import os
+import sys
+from datetime import date
+
+from . import categories, commission, db, fetcher, periods, pipeline, resources, rollup, scheduler, shopee, sync_store, tokens
+
+REQUIRED_ENV = ["SUPABASE_URL", "SUPABASE_KEY", "PARTNER_ID", "PARTNER_KEY"]
+
+
+def load_config(environ=None):
+    """Konfigurasi dari environment (pengganti st.secrets)"""
+    environ = os.environ if environ is None else environ
+    missing = [k for k in REQUIRED_ENV if not environ.get(k)]
+    if missing:
+        raise SystemExit(f"Environment belum lengkap: {', '.join(missing)}")
+    return {k: environ.get(k) for k in REQUIRED_ENV + ["SHOPEE_BASE_URL", "PENGELUARAN_MULTIPLIER"]}
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m myams", description="Tarik laporan AMS Shopee tanpa UI")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    sub.add_parser("shops", help="daftar toko yang sudah punya token")
+
+    pull = sub.add_parser("pull", help="tarik conversion report lalu export ke file")
+    pull.add_argument("--shop", action="append", default=[], help="nama toko (boleh diulang)")
+    pull.add_argument("--all-shops", action="store_true", help="semua toko di shopee_tokens")
+    pull.add_argument("--preset", choices=periods.PRESETS[1:], default="Kemarin")
+    pull.add_argument("--start", type=date.fromisoformat, help="YYYY-MM-DD (mengabaikan --preset)")
+    pull.add_argument("--end", type=date.fromisoformat, help="YYYY-MM-DD (default = --start)")
+    pull.add_argument("--format", action="append", choices=list(pipeline.FORMATS), dest="formats")
+    pull.add_argument("--out", default="reports", help="folder output")
+    pull.add_argument("--window-days", type=int, default=fetcher.DEFAULT_WINDOW_DAYS)
+    pull.add_argument("--workers", type=int, default=scheduler.DEFAULT_TOTAL_WORKERS,
+                      help="total request paralel untuk semua toko")
+    pull.add_argument("--per-shop-workers", type=int, default=scheduler.DEFAULT_PER_SHOP_WORKERS)
+    pull.add_argument("--per-shop-rate", type=float, default=None, help="request/detik per toko")
+    pull.add_argument("--combined", action="store_true", help="satu file gabungan dengan kolom Toko")
+    pull.add_argument("--stream", action="store_true",
+                      help="hemat memori: page langsung ditulis per chunk, toko satu per satu (tanpa sync store); "
+                           "duplikat hanya digabung di dalam window yang sama")
+    pull.add_argument("--sync-store", choices=["local", "supabase", "none"], default="local")
+    pull.add_argument("--sync-store-path", default=sync_store.DEFAULT_LOCAL_PATH)
+    pull.add_argument("--rollup-store", choices=["local", "supabase", "none"], default="local",
+                      help="rollup harian per affiliate/produk/status")
+    pull.add_argument("--rollup-store-path", default=rollup.DEFAULT_LOCAL_PATH)
+    pull.add_argument("--category-cache", default=categories.DEFAULT_CACHE_PATH,
+                      help="cache pohon kategori (L1/L2/L3), diperbarui dari API kalau sudah lama")
+    pull.add_argument("--category-snapshot", help="file snapshot pohon kategori (dipakai kalau API gagal)")
+    return parser
+
+
+def _resolve_period(args):
+    if args.start:
+        end = args.end or args.start
+        if args.start > end:
+            raise ValueError(f"--start {args.start} lebih besar dari --end {end}")
+        return args.start, end
+    return periods.resolve_preset(args.preset)
+
+
+def _make_store(args, client):
+    if args.sync_store == "supabase":
+        return sync_store.SupabaseSyncStore(client)
+    if args.sync_store == "local":
+        return sync_store.LocalSyncStore(args.sync_store_path)
+    return None
+
+
+def _load_categories(args, shop_tokens):
+    # Pohon kategori sekali per run; kalau cache perlu diperbarui, token toko dicoba berurutan
+    fetch = (lambda: categories.fetch_tree_any(shop_tokens)) if shop_tokens else None
+    categories.configure(categories.load_tree(
+        cache_path=args.category_cache, fetch=fetch, snapshot_path=args.category_snapshot
+    ))
+
+
+def _make_rollup_store(args, client):
+    if args.rollup_store == "supabase":
+        return rollup.SupabaseRollupStore(client)
+    if args.rollup_store == "local":
+        return rollup.LocalRollupStore(args.rollup_store_path)
+    return None
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    # Argumen yang tidak valid ditolak sebelum menyentuh Supabase / API
+    if args.command == "pull":
+        if args.stream and args.combined:
+            parser.error("--stream tidak bisa digabung dengan --combined")
+        try:
+            start_date, end_date = _resolve_period(args)
+        except ValueError as e:
+            parser.error(str(e))
+    config = load_config()
+
+    shopee.configure(config["PARTNER_ID"], config["PARTNER_KEY"], config["SHOPEE_BASE_URL"])
+    client = resources.get_supabase(config["SUPABASE_URL"], config["SUPABASE_KEY"])
+
+    if args.command == "shops":
+        for name in db.list_shops(client):
+            print(name)
+        return 0
+
+    shops = db.list_shops(client) if args.all_shops else args.shop
+    if not shops:
+        parser.error("isi --shop atau --all-shops")
+    multiplier = float(config["PENGELUARAN_MULTIPLIER"] or commission.PENGELUARAN_MULTIPLIER)
+    store = _make_store(args, client)
+    rollup_store = _make_rollup_store(args, client)
+
+    exit_code = 0
+    token_cache = tokens.TokenCache(
+        load_token=lambda name: db.get_shop_token(client, name),
+        save_token=lambda name, shop_id, access, refresh: db.save_token(client, name, shop_id, access, refresh),
+    )
+    shop_tokens = []
+    for shop_name in shops:
+        token = token_cache.token(shop_name)
+        if not token:
+            print(f"[{shop_name}] token tidak ditemukan, authorize ulang dulu", file=sys.stderr)
+            exit_code = 1
+            continue
+        shop_tokens.append(token)
+    _load_categories(args, shop_tokens)
+
+    if args.stream:
+        result = {"shops": [], "files": []}
+        for token in shop_tokens:
+            result["shops"].append(pipeline.run_pull_streaming(
+                token, start_date, end_date, formats=args.formats or ["xlsx"], output_dir=args.out,
+                pengeluaran_multiplier=multiplier, rollup_store=rollup_store,
+                window_days=args.window_days, max_workers=args.per_shop_workers,
+            ))
+    else:
+        result = pipeline.run_pull_many(
+            shop_tokens, start_date, end_date, formats=args.formats or ["xlsx"], output_dir=args.out,
+            store=store, combined=args.combined, pengeluaran_multiplier=multiplier, rollup_store=rollup_store,
+            window_days=args.window_days, max_workers=args.workers,
+            per_shop_workers=args.per_shop_workers, per_shop_rate=args.per_shop_rate,
+        )
+    for summary in result["shops"]:
+        shop_name = summary["shop_name"]
+        for err in summary["errors"]:
+            print(f"[{shop_name}] window {err.window[0]}-{err.window[1]} gagal: {err}", file=sys.stderr)
+            exit_code = 1
+        if summary.get("skipped"):
+            print(f"[{shop_name}] {summary['skipped']} order muncul lagi di window lain setelah ditulis; "
+                  "status salinan pertama dipakai (tarik tanpa --stream untuk status terbaru)", file=sys.stderr)
+        files = f" → {', '.join(summary['files'])}" if summary["files"] else ""
+        print(f"[{shop_name}] {start_date} s/d {end_date}: {summary['orders']} order, {summary['items']} item{files}")
+    if result["files"]:
+        print(f"Laporan gabungan → {', '.join(result['files'])}")
+    return exit_code
@@ -0,0 +1,51 @@
+"""Kalkulasi komisi per pesanan & Pengeluaran, vectorized untuk seluruh item sekaligus.
+
+Tidak bergantung ke Streamlit; semua fungsi menerima array / Series per item.
+"""
+
+import numpy as np
+import pandas as pd
+
+# Pengeluaran = komisi affiliate x faktor pajak (berubah mengikuti aturan pajak)
+PENGELUARAN_MULTIPLIER = 1.11
+
+
+def first_item_mask(order_keys):
+    """True untuk item pertama tiap order (groupby + cumcount, urutan item dipertahankan)"""
+    keys = pd.Series(order_keys)
+    return keys.groupby(keys, sort=False).cumcount().to_numpy() == 0
+
+
+def order_totals(order_keys, item_values, order_fallback=None):
+    """Total nilai item per order, di-broadcast balik ke tiap item.
+
+    Kalau total dari item = 0 dipakai order_fallback (nilai total_* level order,
+    per item). Penjumlahan urut seperti sum() biasa supaya hasil float identik.
+    """
+    codes, _ = pd.factorize(pd.Series(order_keys))
+    values = np.asarray(item_values, dtype=float)
+    totals = np.bincount(codes, weights=values)[codes] if len(codes) else values
+    if order_fallback is not None:
+        totals = np.where(totals == 0, np.asarray(order_fallback, dtype=float), totals)
+    return totals
+
+
+def allocate_order_commission(order_keys, item_values, order_fallback=None):
+    """Komisi level order hanya dicatat di item pertama tiap order, item lain 0"""
+    totals = order_totals(order_keys, item_values, order_fallback)
+    return np.where(first_item_mask(order_keys), totals, 0.0)
+
+
+def compute_pengeluaran(item_commission_aff, multiplier=PENGELUARAN_MULTIPLIER):
+    """Pengeluaran per item = int(komisi affiliate x multiplier), 0 kalau komisi <= 0"""
+    aff = np.asarray(item_commission_aff, dtype=float)
+    return np.where(aff > 0, np.trunc(aff * multiplier), 0).astype(np.int64)
+
+
+def recompute_pengeluaran(df, multiplier=PENGELUARAN_MULTIPLIER):
+    """Hitung ulang kolom Pengeluaran(Rp) pada DataFrame laporan dengan multiplier lain"""
+    out = df.copy()
+    out["Pengeluaran(Rp)"] = compute_pengeluaran(
+        out["Estimasi Komisi Affiliate per Produk(Rp)"].to_numpy(dtype=float), multiplier
+    )
+    return out
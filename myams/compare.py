@@ -0,0 +1,132 @@
+"""Perbandingan antar periode (mis. Bulan Ini vs Bulan Lalu) per affiliate / produk / status.
+
+Input tiap periode berupa baris rollup harian (rollup.aggregate dari laporan
+yang sudah dimuat, atau rollup store), bukan order mentah: satu groupby +
+unstack untuk semua periode sekaligus, jadi cukup cepat untuk dihitung ulang
+setiap rerun tanpa menarik ulang data.
+
+Periode pertama adalah pembanding (base); selisih tiap periode lain dihitung
+terhadapnya.
+"""
+
+import numpy as np
+import pandas as pd
+
+from . import explore, rollup
+
+# Nilai yang dibandingkan: item + kolom uang yang sama dengan ringkasan explorer
+MEASURES = ["items"] + list(explore.SUM_COLUMNS.values())
+# Label tampilan di UI
+MEASURE_LABELS = {
+    "items": "Item",
+    "purchase": "Pembelian",
+    "commission_affiliate": "Komisi Affiliate",
+    "commission_mcn": "Komisi MCN",
+    "pengeluaran": "Pengeluaran",
+}
+
+# Dimensi → (kolom kunci di rollup, kolom label yang ikut ditampilkan)
+DIMENSIONS = {
+    "affiliate": (["affiliate_username"], "affiliate_name"),
+    "product": (["item_id"], "item_name"),
+    "status": (["order_status"], None),
+}
+
+DEFAULT_TOP = 10
+
+
+def period_rows(df, start_date, end_date, rows=None):
+    """Baris rollup untuk [start_date, end_date] dari laporan (atau dari hasil aggregate yang sudah ada)"""
+    if rows is None:
+        rows = rollup.aggregate(df)
+    if not len(rows):
+        return rows
+    day = rows["day"].astype(str)
+    return rows[(day >= str(start_date)) & (day <= str(end_date))]
+
+
+def days_with_data(rows):
+    return int(rows["day"].nunique()) if len(rows) else 0
+
+
+def delta_column(measure, label):
+    return f"Δ {measure} · {label}"
+
+
+def pct_column(measure, label):
+    return f"Δ% {measure} · {label}"
+
+
+def value_column(measure, label):
+    return f"{measure} · {label}"
+
+
+def totals(frames, measures=MEASURES):
+    """Total per periode (baris = label periode) + selisih terhadap periode pertama"""
+    labels = list(frames)
+    out = pd.DataFrame(
+        [[float(rows[m].sum()) if len(rows) else 0.0 for m in measures] for rows in frames.values()],
+        index=pd.Index(labels, name="period"), columns=measures,
+    )
+    if labels:
+        base = out.iloc[0]
+        for m in measures:
+            out[f"Δ {m}"] = out[m] - base[m]
+            out[f"Δ% {m}"] = _pct(out[f"Δ {m}"].to_numpy(), np.full(len(out), base[m]))
+    return out
+
+
+def compare(frames, by, measures=MEASURES):
+    """Tabel lebar satu baris per grup `by` (DIMENSIONS): nilai tiap periode + Δ / Δ% terhadap periode pertama.
+
+    frames: dict label → baris rollup (urutan = urutan periode). Grup yang
+    tidak ada di suatu periode bernilai 0 di periode itu.
+    """
+    keys, name_col = DIMENSIONS[by]
+    labels = list(frames)
+    parts = [
+        rows[keys + ([name_col] if name_col else []) + measures].assign(_period=i)
+        for i, rows in enumerate(frames.values()) if len(rows)
+    ]
+    columns = keys + ([name_col] if name_col else [])
+    columns += [value_column(m, label) for m in measures for label in labels]
+    columns += [c for label in labels[1:] for m in measures for c in (delta_column(m, label), pct_column(m, label))]
+    if not parts:
+        return pd.DataFrame(columns=columns)
+
+    frame = pd.concat(parts, ignore_index=True)
+    frame[measures] = frame[measures].apply(pd.to_numeric, errors="coerce").fillna(0)
+    grouped = frame.groupby(keys + ["_period"], sort=False, observed=True)[measures].sum()
+    wide = grouped.unstack("_period", fill_value=0).reindex(
+        pd.MultiIndex.from_product([measures, range(len(labels))]), axis=1, fill_value=0
+    )
+
+    out = pd.DataFrame(index=wide.index)
+    if name_col:
+        # Nama terbaru (periode terakhir yang memuat grup) menang
+        out[name_col] = frame.sort_values("_period", kind="stable").groupby(keys, sort=False)[name_col].last()
+    for m in measures:
+        for i, label in enumerate(labels):
+            out[value_column(m, label)] = wide[(m, i)].to_numpy()
+    for i, label in enumerate(labels[1:], start=1):
+        for m in measures:
+            base = wide[(m, 0)].to_numpy()
+            diff = wide[(m, i)].to_numpy() - base
+            out[delta_column(m, label)] = diff
+            out[pct_column(m, label)] = _pct(diff, base)
+    return out.reset_index()[columns]
+
+
+def _pct(diff, base):
+    # Base 0 → Δ% tidak terdefinisi (NaN), bukan inf
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(base != 0, diff / np.abs(base) * 100, np.nan)
+
+
+def top_movers(table, measure, label, n=DEFAULT_TOP):
+    """(naik, turun): n grup dengan Δ measure terbesar / terkecil untuk periode `label`"""
+    col = delta_column(measure, label)
+    if col not in table or not len(table):
+        return table.iloc[:0], table.iloc[:0]
+    diff = table[col]
+    return table[diff > 0].nlargest(n, col), table[diff < 0].nsmallest(n, col)
@@ -0,0 +1,23 @@
+"""Helper tabel token Supabase (shopee_tokens), dipakai UI maupun CLI."""
+
+TOKENS_TABLE = "shopee_tokens"
+
+
+def save_token(client, shop_name, shop_id, access_token, refresh_token):
+    client.table(TOKENS_TABLE).upsert({
+        "shop_name": shop_name,
+        "shop_id": int(shop_id),
+        "access_token": access_token,
+        "refresh_token": refresh_token,
+        "updated_at": "now()"
+    }).execute()
+
+
+def list_shops(client):
+    res = client.table(TOKENS_TABLE).select("shop_name").execute()
+    return [r["shop_name"] for r in res.data] if res.data else []
+
+
+def get_shop_token(client, shop_name):
+    res = client.table(TOKENS_TABLE).select("*").eq("shop_name", shop_name).execute()
+    return res.data[0] if res.data else None
@@ -0,0 +1,134 @@
+"""Index order per order_sn selama fetch: gabung duplikat & cek jumlah terhadap total_count.
+
+Paging get_conversion_report berjalan sementara status order berubah, jadi
+page bisa bergeser: satu order muncul dua kali atau terlewat. Index ini
+menyimpan satu salinan per order_sn (status paling akhir menang, item digabung
+per (item_id, model_id)) dan menghitung order unik per window untuk
+dicocokkan dengan total_count dari API.
+"""
+
+import logging
+import threading
+
+# Urutan siklus status order; salinan dengan rank lebih tinggi dianggap lebih baru
+ORDER_STATUS_RANK = {
+    "Unpaid": 0, "To Confirm": 0,
+    "To Ship": 1,
+    "Shipping": 2, "To Receive": 2,
+    "Completed": 3, "Cancelled": 3,
+}
+VERIFIED_STATUS_RANK = {"Pending": 0, "Processing": 1, "Valid": 2, "Invalid": 2}
+
+logger = logging.getLogger(__name__)
+
+
+class CountMismatch(Exception):
+    """Jumlah order unik satu window tidak cocok dengan total_count API"""
+
+    def __init__(self, window, count, total):
+        self.window = window
+        self.count = count
+        self.total = total
+        super().__init__(f"{count} order unik, total_count API {total}")
+
+
+def item_key(item):
+    return item.get("item_id"), item.get("model_id")
+
+
+def _version(order):
+    # Urutan "lebih baru": status order, status verifikasi, lalu waktu selesai
+    return (
+        ORDER_STATUS_RANK.get(order.get("order_status"), 0),
+        VERIFIED_STATUS_RANK.get(order.get("verified_status"), 0),
+        order.get("conversion_completed_time") or 0,
+        order.get("order_completed_time") or 0,
+    )
+
+
+def dedup_items(order):
+    """Item dengan key sama di satu order → satu (yang terakhir); order asli dipakai kalau tidak ada duplikat"""
+    items = order.get("items") or []
+    merged = {item_key(item): item for item in items}
+    if len(merged) == len(items):
+        return order
+    return dict(order, items=list(merged.values()))
+
+
+def merge_orders(old, new):
+    """Dua salinan order yang sama → satu.
+
+    Salinan dengan status paling akhir menang (seri → salinan yang datang
+    belakangan); item yang hanya ada di salinan lain tetap ikut.
+    """
+    newer, older = (new, old) if _version(new) >= _version(old) else (old, new)
+    items = {item_key(item): item for item in newer.get("items") or []}
+    for item in older.get("items") or []:
+        items.setdefault(item_key(item), item)
+    return dict(newer, items=list(items.values()))
+
+
+class OrderIndex:
+    """order_sn → satu order, dikelompokkan per window (urutan window dipertahankan)"""
+
+    def __init__(self, windows=()):
+        self._windows = {w: {} for w in windows}
+        self._where = {}
+        self.duplicates = 0
+        self._lock = threading.Lock()
+
+    def add(self, orders, window=None):
+        """Tambah order hasil satu window, return jumlah duplikat yang digabung"""
+        merged = 0
+        with self._lock:
+            bucket = self._windows.setdefault(window, {})
+            for order in orders:
+                # Order tanpa order_sn tidak bisa dicocokkan → selalu dianggap unik
+                key = order.get("order_sn") or ("#", len(self._where))
+                if key not in self._where:
+                    bucket[key] = dedup_items(order)
+                    self._where[key] = window
+                else:
+                    home = self._windows[self._where[key]]
+                    home[key] = merge_orders(home[key], order)
+                    merged += 1
+            self.duplicates += merged
+        return merged
+
+    def count(self, window):
+        with self._lock:
+            return len(self._windows.get(window, ()))
+
+    def orders(self):
+        with self._lock:
+            return [o for bucket in self._windows.values() for o in bucket.values()]
+
+    def __contains__(self, order_sn):
+        with self._lock:
+            return order_sn in self._where
+
+    def __len__(self):
+        with self._lock:
+            return len(self._where)
+
+
+def stale_windows(index, totals, failed=()):
+    """Window sukses yang order uniknya < total_count terakhir dari API (masih ada yang terlewat).
+
+    Kelebihan (count > total) tidak bisa diperbaiki dengan tarik ulang, lihat log_overshoot().
+    """
+    return sorted(w for w, total in totals.items()
+                  if total is not None and w not in failed and index.count(w) < total)
+
+
+def overshoot_windows(index, totals, failed=()):
+    """Window sukses yang order uniknya > total_count (API kurang hitung / order pindah window)"""
+    return sorted(w for w, total in totals.items()
+                  if total is not None and w not in failed and index.count(w) > total)
+
+
+def log_overshoot(windows, count, totals, shop_id=None):
+    """Catat kelebihan order sebagai info saja: data tetap lengkap, bukan error"""
+    for window in windows:
+        logger.info("shop %s window %s-%s: %d order unik, total_count API %d (dibiarkan)",
+                    shop_id, window[0], window[1], count(window), totals[window])
@@ -0,0 +1,121 @@
+"""Explorer hasil laporan di sisi server: filter, paging, ringkasan group-by.
+
+DataFrame laporan tetap di server; UI hanya menerima satu halaman baris atau
+tabel ringkasan (per affiliate / produk / hari) yang jauh lebih kecil.
+"""
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_PAGE_SIZE = 100
+PAGE_SIZES = [50, 100, 250, 500]
+SUMMARY_LIMIT = 500
+
+# Nilai yang dijumlahkan di setiap ringkasan
+SUM_COLUMNS = {
+    "Nilai Pembelian(Rp)": "purchase",
+    "Estimasi Komisi Affiliate per Produk(Rp)": "commission_affiliate",
+    "Estimasi Komisi MCN per Produk(Rp)": "commission_mcn",
+    "Pengeluaran(Rp)": "pengeluaran",
+}
+
+GROUPINGS = {
+    "affiliate": ["Nama Affiliate"],
+    "product": ["Kode Produk", "Nama Produk"],
+    "day": ["Tanggal"],
+    "status": ["Status Pesanan"],
+}
+
+
+def filter_mask(df, statuses=None, affiliates=None, start_date=None, end_date=None, product=None):
+    """Mask baris sesuai filter (None / kosong = tidak difilter), tanpa menyalin frame"""
+    mask = np.ones(len(df), dtype=bool)
+    if statuses:
+        mask &= df["Status Pesanan"].isin(statuses).to_numpy()
+    if affiliates:
+        mask &= df["Nama Affiliate"].isin(affiliates).to_numpy()
+    if start_date is not None or end_date is not None:
+        placed = df["Waktu Pesanan"]
+        if start_date is not None:
+            mask &= (placed >= pd.Timestamp(start_date)).to_numpy()
+        if end_date is not None:
+            mask &= (placed < pd.Timestamp(end_date) + pd.Timedelta(days=1)).to_numpy()
+    if product:
+        text = str(product).strip()
+        hit = contains(df["Nama Produk"], text)
+        if text.isdigit():
+            # Kode Produk Int64: bandingkan angka, bukan teks per baris
+            hit |= (df["Kode Produk"] == int(text)).fillna(False).to_numpy(dtype=bool)
+        mask &= hit
+    return mask
+
+
+def contains(s, text):
+    """Mask teks mengandung `text` (case-insensitive); kolom kategori dicek per kategori saja"""
+    if isinstance(s.dtype, pd.CategoricalDtype):
+        hits = s.cat.categories.astype(str).str.contains(text, case=False, regex=False)
+        codes = s.cat.codes.to_numpy()
+        return np.append(np.asarray(hits, dtype=bool), False)[codes]
+    return s.astype(str).str.contains(text, case=False, regex=False, na=False).to_numpy()
+
+
+def options(df, col):
+    """Nilai unik (terurut) untuk pilihan filter; kolom kategori tanpa scan nilai"""
+    s = df[col]
+    if isinstance(s.dtype, pd.CategoricalDtype):
+        return sorted(str(c) for c in s.cat.remove_unused_categories().cat.categories)
+    return sorted(s.dropna().astype(str).unique())
+
+
+def filter_rows(df, **filters):
+    """Posisi baris yang lolos filter (untuk paging tanpa menyalin frame)"""
+    return np.flatnonzero(filter_mask(df, **filters))
+
+
+def filter_frame(df, **filters):
+    mask = filter_mask(df, **filters)
+    return df if mask.all() else df[mask]
+
+
+def page(df, page_no=1, page_size=DEFAULT_PAGE_SIZE, rows=None):
+    """Satu halaman baris (page_no mulai 1) + jumlah halaman.
+
+    rows: posisi baris hasil filter_rows(); hanya baris halaman
+    ini yang diambil dari df, frame terfilter utuh tidak pernah dibuat.
+    """
+    total = len(df) if rows is None else len(rows)
+    n_pages = max((total + page_size - 1) // page_size, 1)
+    page_no = min(max(int(page_no), 1), n_pages)
+    start = (page_no - 1) * page_size
+    if rows is None:
+        return df.iloc[start:start + page_size], n_pages
+    return df.iloc[rows[start:start + page_size]], n_pages
+
+
+def summarize(df, by):
+    """Ringkasan per grup: jumlah item & order unik plus total nilai/komisi"""
+    keys = GROUPINGS[by]
+    frame = df
+    if by == "day":
+        frame = df.assign(Tanggal=df["Waktu Pesanan"].dt.normalize())
+    grouped = frame.groupby(keys, sort=False, dropna=False, observed=True)
+    summary = grouped[list(SUM_COLUMNS)].sum().rename(columns=SUM_COLUMNS)
+    summary.insert(0, "orders", grouped["Kode Pesanan"].nunique())
+    summary.insert(0, "items", grouped.size())
+    summary = summary.reset_index()
+    if by == "day":
+        return summary.sort_values("Tanggal", ignore_index=True)
+    return summary.sort_values("purchase", ascending=False, ignore_index=True)
+
+
+def totals(df):
+    """Total keseluruhan (item, order unik, nilai/komisi) untuk baris terfilter"""
+    out = {"items": int(len(df)), "orders": int(df["Kode Pesanan"].nunique())}
+    for col, name in SUM_COLUMNS.items():
+        out[name] = float(df[col].sum())
+    return out
+
+
+def order_index(orders):
+    """order_sn → posisi di list order mentah (untuk lihat JSON satu order)"""
+    return {o.get("order_sn"): i for i, o in enumerate(orders)}
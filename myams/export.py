@@ -0,0 +1,329 @@
+"""Export laporan AMS: Excel streaming (xlsxwriter constant_memory), Parquet, CSV gzip, NDJSON.
+
+Selain writer sekali jalan (write_*), tiap format punya writer inkremental
+(*ChunkWriter) yang menerima laporan per chunk untuk pipeline streaming
+(lihat stream.py): write(df, orders) per chunk, close() di akhir.
+"""
+
+import abc
+import gzip
+import json
+
+import numpy as np
+import pandas as pd
+import xlsxwriter
+
+EXCEL_MAX_ROWS = 1048576          # batas baris Excel per sheet (termasuk header)
+DEFAULT_SHEET_NAME = "AMS Conversion"
+MAX_COLUMN_WIDTH = 50
+DATETIME_FORMAT = "yyyy-mm-dd hh:mm:ss"
+WRITE_CHUNK_ROWS = 10000          # baris yang dikonversi ke objek Python sekaligus
+
+
+def column_widths(df, max_width=MAX_COLUMN_WIDTH):
+    """Lebar kolom (teks terpanjang + 2, maks max_width) dari statistik per kolom.
+
+    Kolom teks pakai str.len() vectorized, kolom kategori cukup dari kategori
+    yang terpakai, kolom angka dari min/max, kolom datetime lebarnya tetap.
+    """
+    widths = []
+    for col in df.columns:
+        s = df[col]
+        if len(s) == 0:
+            longest = 0
+        elif isinstance(s.dtype, pd.CategoricalDtype):
+            used = s.cat.categories[np.unique(s.cat.codes[s.cat.codes >= 0])]
+            longest = used.astype(str).str.len().max() if len(used) else 0
+        elif pd.api.types.is_datetime64_any_dtype(s):
+            longest = len("2000-01-01 00:00:00")
+        elif pd.api.types.is_numeric_dtype(s) and not pd.api.types.is_bool_dtype(s):
+            longest = max(len(str(s.min())), len(str(s.max())))
+        else:
+            longest = s.dropna().astype(str).str.len().max()
+        longest = 0 if pd.isna(longest) else int(longest)
+        widths.append(min(max(longest, len(str(col))) + 2, max_width))
+    return widths
+
+
+def _cell_values(s):
+    # Kolom → list objek Python, NaN/NaT → None (ditulis sebagai sel kosong)
+    return s.astype(object).where(s.notna(), None).tolist()
+
+
+def _open_workbook(output):
+    return xlsxwriter.Workbook(output, {
+        "constant_memory": True,
+        "default_date_format": DATETIME_FORMAT,
+        "strings_to_urls": False,
+        "strings_to_formulas": False,
+    })
+
+
+def write_excel(df, output, sheet_name=DEFAULT_SHEET_NAME, max_rows_per_sheet=EXCEL_MAX_ROWS - 1):
+    """Tulis DataFrame ke xlsx baris per baris (mode constant_memory).
+
+    output bisa path atau file-like (BytesIO). Kalau baris melebihi batas Excel,
+    data dipecah ke sheet "<sheet_name> (2)", "(3)", dst.
+    """
+    workbook = _open_workbook(output)
+    header_format = workbook.add_format({"bold": True, "border": 1})
+    widths = column_widths(df)
+    headers = [str(c) for c in df.columns]
+
+    n_sheets = max(1, -(-len(df) // max_rows_per_sheet))
+    for sheet_no in range(n_sheets):
+        name = sheet_name if sheet_no == 0 else f"{sheet_name} ({sheet_no + 1})"
+        worksheet = workbook.add_worksheet(name[:31])
+        for col_idx, width in enumerate(widths):
+            worksheet.set_column(col_idx, col_idx, width)
+        worksheet.write_row(0, 0, headers, header_format)
+
+        sheet_start = sheet_no * max_rows_per_sheet
+        sheet_end = min(sheet_start + max_rows_per_sheet, len(df))
+        row_idx = 1
+        for chunk_start in range(sheet_start, sheet_end, WRITE_CHUNK_ROWS):
+            chunk = df.iloc[chunk_start:min(chunk_start + WRITE_CHUNK_ROWS, sheet_end)]
+            columns = [_cell_values(chunk[c]) for c in chunk.columns]
+            for row in zip(*columns):
+                worksheet.write_row(row_idx, 0, row)
+                row_idx += 1
+
+    workbook.close()
+
+
+# ===============================
+# FORMAT ANALITIK (PARQUET / CSV GZIP / NDJSON)
+# ===============================
+def arrow_safe(df):
+    """Kolom object campuran (mis. ID angka & teks) dijadikan teks supaya bisa ke Arrow/Parquet"""
+    out = df.copy()
+    for col in out.columns:
+        s = out[col]
+        if s.dtype == object:
+            out[col] = s.astype(str).where(s.notna(), None)
+    return out
+
+
+def write_parquet(df, output, compression="zstd"):
+    """Parquet via pyarrow dengan schema report_arrow_schema (file sama persis dengan jalur streaming)"""
+    with ParquetChunkWriter(output, compression=compression) as writer:
+        writer.write(df)
+
+
+def write_csv_gz(df, output):
+    """CSV terkompresi gzip (mtime=0 supaya hasil deterministik)"""
+    df.to_csv(output, index=False, date_format="%Y-%m-%d %H:%M:%S",
+              compression={"method": "gzip", "compresslevel": 6, "mtime": 0})
+
+
+def write_ndjson(orders, output, compress=False):
+    """Order mentah (all_orders) satu JSON per baris, ditulis streaming dari iterable"""
+    def dump(fh):
+        for order in orders:
+            fh.write(json.dumps(order, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+            fh.write(b"\n")
+
+    if isinstance(output, str):
+        with (gzip.open(output, "wb") if compress else open(output, "wb")) as fh:
+            dump(fh)
+    elif compress:
+        with gzip.GzipFile(fileobj=output, mode="wb", mtime=0) as fh:
+            dump(fh)
+    else:
+        dump(output)
+
+
+# ===============================
+# WRITER INKREMENTAL (STREAMING)
+# ===============================
+class _ChunkWriter(abc.ABC):
+    """Basis writer per chunk; bisa dipakai sebagai context manager"""
+
+    @abc.abstractmethod
+    def write(self, df, orders=None):
+        """Tulis satu chunk laporan (df) + order mentahnya"""
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class ExcelChunkWriter(_ChunkWriter):
+    """xlsx constant_memory yang diisi per chunk.
+
+    Header ditulis dari chunk pertama; lebar kolom = maksimum dari semua chunk
+    (xlsxwriter menulis <cols> saat close, jadi set_column boleh belakangan).
+    Sheet baru dibuka otomatis saat batas baris per sheet tercapai.
+    """
+
+    def __init__(self, output, sheet_name=DEFAULT_SHEET_NAME, max_rows_per_sheet=EXCEL_MAX_ROWS - 1):
+        self.workbook = _open_workbook(output)
+        self.header_format = self.workbook.add_format({"bold": True, "border": 1})
+        self.sheet_name = sheet_name
+        self.max_rows_per_sheet = max_rows_per_sheet
+        self.sheets = []
+        self.headers = None
+        self.widths = None
+        self.rows = 0
+        self._row_idx = 0
+
+    def _add_sheet(self):
+        no = len(self.sheets)
+        name = self.sheet_name if no == 0 else f"{self.sheet_name} ({no + 1})"
+        worksheet = self.workbook.add_worksheet(name[:31])
+        worksheet.write_row(0, 0, self.headers, self.header_format)
+        self.sheets.append(worksheet)
+        self._row_idx = 1
+        return worksheet
+
+    def write(self, df, orders=None):
+        if self.headers is None:
+            self.headers = [str(c) for c in df.columns]
+            self.widths = column_widths(df)
+            self._add_sheet()
+        elif len(df):
+            self.widths = [max(a, b) for a, b in zip(self.widths, column_widths(df))]
+        for chunk_start in range(0, len(df), WRITE_CHUNK_ROWS):
+            chunk = df.iloc[chunk_start:chunk_start + WRITE_CHUNK_ROWS]
+            columns = [_cell_values(chunk[c]) for c in chunk.columns]
+            worksheet = self.sheets[-1]
+            for row in zip(*columns):
+                if self._row_idx > self.max_rows_per_sheet:
+                    worksheet = self._add_sheet()
+                worksheet.write_row(self._row_idx, 0, row)
+                self._row_idx += 1
+        self.rows += len(df)
+
+    def close(self):
+        if self.workbook is None:
+            return
+        if self.headers is None:
+            self.workbook.add_worksheet(self.sheet_name[:31])
+        for worksheet in self.sheets:
+            for col_idx, width in enumerate(self.widths):
+                worksheet.set_column(col_idx, col_idx, width)
+        self.workbook.close()
+        self.workbook = None
+
+
+def report_arrow_schema(df):
+    """Schema Arrow tetap dari dtype kolom (bukan isi), supaya semua chunk seragam.
+
+    datetime → timestamp, category → dictionary teks, integer (termasuk Int64
+    nullable) → integer selebar dtype-nya, angka lain → float64, bool → bool,
+    selain itu teks. Metadata pandas ikut disimpan supaya dibaca balik dengan
+    dtype yang sama (Int64 nullable, category, string). Skema dtype laporan ada
+    di flatten.compact().
+    """
+    import pyarrow as pa
+    fields = []
+    for col in df.columns:
+        s = df[col]
+        if pd.api.types.is_datetime64_any_dtype(s):
+            typ = pa.timestamp("ns", tz=str(s.dt.tz) if s.dt.tz is not None else None)
+        elif isinstance(s.dtype, pd.CategoricalDtype):
+            typ = pa.dictionary(pa.int32(), pa.string())
+        elif pd.api.types.is_bool_dtype(s):
+            typ = pa.bool_()
+        elif pd.api.types.is_integer_dtype(s):
+            typ = pa.from_numpy_dtype(np.dtype(s.dtype.numpy_dtype if hasattr(s.dtype, "numpy_dtype") else s.dtype))
+        elif pd.api.types.is_numeric_dtype(s):
+            typ = pa.float64()
+        else:
+            typ = pa.string()
+        fields.append(pa.field(str(col), typ))
+    metadata = pa.Schema.from_pandas(df.iloc[:0], preserve_index=False).metadata
+    return pa.schema(fields).with_metadata(metadata)
+
+
+class ParquetChunkWriter(_ChunkWriter):
+    """Parquet via pyarrow.ParquetWriter, satu row group per chunk"""
+
+    def __init__(self, output, compression="zstd", schema=None):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError("Export Parquet butuh pyarrow (pip install pyarrow)")
+        self._pa, self._pq = pa, pq
+        self.output = output
+        self.compression = compression
+        self.schema = schema
+        self.writer = None
+        self.rows = 0
+
+    def write(self, df, orders=None):
+        if self.writer is None:
+            if self.schema is None:
+                self.schema = report_arrow_schema(df)
+            self.writer = self._pq.ParquetWriter(self.output, self.schema, compression=self.compression)
+        if not len(df):
+            return
+        frame = arrow_safe(df)
+        for field in self.schema:
+            if self._pa.types.is_floating(field.type):
+                frame[field.name] = pd.to_numeric(frame[field.name], errors="coerce").astype("float64")
+        table = self._pa.Table.from_pandas(frame, schema=self.schema, preserve_index=False)
+        self.writer.write_table(table)
+        self.rows += len(df)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+
+
+class CsvGzChunkWriter(_ChunkWriter):
+    """CSV gzip (mtime=0); header hanya di chunk pertama"""
+
+    def __init__(self, output, compresslevel=6):
+        self._own = isinstance(output, str)
+        raw = open(output, "wb") if self._own else output
+        self._raw = raw
+        self.fh = gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=compresslevel, mtime=0)
+        self.header = True
+        self.rows = 0
+
+    def write(self, df, orders=None):
+        text = df.to_csv(index=False, header=self.header, date_format="%Y-%m-%d %H:%M:%S")
+        self.fh.write(text.encode("utf-8"))
+        self.header = False
+        self.rows += len(df)
+
+    def close(self):
+        if self.fh is None:
+            return
+        self.fh.close()
+        if self._own:
+            self._raw.close()
+        self.fh = None
+
+
+class NdjsonChunkWriter(_ChunkWriter):
+    """Order mentah per chunk ke NDJSON (opsional gzip); DataFrame diabaikan"""
+
+    def __init__(self, output, compress=False):
+        self._own = isinstance(output, str)
+        self._raw = open(output, "wb") if self._own else output
+        self.fh = gzip.GzipFile(fileobj=self._raw, mode="wb", mtime=0) if compress else self._raw
+        self.rows = 0
+
+    def write(self, df, orders=None):
+        for order in orders or ():
+            self.fh.write(json.dumps(order, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+            self.fh.write(b"\n")
+        self.rows += len(orders or ())
+
+    def close(self):
+        if self.fh is None:
+            return
+        if self.fh is not self._raw:
+            self.fh.close()
+        if self._own:
+            self._raw.close()
+        self.fh = None
@@ -0,0 +1,217 @@
+"""Fetch engine get_conversion_report: pecah periode per window lalu tarik paralel."""
+
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+from . import dedup, shopee
+from .progress import Cancelled, FetchProgress
+
+CONVERSION_REPORT_PATH = "/api/v2/ams/get_conversion_report"
+DAY_SECONDS = 24 * 60 * 60
+
+DEFAULT_WINDOW_DAYS = 7
+DEFAULT_MAX_WORKERS = 4
+DEFAULT_PAGE_SIZE = 100
+# Putaran tarik ulang window yang jumlah ordernya tidak cocok dengan total_count
+DEFAULT_RECONCILE_ROUNDS = 2
+
+
+class WindowFetchError(Exception):
+    """Gagal menarik satu window; `orders` berisi page yang sudah sempat diambil"""
+
+    def __init__(self, window, cause, orders=None):
+        self.window = window
+        self.cause = cause
+        self.orders = orders or []
+        super().__init__(str(cause))
+
+
+def split_windows(start_ts, end_ts, window_days=DEFAULT_WINDOW_DAYS):
+    """Pecah [start_ts, end_ts] (inklusif) jadi window berurutan @ window_days hari.
+
+    start_ts biasanya jam 00:00 WIB, jadi batas window tetap jatuh di pergantian hari WIB.
+    """
+    step = max(int(window_days), 1) * DAY_SECONDS
+    windows = []
+    cur = int(start_ts)
+    while cur <= end_ts:
+        window_end = min(cur + step - 1, int(end_ts))
+        windows.append((cur, window_end))
+        cur = window_end + 1
+    return windows
+
+
+def iter_window(shop_id, access_token, start_ts, end_ts, page_size=DEFAULT_PAGE_SIZE, progress=None, stats=None):
+    """Generator page (list order) untuk satu window, ditarik sequential.
+
+    Pacing & retry per page ditangani shopee.call (rate limiter per shop).
+    progress (FetchProgress, opsional) menerima event per request/page/retry.
+    access_token boleh string atau sumber token (tokens.ShopToken): token diambil
+    ulang tiap page, dan page yang kena auth error diulang sekali setelah refresh.
+    stats (dict, opsional) diisi total_count terakhir dari API untuk rekonsiliasi.
+    Gagal → WindowFetchError (page sebelumnya sudah di-yield, `orders` kosong).
+    """
+    source = access_token if callable(getattr(access_token, "refresh", None)) else None
+    window = (start_ts, end_ts)
+    on_retry = progress.retry if progress else None
+    page_no = 1
+    auth_retried = False
+    while True:
+        params = {
+            "page_no": page_no,
+            "page_size": page_size,
+            "place_order_time_start": start_ts,
+            "place_order_time_end": end_ts,
+        }
+        if progress and progress.cancelled:
+            raise WindowFetchError(window, Cancelled())
+        try:
+            token = source.get() if source else access_token
+        except Exception as e:
+            raise WindowFetchError(window, e) from e
+        if progress:
+            progress.request_started(window)
+        sent = time.perf_counter()
+        try:
+            resp = shopee.call("GET", CONVERSION_REPORT_PATH, params=params,
+                               access_token=token, shop_id=shop_id, on_retry=on_retry)
+        except shopee.ShopeeAPIError as e:
+            if progress:
+                progress.request_failed(window)
+            if source and not auth_retried and shopee.is_auth_error(e):
+                try:
+                    source.refresh(token)
+                except Exception as refresh_err:
+                    raise WindowFetchError(window, refresh_err) from refresh_err
+                auth_retried = True
+                continue
+            raise WindowFetchError(window, e) from e
+        except Exception as e:
+            if progress:
+                progress.request_failed(window)
+            raise WindowFetchError(window, e) from e
+        auth_retried = False
+
+        data = resp.get("response") or {}
+        page = data.get("list") or []
+        if stats is not None and data.get("total_count") is not None:
+            stats["total_count"] = int(data["total_count"])
+        if progress:
+            # Latency termasuk antre rate limiter & backoff retry di shopee.call
+            progress.page_done(window, page, data, time.perf_counter() - sent)
+        if not page:
+            return
+
+        yield page
+
+        if not data.get("has_more", False):
+            return
+
+        page_no += 1
+
+
+def fetch_window(shop_id, access_token, start_ts, end_ts, page_size=DEFAULT_PAGE_SIZE, progress=None, stats=None):
+    """Tarik semua page satu window ke satu list (lihat iter_window).
+
+    WindowFetchError membawa order yang sempat ditarik di `orders`.
+    """
+    orders = []
+    try:
+        for page in iter_window(shop_id, access_token, start_ts, end_ts, page_size, progress, stats):
+            orders.extend(page)
+    except WindowFetchError as e:
+        e.orders = orders
+        raise
+    return orders
+
+
+def fetch_conversion_report(shop_id, access_token, start_ts, end_ts,
+                            window_days=DEFAULT_WINDOW_DAYS, max_workers=DEFAULT_MAX_WORKERS,
+                            page_size=DEFAULT_PAGE_SIZE, on_progress=None, poll_interval=0.25, progress=None,
+                            reconcile_rounds=DEFAULT_RECONCILE_ROUNDS):
+    """Tarik conversion report untuk seluruh periode, beberapa window sekaligus.
+
+    Return (orders, errors): orders sudah digabung urut per window, errors berisi
+    WindowFetchError untuk window yang gagal (order yang sempat ditarik tetap ikut).
+    on_progress(stats) dipanggil dari thread pemanggil, aman untuk update UI;
+    stats = FetchProgress.snapshot() (counter, throughput, ETA, page in flight).
+    """
+    windows = split_windows(start_ts, end_ts, window_days)
+    return fetch_windows(shop_id, access_token, windows, max_workers=max_workers, page_size=page_size,
+                         on_progress=on_progress, poll_interval=poll_interval, progress=progress,
+                         reconcile_rounds=reconcile_rounds)
+
+
+def mismatch_error(window, count, total):
+    """WindowFetchError untuk window yang tetap tidak cocok setelah semua putaran rekonsiliasi"""
+    return WindowFetchError(window, dedup.CountMismatch(window, count, total))
+
+
+def fetch_windows(shop_id, access_token, windows, max_workers=DEFAULT_MAX_WORKERS,
+                  page_size=DEFAULT_PAGE_SIZE, on_progress=None, poll_interval=0.25, progress=None,
+                  reconcile_rounds=DEFAULT_RECONCILE_ROUNDS):
+    """Tarik daftar window (start_ts, end_ts) secara paralel, hasil digabung urut window.
+
+    Order di-dedup per order_sn (dedup.OrderIndex); window yang order uniknya
+    < total_count ditarik ulang (maks reconcile_rounds kali), sisanya
+    dilaporkan sebagai WindowFetchError(CountMismatch). Window yang order
+    uniknya > total_count hanya dicatat di log (info).
+    """
+    progress = progress or FetchProgress()
+    progress.add_windows(len(windows))
+    if not windows:
+        return [], []
+
+    index = dedup.OrderIndex(windows)
+    totals, errors = {}, []
+    pending = list(windows)
+    for round_no in range(reconcile_rounds + 1):
+        if round_no:
+            progress.windows_refetched(len(pending))
+        results, round_errors = _run_windows(shop_id, access_token, pending, max_workers, page_size,
+                                             on_progress, poll_interval, progress, totals)
+        for window in pending:
+            merged = index.add(results[window], window)
+            if not round_no:
+                # Salinan dari tarik ulang memang duplikat, yang dihitung hanya dari paging
+                progress.duplicates_merged(merged)
+        errors.extend(round_errors)
+        pending = dedup.stale_windows(index, totals, {e.window for e in errors})
+        if not pending:
+            break
+    else:
+        errors.extend(mismatch_error(w, index.count(w), totals[w]) for w in pending)
+    dedup.log_overshoot(dedup.overshoot_windows(index, totals, {e.window for e in errors}),
+                        index.count, totals, shop_id)
+
+    errors.sort(key=lambda e: e.window)
+    return index.orders(), errors
+
+
+def _run_windows(shop_id, access_token, windows, max_workers, page_size, on_progress, poll_interval,
+                 progress, totals):
+    # Satu putaran paralel: window → orders (termasuk order parsial window gagal)
+    results = {}
+    errors = []
+    workers = max(1, min(int(max_workers), len(windows)))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ams-fetch") as pool:
+        futures = {}
+        for window in windows:
+            stats = {}
+            fut = pool.submit(fetch_window, shop_id, access_token, window[0], window[1], page_size, progress, stats)
+            futures[fut] = (window, stats)
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, timeout=poll_interval, return_when=FIRST_COMPLETED)
+            for fut in done:
+                window, stats = futures[fut]
+                try:
+                    results[window] = fut.result()
+                except WindowFetchError as e:
+                    results[window] = e.orders
+                    errors.append(e)
+                totals[window] = stats.get("total_count")
+                progress.window_done(window)
+            if on_progress:
+                on_progress(progress.snapshot())
+    return results, errors
@@ -0,0 +1,356 @@
+"""Flatten order conversion → DataFrame laporan AMS.
+
+Kolom dibangun langsung per kolom (bukan satu dict per item): field level order
+diambil sekali per order lalu di-broadcast ke item lewat index order, konversi
+angka / mapping status / persen dikerjakan vectorized di pandas/NumPy.
+
+Frame memakai skema dtype ringkas (lihat SKEMA): kategori untuk enum & nama
+yang berulang, Int64/int32 untuk ID & jumlah, float untuk uang & persen,
+datetime64 untuk waktu.
+"""
+
+import numpy as np
+import pandas as pd
+
+from . import categories, commission, instrument
+
+WIB_TZ = "Asia/Jakarta"
+
+# ===============================
+# MAPPING
+# ===============================
+STATUS_MAPPING = {
+    "Completed": "Selesai",
+    "Cancelled": "Dibatalkan",
+    "To Confirm": "Belum Dibayar",
+    "To Ship": "Sedang Diproses",
+    "Shipping": "Dikirim",
+    "To Receive": "Dikirim",
+    "Unpaid": "Belum Dibayar"
+}
+
+VERIFIED_STATUS_MAPPING = {
+    "Valid": "Terverifikasi",
+    "Invalid": "Tidak Valid",
+    "Pending": "Belum Diverifikasi",
+    "Processing": "Sedang Diproses"
+}
+
+ORDER_TYPE_MAPPING = {
+    "Direct Order": "Pesanan Langsung",
+    "Indirect Order": "Pesanan Tidak Langsung"
+}
+
+NOTES_MAPPING = {
+    "Completed": "",
+    "To Confirm": "Pesanan ini belum dibayar. Menunggu Pembeli untuk menyelesaikan pembayaran.",
+    "To Ship": "Status produk ini sedang ditinjau. Komisi hanya akan dibayarkan ketika pesanan selesai.",
+    "Shipping": "Pesanan sedang dikirim.",
+    "Cancelled": "Pesanan dibatalkan."
+}
+
+CAMPAIGN_TYPE_MAPPING = {
+    "Seller Open Campaign": "Komisi XTRA Produk Penjual",
+    "Open Campaign": "Komisi XTRA",
+    "Live Campaign": "Komisi Live"
+}
+
+# Urutan kolom laporan
+DESIRED_COLUMNS = [
+    "Kode Pesanan", "Status Pesanan", "Status Terverifikasi", "Waktu Pesanan",
+    "Waktu Pesanan Selesai", "Waktu Pesanan Terverifikasi", "Kode Produk",
+    "Nama Produk", "ID Model", "L1 Kategori Global", "L2 Kategori Global",
+    "L3 Kategori Global", "Kode Promo", "Harga(Rp)", "Jumlah", "Nama Affiliate",
+    "Username Affiliate", "MCN Terhubung", "ID Komisi Pesanan", "Partner Promo",
+    "Jenis Promo", "Nilai Pembelian(Rp)", "Jumlah Pengembalian(Rp)", "Tipe Pesanan",
+    "Estimasi Komisi per Produk(Rp)", "Estimasi Komisi Affiliate per Produk(Rp)",
+    "Persentase Komisi Affiliate per Produk", "Estimasi Komisi MCN per Produk(Rp)",
+    "Persentase Komisi MCN per Produk", "Estimasi Komisi per Pesanan(Rp)",
+    "Estimasi Komisi Affiliate per Pesanan(Rp)", "Estimasi Komisi MCN per Pesanan(Rp)",
+    "Catatan Produk", "Platform", "Pengeluaran(Rp)", "Status Pemotongan",
+    "Metode Pemotongan", "Waktu Pemotongan"
+]
+
+# Kolom waktu: datetime64 jam lokal WIB (tanpa tz supaya bisa langsung ke Excel)
+DATETIME_COLUMNS = [
+    "Waktu Pesanan", "Waktu Pesanan Selesai", "Waktu Pesanan Terverifikasi", "Waktu Pemotongan"
+]
+
+NUMERIC_COLUMNS = [
+    'Harga(Rp)', 'Jumlah', 'Nilai Pembelian(Rp)', 'Jumlah Pengembalian(Rp)',
+    'Estimasi Komisi per Produk(Rp)', 'Estimasi Komisi Affiliate per Produk(Rp)',
+    'Persentase Komisi Affiliate per Produk', 'Estimasi Komisi MCN per Produk(Rp)',
+    'Persentase Komisi MCN per Produk', 'Estimasi Komisi per Pesanan(Rp)',
+    'Estimasi Komisi Affiliate per Pesanan(Rp)', 'Estimasi Komisi MCN per Pesanan(Rp)',
+    'Pengeluaran(Rp)'
+]
+
+# ===============================
+# SKEMA
+# ===============================
+# Enum hasil mapping & teks yang berulang antar item → category
+CATEGORY_COLUMNS = [
+    "Status Pesanan", "Status Terverifikasi", "Nama Produk", "L1 Kategori Global",
+    "L2 Kategori Global", "L3 Kategori Global", "Nama Affiliate", "Username Affiliate",
+    "MCN Terhubung", "Partner Promo", "Jenis Promo", "Tipe Pesanan", "Catatan Produk",
+    "Platform", "Status Pemotongan", "Metode Pemotongan"
+]
+# ID numerik Shopee → Int64 (nullable, ID kosong jadi <NA>)
+ID_COLUMNS = ["Kode Produk", "ID Model"]
+# ID yang bisa berisi teks → string
+STRING_COLUMNS = ["Kode Pesanan", "Kode Promo", "ID Komisi Pesanan"]
+QUANTITY_COLUMNS = ["Jumlah"]
+# Persen dalam poin persen (12.5 = 12,5%)
+PERCENT_COLUMNS = ["Persentase Komisi Affiliate per Produk", "Persentase Komisi MCN per Produk"]
+
+
+# ===============================
+# HELPERS (VECTORIZED)
+# ===============================
+def _series(values):
+    return pd.Series(values, dtype=object)
+
+def to_wib_datetime(values):
+    """Epoch detik (UTC) → datetime64 jam WIB dalam satu pass. Kosong / 0 / invalid → NaT.
+
+    String non-angka (mis. "2024-01-01 10:00:00") di-parse sebagai jam WIB,
+    bukan diteruskan mentah sebagai teks.
+    """
+    s = _series(values)
+    epoch = pd.to_numeric(s, errors="coerce")
+    epoch = epoch.where(epoch > 0)
+    result = (
+        pd.to_datetime(epoch, unit="s", utc=True)
+        .dt.tz_convert(WIB_TZ).dt.tz_localize(None)
+        .astype("datetime64[ns]")
+    )
+
+    is_text = epoch.isna() & s.map(lambda v: isinstance(v, str) and v.strip() not in ("", "--"))
+    if is_text.any():
+        parsed = pd.to_datetime(s[is_text].astype(str), errors="coerce", format="mixed", utc=False)
+        if getattr(parsed.dt, "tz", None) is not None:
+            parsed = parsed.dt.tz_convert(WIB_TZ).dt.tz_localize(None)
+        result[is_text] = parsed.astype("datetime64[ns]")
+    return result
+
+def safe_float_array(values):
+    """Versi vectorized safe_float: None / bukan angka → 0.0"""
+    return pd.to_numeric(_series(values), errors="coerce").fillna(0.0).to_numpy(dtype=float)
+
+def percent_array(values):
+    """12.7 / "12.7%" → 12.7 (float), kosong / invalid → 0.0"""
+    s = _series(values)
+    text = s.astype(str).str.replace('%', '', regex=False).str.strip()
+    num = pd.to_numeric(text.where(s.notna()), errors="coerce")
+    return num.where(np.isfinite(num)).fillna(0.0).to_numpy(dtype=float)
+
+def to_categorical(values, mapping=None, default=None, labels=None):
+    """Kolom category; mapping.get(v, v) (atau default) dihitung sekali per nilai unik.
+
+    labels(uniques) opsional untuk mapping khusus (mis. kategori). Label selalu
+    teks supaya kategori seragam antar chunk; None tetap kosong (NaN).
+    """
+    codes, uniques = pd.factorize(_series(values), use_na_sentinel=False)
+    if labels is not None:
+        mapped = labels(uniques)
+    elif mapping is not None:
+        mapped = [mapping.get(u, u if default is None else default) for u in uniques]
+    else:
+        mapped = list(uniques)
+    mapped = [None if v is None or (isinstance(v, float) and np.isnan(v)) else str(v) for v in mapped]
+    label_cat = pd.Categorical(mapped)
+    return pd.Categorical.from_codes(label_cat.codes[codes], dtype=label_cat.dtype)
+
+def map_categories(*levels, tree=None):
+    """Kategori L1/L2/L3 dalam satu pass: ID semua level di-factorize bersama,
+    nama dicari sekali per ID unik di pohon kategori (categories.get_tree()).
+
+    Return satu Categorical per level dengan dtype yang sama.
+    """
+    tree = tree or categories.get_tree()
+    n = len(levels[0]) if levels else 0
+    cat = to_categorical([v for level in levels for v in level], labels=tree.label)
+    return [pd.Categorical.from_codes(cat.codes[i * n:(i + 1) * n], dtype=cat.dtype) for i in range(len(levels))]
+
+def coalesce(*columns):
+    """`a or b or c ...` per baris (nilai falsy dilewati)"""
+    result = _series(columns[-1])
+    for col in reversed(columns[:-1]):
+        s = _series(col)
+        result = s.where(s.astype(bool), result)
+    return result.tolist()
+
+
+# ===============================
+# FLATTEN
+# ===============================
+def flatten_orders(all_orders, pengeluaran_multiplier=commission.PENGELUARAN_MULTIPLIER, profiler=None):
+    """Flatten list order (response get_conversion_report) jadi DataFrame per item.
+
+    profiler (instrument.Profiler, opsional) mencatat tahap kolom / DataFrame / dtype.
+    """
+    with instrument.stage(profiler, "flatten.columns", rows=len(all_orders)):
+        columns = _build_columns(all_orders, pengeluaran_multiplier)
+    if columns is None:
+        return empty_report()
+
+    with instrument.stage(profiler, "flatten.dataframe") as rec:
+        df = pd.DataFrame(columns)
+        rec["rows"] = len(df)
+
+    with instrument.stage(profiler, "flatten.dtypes", rows=len(df)):
+        df = compact(df[DESIRED_COLUMNS])
+    return df
+
+
+def compact(df):
+    """Paksa skema dtype laporan (idempotent; kolom di luar skema dibiarkan).
+
+    Dipakai juga setelah concat beberapa laporan: kategori yang berbeda antar
+    frame membuat concat jatuh ke object.
+    """
+    out = {}
+    for col in df.columns:
+        s = df[col]
+        if col in CATEGORY_COLUMNS:
+            if not isinstance(s.dtype, pd.CategoricalDtype):
+                s = s.astype("category")
+        elif col in ID_COLUMNS:
+            if s.dtype != "Int64":
+                s = pd.to_numeric(s, errors="coerce").astype("Int64")
+        elif col in QUANTITY_COLUMNS:
+            if s.dtype != "int32":
+                s = pd.to_numeric(s, errors="coerce").fillna(0).astype("int32")
+        elif col in NUMERIC_COLUMNS:
+            if s.dtype != "float64":
+                s = pd.to_numeric(s, errors="coerce").fillna(0.0).astype("float64")
+        elif col in STRING_COLUMNS:
+            if not isinstance(s.dtype, pd.StringDtype):
+                s = s.astype("string")
+        elif col in DATETIME_COLUMNS:
+            if not pd.api.types.is_datetime64_any_dtype(s):
+                s = pd.to_datetime(s, errors="coerce")
+        out[col] = s
+    return pd.DataFrame(out, index=df.index)
+
+
+def empty_report():
+    """Laporan tanpa baris dengan dtype skema (schema Parquet streaming tetap sama)"""
+    columns = {}
+    for col in DESIRED_COLUMNS:
+        if col in DATETIME_COLUMNS:
+            columns[col] = pd.Series([], dtype="datetime64[ns]")
+        elif col in CATEGORY_COLUMNS:
+            columns[col] = pd.Series([], dtype=pd.CategoricalDtype(pd.Index([], dtype=object)))
+        else:
+            columns[col] = pd.Series([], dtype=object)
+    return compact(pd.DataFrame(columns))
+
+
+def _build_columns(all_orders, pengeluaran_multiplier):
+    # Kolom laporan (dict nama → array) dari list order, None kalau tidak ada item
+    item_lists = [o.get("items") or [] for o in all_orders]
+    counts = np.fromiter((len(items) for items in item_lists), dtype=np.int64, count=len(item_lists))
+    items = [item for items_ in item_lists for item in items_]
+    if not items:
+        return None
+
+    # Index order untuk tiap item (item urut per order)
+    order_idx = np.repeat(np.arange(len(all_orders)), counts)
+
+    def order_col(key):
+        # Ambil field order sekali per order, lalu broadcast ke item
+        values = [o.get(key) for o in all_orders]
+        return np.asarray(values + [None], dtype=object)[:-1][order_idx]
+
+    def order_cat(key, mapping=None, default=None):
+        # Kategori dari nilai per order (factorize per order, bukan per item), lalu broadcast
+        cat = to_categorical([o.get(key) for o in all_orders], mapping, default)
+        return pd.Categorical.from_codes(cat.codes[order_idx], dtype=cat.dtype)
+
+    def order_time_col(key):
+        # Konversi waktu sekali per order (bukan per item), lalu broadcast
+        return to_wib_datetime([o.get(key) for o in all_orders]).to_numpy()[order_idx]
+
+    def item_col(key, default=None):
+        return [item.get(key, default) for item in items]
+
+    # === KOMISI ===
+    item_commission = safe_float_array(item_col("item_brand_commission"))
+    item_commission_aff = safe_float_array(item_col("item_brand_commission_to_affiliate"))
+    item_commission_mcn = safe_float_array(item_col("item_brand_commission_to_mcn"))
+
+    def order_total(item_values, order_key):
+        # Total dari items (fallback total_* level order), hanya di item pertama
+        fallback = safe_float_array([o.get(order_key) for o in all_orders])[order_idx]
+        return commission.allocate_order_commission(order_idx, item_values, fallback)
+
+    pengeluaran = commission.compute_pengeluaran(item_commission_aff, pengeluaran_multiplier)
+    l1_category, l2_category, l3_category = map_categories(
+        item_col("l1_category_id"), item_col("l2_category_id"), item_col("l3_category_id")
+    )
+
+    # === WAKTU & STATUS (level order) ===
+    place_time = order_time_col("place_order_time")
+    completed_time = order_time_col("order_completed_time")
+    conv_time = order_time_col("conversion_completed_time")
+    is_valid = np.array([o.get("verified_status") == "Valid" for o in all_orders], dtype=bool)[order_idx]
+
+    columns = {
+        # === IDENTITAS PESANAN ===
+        "Kode Pesanan": order_col("order_sn").tolist(),
+        "Status Pesanan": order_cat("order_status", STATUS_MAPPING),
+        "Status Terverifikasi": order_cat("verified_status", VERIFIED_STATUS_MAPPING),
+        "Waktu Pesanan": place_time,
+        "Waktu Pesanan Selesai": completed_time,
+        "Waktu Pesanan Terverifikasi": conv_time,
+
+        # === DETAIL PRODUK ===
+        "Kode Produk": item_col("item_id"),
+        "Nama Produk": to_categorical(item_col("item_name")),
+        "ID Model": item_col("model_id"),
+        "L1 Kategori Global": l1_category,
+        "L2 Kategori Global": l2_category,
+        "L3 Kategori Global": l3_category,
+
+        # === PROMO & HARGA ===
+        "Kode Promo": item_col("promotion_id"),
+        "Harga(Rp)": item_col("price", 0),
+        "Jumlah": item_col("qty", 0),
+
+        # === AFFILIATE INFO ===
+        "Nama Affiliate": order_cat("affiliate_name"),
+        "Username Affiliate": order_cat("affiliate_username"),
+        "MCN Terhubung": order_cat("linked_mcn"),
+        "ID Komisi Pesanan": coalesce(
+            item_col("commission_id"), order_col("commission_id"), order_col("open_id"), order_col("affiliate_id")
+        ),
+        "Partner Promo": to_categorical(item_col("campaign_partner")),
+        "Jenis Promo": to_categorical(item_col("seller_campaign_type"), CAMPAIGN_TYPE_MAPPING),
+
+        # === FINANSIAL ===
+        "Nilai Pembelian(Rp)": item_col("purchase_value", 0),
+        "Jumlah Pengembalian(Rp)": item_col("refund_amount", 0),
+        "Tipe Pesanan": order_cat("order_type", ORDER_TYPE_MAPPING),
+
+        # === KOMISI PER PRODUK (ITEM LEVEL) ===
+        "Estimasi Komisi per Produk(Rp)": item_commission,
+        "Estimasi Komisi Affiliate per Produk(Rp)": item_commission_aff,
+        "Persentase Komisi Affiliate per Produk": percent_array(item_col("item_brand_commission_rate_to_affiliate")),
+        "Estimasi Komisi MCN per Produk(Rp)": item_commission_mcn,
+        "Persentase Komisi MCN per Produk": percent_array(item_col("item_brand_commission_rate_to_mcn")),
+
+        # === KOMISI PER PESANAN (ORDER LEVEL) ===
+        "Estimasi Komisi per Pesanan(Rp)": order_total(item_commission, "total_brand_commission"),
+        "Estimasi Komisi Affiliate per Pesanan(Rp)": order_total(item_commission_aff, "total_brand_commission_to_affiliate"),
+        "Estimasi Komisi MCN per Pesanan(Rp)": order_total(item_commission_mcn, "total_brand_commission_to_mcn"),
+
+        # === LAINNYA ===
+        "Catatan Produk": order_cat("order_status", NOTES_MAPPING, default=""),
+        "Platform": order_cat("channel"),
+        "Pengeluaran(Rp)": pengeluaran,
+        "Status Pemotongan": pd.Categorical.from_codes(is_valid.astype(np.int8), ["Menunggu Pemotongan", "Terverifikasi"]),
+        "Metode Pemotongan": pd.Categorical.from_codes(is_valid.astype(np.int8), ["", "Otomatis"]),
+        "Waktu Pemotongan": conv_time.copy(),
+    }
+    return columns
@@ -0,0 +1,105 @@
+"""Instrumentasi opt-in per tahap: wall time, baris & byte per tahap, latency per page.
+
+Dipakai lewat Profiler.stage(...) (atau stage(profiler, ...) yang jadi no-op kalau
+profiler None), jadi kode pipeline tidak berubah perilaku saat instrumentasi mati.
+report() menghasilkan dict yang bisa di-dump ke JSON untuk dibandingkan antar rilis.
+"""
+
+import contextlib
+import cProfile
+import io
+import json
+import platform
+import pstats
+import time
+
+import numpy as np
+
+PROFILE_TOP = 30
+
+
+class Profiler:
+    """Rekam tahap pipeline; profile=True ikut mengambil snapshot cProfile.
+
+    cProfile hanya melihat thread pemanggil: waktu di worker fetch tercermin
+    lewat latency per page, bukan lewat snapshot profil. Tahap boleh bersarang
+    (depth > 0); total_seconds = jumlah tahap teratas, jadi tidak ikut bertambah
+    selama laporan hanya dibuka ulang di rerun berikutnya.
+    """
+
+    def __init__(self, profile=False, clock=time.perf_counter):
+        self.clock = clock
+        self.started = clock()
+        self.stages = []
+        self.page_latencies = []
+        self.meta = {}
+        self._profile = cProfile.Profile() if profile else None
+        self._depth = 0
+
+    @contextlib.contextmanager
+    def stage(self, name, rows=None, nbytes=None):
+        """Ukur satu tahap; field rows / bytes boleh diisi belakangan lewat dict yang di-yield"""
+        record = {"stage": name, "rows": rows, "bytes": nbytes, "depth": self._depth}
+        # cProfile hanya dinyalakan / dimatikan di tahap teratas (disable di tahap dalam menghentikan tahap luar)
+        outermost = self._depth == 0
+        if self._profile and outermost:
+            self._profile.enable()
+        self._depth += 1
+        start = self.clock()
+        try:
+            yield record
+        finally:
+            record["seconds"] = self.clock() - start
+            self._depth -= 1
+            if self._profile and outermost:
+                self._profile.disable()
+            self.stages.append(record)
+
+    def add_stage(self, name, seconds, rows=None, nbytes=None):
+        """Tahap yang diukur di luar stage() (mis. tahap yang jalan di rerun berikutnya)"""
+        self.stages.append({"stage": name, "rows": rows, "bytes": nbytes, "depth": 0, "seconds": seconds})
+
+    def attach(self, progress):
+        """Kumpulkan latency tiap page dari FetchProgress"""
+        progress.latencies = self.page_latencies
+        return progress
+
+    def latency_summary(self):
+        if not self.page_latencies:
+            return None
+        lat = np.asarray(self.page_latencies, dtype=float)
+        return {
+            "pages": int(lat.size),
+            "total": float(lat.sum()),
+            "mean": float(lat.mean()),
+            "p50": float(np.percentile(lat, 50)),
+            "p95": float(np.percentile(lat, 95)),
+            "max": float(lat.max()),
+        }
+
+    def profile_text(self, top=PROFILE_TOP):
+        if not self._profile:
+            return None
+        out = io.StringIO()
+        stats = pstats.Stats(self._profile, stream=out)
+        stats.sort_stats("cumulative").print_stats(top)
+        return out.getvalue()
+
+    def report(self):
+        return {
+            "meta": dict(self.meta, python=platform.python_version()),
+            "total_seconds": sum(s["seconds"] for s in self.stages if not s["depth"]),
+            "stages": [dict(s) for s in self.stages],
+            "page_latency": self.latency_summary(),
+            "profile": self.profile_text(),
+        }
+
+    def to_json(self, indent=2):
+        return json.dumps(self.report(), indent=indent, default=str)
+
+
+def stage(profiler, name, rows=None, nbytes=None):
+    """profiler.stage(...) kalau instrumentasi aktif, selain itu context no-op"""
+    if profiler is None:
+        return contextlib.nullcontext({"stage": name, "rows": rows, "bytes": nbytes})
+    return profiler.stage(name, rows, nbytes)
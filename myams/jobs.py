@@ -0,0 +1,224 @@
+"""Runner job background untuk tarikan laporan, lepas dari rerun & sesi Streamlit.
+
+Job dikunci per key (mis. (toko, start, end)): submit key yang sama selama job
+masih antre/jalan mengembalikan job yang sudah ada. Pool thread dipakai
+bersama semua sesi (dipegang st.cache_resource), jadi beberapa user bisa
+mengantre tarikan tanpa menahan thread script; UI cukup membaca
+Job.snapshot() tiap rerun dan mengambil Job.result setelah selesai.
+
+Runner dipakai bersama, jadi satu job bisa ditunggu beberapa sesi (submit key
+yang sama mengembalikan job yang sudah ada): tiap sesi mendaftar lewat
+subscribe(), dan hasil job selesai dipegang di memori proses sampai semua
+pelanggan mengambilnya (adopt / unsubscribe) atau melewati batas history /
+byte (yang terlama dilepas dulu, job selesai terbaru tidak pernah dilepas),
+ukurannya dihitung dengan estimator result_cache.
+"""
+
+import itertools
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from .progress import FetchProgress
+from .result_cache import estimate_frame_bytes, estimate_orders_bytes
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+ACTIVE_STATUSES = {QUEUED, RUNNING}
+
+DEFAULT_WORKERS = 2
+# Job selesai yang disimpan (hasilnya bisa besar), yang terlama dibuang dulu
+DEFAULT_HISTORY = 16
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+_ids = itertools.count(1)
+
+
+class Job:
+    """Satu tarikan: status, progress (FetchProgress), hasil atau error"""
+
+    def __init__(self, key, label=None, meta=None, progress=None, clock=time.time, lock=None):
+        self.id = next(_ids)
+        self.key = key
+        self.label = label or str(key)
+        self.meta = dict(meta or {})
+        self.progress = progress or FetchProgress()
+        self.status = QUEUED
+        self.result = None
+        self.error = None
+        self.created = clock()
+        self.started = None
+        self.finished = None
+        self.future = None
+        self.nbytes = 0
+        # Sesi yang menunggu hasil job ini
+        self.subscribers = set()
+        # Lock runner: status / finished / nbytes ditulis & dibaca bersama
+        self._lock = lock or threading.Lock()
+
+    @property
+    def active(self):
+        return self.status in ACTIVE_STATUSES
+
+    def cancel(self):
+        """Batalkan job: yang masih antre tidak jalan, yang jalan berhenti di page berikutnya"""
+        self.progress.cancel()
+        if self.future is not None and self.future.cancel():
+            self.status = CANCELLED
+
+    def release(self):
+        """Lepas hasil dari memori (sudah diambil sesi / kena batas byte); status tetap"""
+        self.result = None
+        self.nbytes = 0
+
+    def snapshot(self):
+        with self._lock:
+            snap = {
+                "id": self.id,
+                "key": self.key,
+                "label": self.label,
+                "status": self.status,
+                "created": self.created,
+                "started": self.started,
+                "finished": self.finished,
+                "error": str(self.error) if self.error else None,
+                "released": self.status == DONE and self.result is None,
+            }
+        snap["progress"] = self.progress.snapshot()
+        return snap
+
+
+class JobRunner:
+    """Pool thread + daftar job per key"""
+
+    def __init__(self, max_workers=DEFAULT_WORKERS, history=DEFAULT_HISTORY, max_bytes=DEFAULT_MAX_BYTES,
+                 clock=time.time):
+        self.history = history
+        self.max_bytes = max_bytes
+        self.clock = clock
+        self._pool = ThreadPoolExecutor(max_workers=max(1, int(max_workers)), thread_name_prefix="ams-job")
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, key, fn, *args, label=None, meta=None, progress=None, **kwargs):
+        """Antrekan fn(*args, progress=job.progress, **kwargs); return Job (yang lama kalau masih aktif)"""
+        with self._lock:
+            job = self._jobs.get(key)
+            if job is not None and job.active:
+                return job
+            job = Job(key, label=label, meta=meta, progress=progress, clock=self.clock, lock=self._lock)
+            self._jobs[key] = job
+            self._jobs.move_to_end(key)
+            job.future = self._pool.submit(self._run, job, fn, args, kwargs)
+            self._prune()
+        return job
+
+    def _run(self, job, fn, args, kwargs):
+        if job.progress.cancelled:
+            job.status = CANCELLED
+            return
+        with self._lock:
+            job.status = RUNNING
+            job.started = self.clock()
+        result, error = None, None
+        try:
+            result = fn(*args, progress=job.progress, **kwargs)
+        except Exception as e:
+            error = e
+        nbytes = result_bytes(result)
+        # Status akhir terbit bersama finished / nbytes (snapshot tidak pernah melihat DONE tanpa finished)
+        with self._lock:
+            job.result, job.error, job.nbytes = result, error, nbytes
+            job.finished = self.clock()
+            if error is not None:
+                job.status = FAILED
+            else:
+                job.status = CANCELLED if job.progress.cancelled else DONE
+            self._prune()
+
+    def _prune(self):
+        finished = [(k, j) for k, j in self._jobs.items() if not j.active]
+        excess = max(len(finished) - self.history, 0)
+        for key, _ in finished[:excess]:
+            del self._jobs[key]
+        finished = finished[excess:]
+        # Batas byte: hasil job selesai terlama dilepas dulu, yang terbaru selalu dipegang
+        total = sum(j.nbytes for _, j in finished)
+        for _, job in finished[:-1]:
+            if total <= self.max_bytes:
+                break
+            total -= job.nbytes
+            job.release()
+
+    @property
+    def nbytes(self):
+        with self._lock:
+            return sum(j.nbytes for j in self._jobs.values())
+
+    def get(self, key):
+        with self._lock:
+            return self._jobs.get(key)
+
+    def jobs(self, keys=None):
+        """Job (terbaru dulu), opsional hanya untuk key tertentu"""
+        with self._lock:
+            jobs = list(self._jobs.values())
+        if keys is not None:
+            keys = set(keys)
+            jobs = [j for j in jobs if j.key in keys]
+        return jobs[::-1]
+
+    def subscribe(self, job, subscriber):
+        """Daftarkan sesi sebagai penunggu hasil job (hasil dipegang sampai semua pelanggan mengambilnya)"""
+        with self._lock:
+            job.subscribers.add(subscriber)
+
+    def unsubscribe(self, job, subscriber):
+        """Sesi tidak menunggu lagi; hasil dilepas kalau job selesai dan tidak ada pelanggan tersisa"""
+        with self._lock:
+            job.subscribers.discard(subscriber)
+            if not job.subscribers and not job.active:
+                job.release()
+
+    def adopt(self, job, subscriber):
+        """Ambil hasil job untuk disimpan sesi (ResultCache); dilepas dari runner setelah pelanggan terakhir.
+
+        Hasil dibagi apa adanya ke semua pelanggan, jadi jangan diubah di tempat.
+        """
+        with self._lock:
+            result = job.result
+            job.subscribers.discard(subscriber)
+            if not job.subscribers:
+                job.release()
+        return result
+
+    def cancel(self, key):
+        job = self.get(key)
+        if job is not None and job.active:
+            job.cancel()
+        return job
+
+    def discard(self, key):
+        """Lupakan job yang sudah selesai (hasilnya ikut dilepas)"""
+        with self._lock:
+            job = self._jobs.get(key)
+            if job is not None and not job.active:
+                del self._jobs[key]
+
+    def shutdown(self, wait=True):
+        for job in self.jobs():
+            if job.active:
+                job.cancel()
+        self._pool.shutdown(wait=wait)
+
+
+def result_bytes(result):
+    """Perkiraan memori hasil job (order mentah + DataFrame kalau ada)"""
+    if not isinstance(result, dict):
+        return 0
+    orders = result.get("orders")
+    return (estimate_orders_bytes(orders) if isinstance(orders, list) else 0) + estimate_frame_bytes(result.get("df"))
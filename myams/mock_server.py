@@ -0,0 +1,342 @@
+"""Server tiruan Shopee AMS untuk uji offline & benchmark (tanpa hit API live).
+
+Melayani get_conversion_report (paging, has_more, total_count), get_category dan
+endpoint auth (token/get, access_token/get). Order dibangkitkan deterministik dari index
+(seed + posisi waktu), jadi tidak ada yang disimpan di memori dan ukuran data
+bisa dinaikkan sampai jutaan item. Latency, error server dan throttle bisa diatur.
+
+    python -m myams.mock_server --port 8765 --orders-per-day 500 --latency 0.02
+    SHOPEE_BASE_URL=http://127.0.0.1:8765 python -m myams pull --shop ...
+"""
+
+import argparse
+import itertools
+import json
+import math
+import random
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from .categories import CATEGORY_PATH
+from .fetcher import CONVERSION_REPORT_PATH, DAY_SECONDS
+from .tokens import ACCESS_TOKEN_TTL, REFRESH_PATH
+
+TOKEN_GET_PATH = "/api/v2/auth/token/get"
+DEFAULT_PORT = 8765
+MAX_PAGE_SIZE = 100
+
+ORDER_STATUSES = ["Completed", "Completed", "Completed", "To Ship", "Shipping", "To Confirm", "Cancelled"]
+VERIFIED_STATUSES = {"Completed": "Valid", "Cancelled": "Invalid"}
+ORDER_TYPES = ["Direct Order", "Indirect Order"]
+CAMPAIGN_TYPES = ["Seller Open Campaign", "Open Campaign", "Live Campaign", ""]
+CHANNELS = ["Shopee Video", "Shopee Live", "Media Sosial", "Lainnya"]
+CATEGORY_IDS = [(100643, 100777, 101564), (100630, 100012, 100150), (100017, 100240, 101010)]
+CATEGORY_NAMES = {
+    100643: "Buku & Majalah", 100777: "Buku Bacaan", 101564: "Agama & Filsafat",
+    100630: "Kesehatan", 100012: "Suplemen Makanan", 100150: "Vitamin & Mineral",
+    100017: "Fashion Muslim", 100240: "Pakaian Muslim Wanita", 101010: "Gamis",
+}
+
+
+class MockConfig:
+    """Bentuk data & perilaku server tiruan"""
+
+    def __init__(self, orders_per_day=200, items_per_order=(1, 3), n_affiliates=500, latency=0.0,
+                 error_rate=0.0, throttle_rate=0.0, token_ttl=None, shift_rate=0.0, seed=7):
+        self.orders_per_day = orders_per_day
+        self.items_per_order = items_per_order
+        self.n_affiliates = n_affiliates
+        self.latency = latency
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        # None → access token apa pun diterima; angka → hanya token terbitan server yang belum expired
+        self.token_ttl = token_ttl
+        # Peluang page bergeser ±1..3 order (order berubah saat paging → duplikat / terlewat)
+        self.shift_rate = shift_rate
+        self.seed = seed
+
+
+# ===============================
+# DATA SINTETIS
+# ===============================
+def order_range(start_ts, end_ts, config):
+    """Index order yang place_order_time-nya jatuh di [start_ts, end_ts]"""
+    spacing = DAY_SECONDS / config.orders_per_day
+    first = math.ceil(int(start_ts) / spacing)
+    last = math.floor(int(end_ts) / spacing)
+    return range(first, max(first, last + 1))
+
+
+def _percent(rng):
+    return f"{rng.choice([2, 3, 5, 7.5, 10, 12, 15])}%"
+
+
+def generate_order(k, config):
+    """Satu order (dengan items) berbentuk seperti response get_conversion_report"""
+    rng = random.Random(config.seed * 1_000_003 + k)
+    place_time = int(k * DAY_SECONDS / config.orders_per_day)
+    status = rng.choice(ORDER_STATUSES)
+    verified = VERIFIED_STATUSES.get(status, rng.choice(["Pending", "Processing"]))
+    affiliate = rng.randrange(config.n_affiliates)
+
+    items = []
+    lo, hi = config.items_per_order
+    for n in range(rng.randint(lo, hi)):
+        price = rng.randrange(10, 500) * 1000
+        qty = rng.randint(1, 3)
+        purchase = price * qty
+        commission = round(purchase * rng.choice([0.05, 0.1, 0.15]))
+        to_mcn = round(commission * rng.choice([0, 0, 0.1]))
+        l1, l2, l3 = rng.choice(CATEGORY_IDS)
+        items.append({
+            "item_id": 20_000_000_000 + rng.randrange(50_000),
+            "item_name": f"Produk {rng.randrange(50_000)}",
+            "model_id": 100_000_000_000 + rng.randrange(1_000_000),
+            "l1_category_id": l1,
+            "l2_category_id": l2,
+            "l3_category_id": l3,
+            "promotion_id": str(rng.randrange(1_000_000)) if rng.random() < 0.3 else "",
+            "price": str(price),
+            "qty": qty,
+            "purchase_value": str(purchase),
+            "refund_amount": "0" if status != "Cancelled" else str(purchase),
+            "item_brand_commission": str(commission),
+            "item_brand_commission_to_affiliate": str(commission - to_mcn),
+            "item_brand_commission_to_mcn": str(to_mcn),
+            "item_brand_commission_rate_to_affiliate": _percent(rng),
+            "item_brand_commission_rate_to_mcn": _percent(rng) if to_mcn else "0%",
+            "commission_id": f"{k}{n:02d}",
+            "campaign_partner": f"Partner {rng.randrange(50)}" if rng.random() < 0.2 else "",
+            "seller_campaign_type": rng.choice(CAMPAIGN_TYPES),
+        })
+
+    order = {
+        "order_sn": f"{240101 + k // 100_000:06d}{k:08d}",
+        "order_status": status,
+        "verified_status": verified,
+        "place_order_time": place_time,
+        "order_completed_time": place_time + 3 * DAY_SECONDS if status == "Completed" else 0,
+        "conversion_completed_time": place_time + 10 * DAY_SECONDS if verified == "Valid" else 0,
+        "affiliate_id": 1_000_000 + affiliate,
+        "affiliate_name": f"Affiliate {affiliate}",
+        "affiliate_username": f"aff_{affiliate}",
+        "linked_mcn": f"MCN {affiliate % 20}" if affiliate % 3 == 0 else "",
+        "order_type": rng.choice(ORDER_TYPES),
+        "channel": rng.choice(CHANNELS),
+        "items": items,
+    }
+    for key in ("item_brand_commission", "item_brand_commission_to_affiliate", "item_brand_commission_to_mcn"):
+        order[key.replace("item_", "total_")] = str(sum(int(i[key]) for i in items))
+    return order
+
+
+def generate_orders(start_ts, end_ts, config):
+    """Semua order periode sekaligus (untuk benchmark tanpa HTTP)"""
+    return [generate_order(k, config) for k in order_range(start_ts, end_ts, config)]
+
+
+# ===============================
+# SERVER
+# ===============================
+class _Handler(BaseHTTPRequestHandler):
+    server_version = "MockShopee/1.0"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, body, status=200):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _error(self, error, message, status=200):
+        self._reply({"request_id": self.server.request_id(), "error": error, "message": message}, status)
+
+    def _route(self, method):
+        url = urllib.parse.urlsplit(self.path)
+        query = dict(urllib.parse.parse_qsl(url.query))
+        body = {}
+        if method == "POST":
+            length = int(self.headers.get("Content-Length") or 0)
+            body = json.loads(self.rfile.read(length) or b"{}")
+
+        mock = self.server.mock
+        config = mock.config
+        if config.latency:
+            time.sleep(config.latency)
+        if not query.get("partner_id") or not query.get("sign"):
+            return self._error("error_param", "partner_id / sign kosong")
+
+        roll = mock.roll()
+        if roll < config.throttle_rate:
+            return self._error("error_too_many_request", "Too many requests", status=429)
+        if roll < config.throttle_rate + config.error_rate:
+            return self._error("error_server", "Mock server error", status=500)
+
+        if method == "POST" and url.path == TOKEN_GET_PATH:
+            return self._reply(mock.issue_token(body.get("shop_id")))
+        if method == "POST" and url.path == REFRESH_PATH:
+            if not mock.use_refresh_token(body.get("refresh_token")):
+                return self._error("error_auth", "Invalid refresh_token.")
+            return self._reply(mock.issue_token(body.get("shop_id")))
+        if method == "GET" and url.path in (CATEGORY_PATH, CONVERSION_REPORT_PATH):
+            if not mock.token_valid(query.get("access_token")):
+                return self._error("invalid_acceess_token", "Invalid access_token.")
+            if url.path == CATEGORY_PATH:
+                return self._reply(mock.category_list())
+            return self._reply(mock.conversion_page(query))
+        return self._error("error_not_found", f"{method} {url.path} tidak ada di mock", status=404)
+
+    def do_GET(self):
+        self._route("GET")
+
+    def do_POST(self):
+        self._route("POST")
+
+
+class MockShopeeServer:
+    """ThreadingHTTPServer di thread background; dipakai sebagai context manager"""
+
+    def __init__(self, config=None, host="127.0.0.1", port=0):
+        self.config = config or MockConfig()
+        self._rng = random.Random(self.config.seed)
+        self._lock = threading.Lock()
+        self._counter = itertools.count(1)
+        self._access = {}
+        self._refresh = set()
+        self.httpd = ThreadingHTTPServer((host, port), _Handler)
+        self.httpd.daemon_threads = True
+        self.httpd.mock = self
+        self.httpd.request_id = lambda: f"mock-{next(self._counter)}"
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def roll(self):
+        with self._lock:
+            return self._rng.random()
+
+    def page_shift(self):
+        with self._lock:
+            if self._rng.random() >= self.config.shift_rate:
+                return 0
+            return self._rng.choice([-3, -2, -1, 1, 2, 3])
+
+    def issue_token(self, shop_id):
+        n = next(self._counter)
+        ttl = self.config.token_ttl or ACCESS_TOKEN_TTL
+        access, refresh = f"mock-access-{n}", f"mock-refresh-{n}"
+        with self._lock:
+            self._access[access] = time.time() + ttl
+            self._refresh.add(refresh)
+        return {"request_id": f"mock-{n}", "error": "", "message": "", "access_token": access,
+                "refresh_token": refresh, "expire_in": ttl, "shop_id": shop_id}
+
+    def use_refresh_token(self, token):
+        # Refresh token sekali pakai, seperti di Shopee
+        with self._lock:
+            if self.config.token_ttl is None:
+                return bool(token)
+            if token in self._refresh:
+                self._refresh.discard(token)
+                return True
+            return False
+
+    def token_valid(self, token):
+        if not token:
+            return False
+        if self.config.token_ttl is None:
+            return True
+        with self._lock:
+            return self._access.get(token, 0) > time.time()
+
+    def category_list(self):
+        records = {}
+        for path in CATEGORY_IDS:
+            for depth, category_id in enumerate(path):
+                records[category_id] = {
+                    "category_id": category_id,
+                    "parent_category_id": path[depth - 1] if depth else 0,
+                    "original_category_name": CATEGORY_NAMES[category_id],
+                    "display_category_name": CATEGORY_NAMES[category_id],
+                    "has_children": depth < len(path) - 1,
+                }
+        return {"request_id": self.httpd.request_id(), "error": "", "message": "",
+                "response": {"category_list": list(records.values())}}
+
+    def conversion_page(self, query):
+        page_no = max(int(query.get("page_no", 1)), 1)
+        page_size = min(max(int(query.get("page_size", MAX_PAGE_SIZE)), 1), MAX_PAGE_SIZE)
+        indices = order_range(query.get("place_order_time_start", 0), query.get("place_order_time_end", 0),
+                              self.config)
+        offset = max((page_no - 1) * page_size + (self.page_shift() if page_no > 1 else 0), 0)
+        chunk = indices[offset: offset + page_size]
+        return {
+            "request_id": self.httpd.request_id(),
+            "error": "",
+            "message": "",
+            "response": {
+                "list": [generate_order(k, self.config) for k in chunk],
+                "has_more": page_no * page_size < len(indices),
+                "total_count": len(indices),
+                "page_no": page_no,
+            },
+        }
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="mock-shopee", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m myams.mock_server", description="Server tiruan Shopee AMS")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--orders-per-day", type=int, default=200)
+    parser.add_argument("--items-per-order", type=int, nargs=2, default=(1, 3), metavar=("MIN", "MAX"))
+    parser.add_argument("--affiliates", type=int, default=500)
+    parser.add_argument("--latency", type=float, default=0.0, help="detik per request")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="peluang error_server (HTTP 500)")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="peluang HTTP 429")
+    parser.add_argument("--token-ttl", type=int, help="aktifkan validasi token dengan umur token (detik)")
+    parser.add_argument("--shift-rate", type=float, default=0.0, help="peluang page bergeser (duplikat/terlewat)")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args(argv)
+
+    config = MockConfig(
+        orders_per_day=args.orders_per_day, items_per_order=tuple(args.items_per_order),
+        n_affiliates=args.affiliates, latency=args.latency, error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate, token_ttl=args.token_ttl, shift_rate=args.shift_rate, seed=args.seed,
+    )
+    server = MockShopeeServer(config, args.host, args.port)
+    print(f"Mock Shopee AMS di {server.url} (Ctrl+C untuk berhenti)")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,50 @@
+"""Periode laporan: preset tanggal & konversi tanggal WIB → epoch untuk API Shopee."""
+
+from datetime import datetime as dt, timedelta, time as dt_time
+
+import pytz
+
+WIB = pytz.timezone('Asia/Jakarta')
+UTC = pytz.UTC
+
+PRESETS = ["Custom Range", "Hari Ini", "Kemarin", "7 Hari Terakhir", "30 Hari Terakhir", "Bulan Ini", "Bulan Lalu"]
+
+
+def today_wib():
+    return dt.now(WIB).date()
+
+
+def resolve_preset(preset, today=None):
+    """(start_date, end_date) untuk preset; None kalau Custom Range / tidak dikenal"""
+    today = today or today_wib()
+    if preset == "Hari Ini":
+        return today, today
+    if preset == "Kemarin":
+        return today - timedelta(days=1), today - timedelta(days=1)
+    if preset == "7 Hari Terakhir":
+        return today - timedelta(days=7), today
+    if preset == "30 Hari Terakhir":
+        return today - timedelta(days=30), today
+    if preset == "Bulan Ini":
+        return today.replace(day=1), today
+    if preset == "Bulan Lalu":
+        end_date = today.replace(day=1) - timedelta(days=1)
+        return end_date.replace(day=1), end_date
+    return None
+
+
+def to_ts(d, end=False):
+    """Tanggal (WIB) → epoch UTC; end=True → jam 23:59:59"""
+    dt_obj = dt.combine(d, dt_time(23, 59, 59) if end else dt_time(0, 0, 0))
+    # Localize ke WIB kemudian convert ke UTC
+    return int(WIB.localize(dt_obj).astimezone(UTC).timestamp())
+
+
+def date_range_ts(start_date, end_date):
+    return to_ts(start_date), to_ts(end_date, end=True)
+
+
+def previous_period(start_date, end_date):
+    """Periode dengan panjang sama tepat sebelum [start_date, end_date]"""
+    days = (end_date - start_date).days + 1
+    return start_date - timedelta(days=days), start_date - timedelta(days=1)
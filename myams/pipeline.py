@@ -0,0 +1,260 @@
+"""Pipeline fetch → flatten → export tanpa Streamlit (dipakai CLI / worker terjadwal)."""
+
+import os
+
+import pandas as pd
+
+from . import commission, export, fetcher, flatten, instrument, periods, rollup, scheduler, stream, sync
+
+SHOP_COLUMN = "Toko"
+
+# Format output: ekstensi file → writer
+FORMATS = {
+    "xlsx": lambda df, orders, out: export.write_excel(df, out),
+    "parquet": lambda df, orders, out: export.write_parquet(df, out),
+    "csv.gz": lambda df, orders, out: export.write_csv_gz(df, out),
+    "ndjson.gz": lambda df, orders, out: export.write_ndjson(orders, out, compress=True),
+}
+
+# Writer inkremental per format untuk run_pull_streaming
+STREAM_WRITERS = {
+    "xlsx": lambda out: export.ExcelChunkWriter(out),
+    "parquet": lambda out: export.ParquetChunkWriter(out),
+    "csv.gz": lambda out: export.CsvGzChunkWriter(out),
+    "ndjson.gz": lambda out: export.NdjsonChunkWriter(out, compress=True),
+}
+
+
+def pull_orders(shop_id, access_token, start_date, end_date, store=None,
+                window_days=fetcher.DEFAULT_WINDOW_DAYS, max_workers=fetcher.DEFAULT_MAX_WORKERS,
+                on_progress=None):
+    """Tarik order periode [start_date, end_date] (WIB); pakai sync store kalau diberikan.
+
+    Return (orders, errors).
+    """
+    start_ts, end_ts = periods.date_range_ts(start_date, end_date)
+    if store is not None:
+        orders, errors, _ = sync.sync_conversion_orders(
+            store, shop_id, access_token, start_ts, end_ts,
+            window_days=window_days, max_workers=max_workers, on_progress=on_progress
+        )
+        return orders, errors
+    return fetcher.fetch_conversion_report(
+        shop_id, access_token, start_ts, end_ts,
+        window_days=window_days, max_workers=max_workers, on_progress=on_progress
+    )
+
+
+def pull_many(tokens, start_date, end_date, store=None, window_days=fetcher.DEFAULT_WINDOW_DAYS,
+              max_workers=scheduler.DEFAULT_TOTAL_WORKERS, per_shop_workers=scheduler.DEFAULT_PER_SHOP_WORKERS,
+              per_shop_rate=None, on_progress=None):
+    """Tarik banyak shop sekaligus lewat scheduler bersama.
+
+    tokens: baris shopee_tokens atau TokenCache.token(). Return dict shop_name → (orders, errors).
+    """
+    tokens = list(tokens)
+    start_ts, end_ts = periods.date_range_ts(start_date, end_date)
+    plans, jobs = {}, []
+    for token in tokens:
+        if store is not None:
+            plan = plans[token["shop_name"]] = sync.plan_sync(
+                store, token["shop_id"], start_ts, end_ts, window_days=window_days
+            )
+            windows = plan["windows"]
+        else:
+            windows = fetcher.split_windows(start_ts, end_ts, window_days)
+        jobs.append({"shop_name": token["shop_name"], "shop_id": token["shop_id"],
+                     "access_token": token["access_token"], "windows": windows})
+
+    fetched = scheduler.fetch_shops(jobs, max_workers=max_workers, per_shop_workers=per_shop_workers,
+                                    per_shop_rate=per_shop_rate, on_progress=on_progress)
+    pulled = {}
+    for token in tokens:
+        orders, errors = fetched[token["shop_name"]]
+        if store is not None:
+            orders, _ = sync.apply_sync(store, token["shop_id"], plans[token["shop_name"]], orders, errors)
+        pulled[token["shop_name"]] = (orders, errors)
+    return pulled
+
+
+def pull_report(token, start_date, end_date, store=None, rollup_store=None,
+                pengeluaran_multiplier=commission.PENGELUARAN_MULTIPLIER, window_days=fetcher.DEFAULT_WINDOW_DAYS,
+                max_workers=fetcher.DEFAULT_MAX_WORKERS, on_progress=None, progress=None, profiler=None):
+    """Tarik + flatten + rollup satu shop, hasil dipegang di memori (UI Tab 6 / job background).
+
+    Return dict orders, df, errors, sync_info (None kalau tanpa sync store) dan
+    rollup_error (pesan kalau update rollup gagal; laporan tetap dikembalikan).
+    Tidak menyentuh Streamlit, jadi aman dijalankan di thread lain.
+    """
+    start_ts, end_ts = periods.date_range_ts(start_date, end_date)
+    sync_info = None
+    with instrument.stage(profiler, "fetch") as fetch_stage:
+        if store is not None:
+            orders, errors, sync_info = sync.sync_conversion_orders(
+                store, token["shop_id"], token["access_token"], start_ts, end_ts,
+                window_days=window_days, max_workers=max_workers, on_progress=on_progress, progress=progress
+            )
+        else:
+            orders, errors = fetcher.fetch_conversion_report(
+                token["shop_id"], token["access_token"], start_ts, end_ts,
+                window_days=window_days, max_workers=max_workers, on_progress=on_progress, progress=progress
+            )
+        fetch_stage["rows"] = len(orders)
+
+    df = flatten.flatten_orders(orders, pengeluaran_multiplier=pengeluaran_multiplier, profiler=profiler)
+    rollup_error = None
+    if rollup_store is not None and orders:
+        with instrument.stage(profiler, "rollup.update", rows=len(df)):
+            try:
+                rollup.update_rollup(rollup_store, token["shop_id"], df, start_date, end_date, errors)
+            except Exception as e:
+                rollup_error = str(e)
+    return {"orders": orders, "df": df, "errors": errors, "sync_info": sync_info, "rollup_error": rollup_error}
+
+
+def build_report(orders, pengeluaran_multiplier=commission.PENGELUARAN_MULTIPLIER):
+    return flatten.flatten_orders(orders, pengeluaran_multiplier=pengeluaran_multiplier)
+
+
+def build_combined_report(orders_by_shop, pengeluaran_multiplier=commission.PENGELUARAN_MULTIPLIER):
+    """Satu laporan gabungan dengan kolom Toko (category) di depan"""
+    frames = []
+    for shop_name, orders in orders_by_shop.items():
+        df = build_report(orders, pengeluaran_multiplier)
+        if len(df):
+            df.insert(0, SHOP_COLUMN, shop_name)
+            frames.append(df)
+    if not frames:
+        df = flatten.empty_report()
+        df.insert(0, SHOP_COLUMN, pd.Categorical([]))
+        return df
+    # Kategori beda antar toko → concat jadi object/str, dipadatkan ulang
+    df = flatten.compact(pd.concat(frames, ignore_index=True))
+    df[SHOP_COLUMN] = df[SHOP_COLUMN].astype("category")
+    return df
+
+
+def report_filename(shop_name, start_date, end_date, fmt):
+    return f"AMS_{shop_name}_{start_date}_{end_date}.{fmt}"
+
+
+def export_report(df, orders, fmt, output):
+    """Tulis laporan ke path / file-like dalam format FORMATS[fmt]"""
+    if fmt not in FORMATS:
+        raise ValueError(f"Format tidak dikenal: {fmt} (pilihan: {', '.join(FORMATS)})")
+    FORMATS[fmt](df, orders, output)
+
+
+def run_pull(token, start_date, end_date, formats=("xlsx",), output_dir=".", store=None,
+             pengeluaran_multiplier=commission.PENGELUARAN_MULTIPLIER, rollup_store=None, **fetch_kwargs):
+    """Satu pull lengkap untuk satu shop (token = baris shopee_tokens), return ringkasan"""
+    orders, errors = pull_orders(token["shop_id"], token["access_token"], start_date, end_date,
+                                 store=store, **fetch_kwargs)
+    df = build_report(orders, pengeluaran_multiplier)
+    if rollup_store is not None:
+        rollup.update_rollup(rollup_store, token["shop_id"], df, start_date, end_date, errors)
+
+    os.makedirs(output_dir, exist_ok=True)
+    files = []
+    for fmt in formats:
+        path = os.path.join(output_dir, report_filename(token["shop_name"], start_date, end_date, fmt))
+        export_report(df, orders, fmt, path)
+        files.append(path)
+
+    return {
+        "shop_name": token["shop_name"],
+        "orders": len(orders),
+        "items": len(df),
+        "errors": errors,
+        "files": files,
+    }
+
+
+def run_pull_streaming(token, start_date, end_date, formats=("xlsx",), output_dir=".",
+                       pengeluaran_multiplier=commission.PENGELUARAN_MULTIPLIER, rollup_store=None,
+                       window_days=fetcher.DEFAULT_WINDOW_DAYS, max_workers=fetcher.DEFAULT_MAX_WORKERS,
+                       chunk_orders=stream.DEFAULT_CHUNK_ORDERS, progress=None, on_chunk=None, rollup_rows=False):
+    """Seperti run_pull, tapi page langsung di-flatten & ditulis per chunk (memori terbatas).
+
+    Selalu tarik dari API (sync store tidak dipakai: order mentah tidak ditahan).
+    Duplikat digabung per window; "skipped" = order yang muncul lagi di window
+    lain setelah ditulis (salinan pertama dipakai, lihat stream.PageStream).
+    rollup_rows=True → baris rollup dikembalikan di "rollup" untuk disimpan pemanggil.
+    """
+    for fmt in formats:
+        if fmt not in STREAM_WRITERS:
+            raise ValueError(f"Format tidak dikenal: {fmt} (pilihan: {', '.join(STREAM_WRITERS)})")
+    start_ts, end_ts = periods.date_range_ts(start_date, end_date)
+    pages = stream.PageStream(token["shop_id"], token["access_token"],
+                              fetcher.split_windows(start_ts, end_ts, window_days),
+                              max_workers=max_workers, progress=progress)
+
+    os.makedirs(output_dir, exist_ok=True)
+    files, writers = [], []
+    try:
+        for fmt in formats:
+            path = os.path.join(output_dir, report_filename(token["shop_name"], start_date, end_date, fmt))
+            writers.append(STREAM_WRITERS[fmt](path))
+            files.append(path)
+        totals = stream.stream_report(pages, writers, pengeluaran_multiplier, chunk_orders=chunk_orders,
+                                      with_rollup=rollup_rows or rollup_store is not None, on_chunk=on_chunk)
+    finally:
+        for writer in writers:
+            writer.close()
+
+    rows = totals.pop("rollup", None)
+    if rollup_store is not None:
+        rollup.update_rollup(rollup_store, token["shop_id"], None, start_date, end_date, pages.errors, rows=rows)
+    summary = {
+        "shop_name": token["shop_name"],
+        "orders": totals["orders"],
+        "items": totals["items"],
+        "totals": totals,
+        "errors": pages.errors,
+        "skipped": pages.skipped,
+        "files": files,
+    }
+    if rollup_rows:
+        summary["rollup"] = rows
+    return summary
+
+
+def run_pull_many(tokens, start_date, end_date, formats=("xlsx",), output_dir=".", store=None,
+                  combined=False, pengeluaran_multiplier=commission.PENGELUARAN_MULTIPLIER, rollup_store=None,
+                  **fetch_kwargs):
+    """Pull banyak shop; output per shop atau satu file gabungan (combined=True)"""
+    tokens = list(tokens)
+    pulled = pull_many(tokens, start_date, end_date, store=store, **fetch_kwargs)
+    shop_ids = {t["shop_name"]: t["shop_id"] for t in tokens}
+    os.makedirs(output_dir, exist_ok=True)
+
+    summaries, files = [], []
+    for shop_name, (orders, errors) in pulled.items():
+        summary = {"shop_name": shop_name, "orders": len(orders), "errors": errors, "files": []}
+        if not combined:
+            df = build_report(orders, pengeluaran_multiplier)
+            if rollup_store is not None:
+                rollup.update_rollup(rollup_store, shop_ids[shop_name], df, start_date, end_date, errors)
+            for fmt in formats:
+                path = os.path.join(output_dir, report_filename(shop_name, start_date, end_date, fmt))
+                export_report(df, orders, fmt, path)
+                summary["files"].append(path)
+            summary["items"] = len(df)
+        summaries.append(summary)
+
+    if combined:
+        df = build_combined_report({name: orders for name, (orders, _) in pulled.items()}, pengeluaran_multiplier)
+        all_orders = [o for orders, _ in pulled.values() for o in orders]
+        for fmt in formats:
+            path = os.path.join(output_dir, report_filename("ALL", start_date, end_date, fmt))
+            export_report(df, all_orders, fmt, path)
+            files.append(path)
+        items_by_shop = df[SHOP_COLUMN].value_counts()
+        for summary in summaries:
+            summary["items"] = int(items_by_shop.get(summary["shop_name"], 0))
+            if rollup_store is not None:
+                shop_df = df[df[SHOP_COLUMN] == summary["shop_name"]]
+                rollup.update_rollup(rollup_store, shop_ids[summary["shop_name"]], shop_df,
+                                     start_date, end_date, summary["errors"])
+
+    return {"shops": summaries, "files": files}
@@ -0,0 +1,185 @@
+"""Model progress fetch berbasis counter: O(1) per page, aman dipakai banyak thread.
+
+Satu FetchProgress mencatat request yang sedang jalan, page/order/item yang masuk,
+retry dan window selesai. snapshot() menurunkan throughput (order/item per detik),
+fraksi selesai dan ETA dari counter itu. Progress per shop bisa punya parent
+(progress gabungan) yang ikut menerima setiap event.
+"""
+
+import threading
+import time
+
+
+class Cancelled(Exception):
+    """Fetch dihentikan lewat FetchProgress.cancel() (mis. job background dibatalkan)"""
+
+    def __init__(self):
+        super().__init__("Dibatalkan")
+
+
+class FetchProgress:
+    """Counter progress untuk fetch_window / fetch_windows / scheduler"""
+
+    def __init__(self, windows_total=0, name=None, parent=None, clock=time.monotonic):
+        self.name = name
+        self.parent = parent
+        self.clock = clock
+        self.started = clock()
+        self.windows_total = 0
+        self.windows_done = 0
+        self.pages = 0
+        self.pages_in_flight = 0
+        self.orders = 0
+        self.items = 0
+        self.retries = 0
+        # Rekonsiliasi (dedup.py): salinan order yang digabung & window yang ditarik ulang
+        self.duplicates = 0
+        self.refetched = 0
+        self.latency_total = 0.0
+        # List sampel latency per page (diisi kalau instrumentasi dipasang)
+        self.latencies = None
+        # Window yang sedang jalan: key → [order_terambil, total_count atau None]
+        self._open = {}
+        self.children = {}
+        self._lock = threading.Lock()
+        self._cancel = threading.Event()
+        if windows_total:
+            self.add_windows(windows_total)
+
+    def child(self, name, windows_total=0):
+        """Progress per shop yang meneruskan event ke progress ini"""
+        sub = FetchProgress(name=name, parent=self, clock=self.clock)
+        self.children[name] = sub
+        if windows_total:
+            sub.add_windows(windows_total)
+        return sub
+
+    def _key(self, key):
+        return (self.name, key) if self.parent else key
+
+    # ===============================
+    # PEMBATALAN
+    # ===============================
+    def cancel(self):
+        """Minta fetch berhenti; dicek fetcher sebelum tiap request page"""
+        self._cancel.set()
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set() or (self.parent is not None and self.parent.cancelled)
+
+    # ===============================
+    # EVENT
+    # ===============================
+    def add_windows(self, n):
+        with self._lock:
+            self.windows_total += n
+        if self.parent:
+            self.parent.add_windows(n)
+
+    def request_started(self, key=None):
+        with self._lock:
+            self.pages_in_flight += 1
+        if self.parent:
+            self.parent.request_started(self._key(key))
+
+    def request_failed(self, key=None):
+        with self._lock:
+            self.pages_in_flight -= 1
+        if self.parent:
+            self.parent.request_failed(self._key(key))
+
+    def page_done(self, key, page, data, latency=None):
+        """Page masuk; total_count (kalau ada) dipakai untuk fraksi window yang sedang jalan"""
+        n_items = sum(len(o.get("items") or []) for o in page)
+        with self._lock:
+            if latency is not None:
+                self.latency_total += latency
+                if self.latencies is not None:
+                    self.latencies.append(latency)
+            self.pages_in_flight -= 1
+            self.pages += 1 if page else 0
+            self.orders += len(page)
+            self.items += n_items
+            entry = self._open.setdefault(key, [0, None])
+            entry[0] += len(page)
+            total = (data or {}).get("total_count")
+            if total:
+                entry[1] = int(total)
+        if self.parent:
+            self.parent.page_done(self._key(key), page, data, latency)
+
+    def retry(self, attempt=None, failure=None):
+        with self._lock:
+            self.retries += 1
+        if self.parent:
+            self.parent.retry(attempt, failure)
+
+    def duplicates_merged(self, n):
+        with self._lock:
+            self.duplicates += n
+        if self.parent:
+            self.parent.duplicates_merged(n)
+
+    def windows_refetched(self, n):
+        """Window ditarik ulang karena jumlah order tidak cocok; ikut dihitung di total"""
+        with self._lock:
+            self.refetched += n
+            self.windows_total += n
+        if self.parent:
+            self.parent.windows_refetched(n)
+
+    def window_done(self, key=None):
+        with self._lock:
+            self.windows_done += 1
+            self._open.pop(key, None)
+        if self.parent:
+            self.parent.window_done(self._key(key))
+
+    # ===============================
+    # SNAPSHOT
+    # ===============================
+    def _fraction(self):
+        if not self.windows_total:
+            return 0.0
+        partial = sum(min(got / total, 1.0) for got, total in self._open.values() if total)
+        return min((self.windows_done + partial) / self.windows_total, 1.0)
+
+    def snapshot(self):
+        """Dict counter + turunan (elapsed, rate, fraction, eta); aman untuk update UI"""
+        with self._lock:
+            elapsed = max(self.clock() - self.started, 1e-9)
+            fraction = self._fraction()
+            stats = {
+                "windows_total": self.windows_total,
+                "windows_done": self.windows_done,
+                "pages": self.pages,
+                "pages_in_flight": max(self.pages_in_flight, 0),
+                "orders": self.orders,
+                "items": self.items,
+                "retries": self.retries,
+                "duplicates": self.duplicates,
+                "refetched": self.refetched,
+                "latency_total": self.latency_total,
+                "elapsed": elapsed,
+                "orders_per_sec": self.orders / elapsed,
+                "items_per_sec": self.items / elapsed,
+                "fraction": fraction,
+                # ETA baru ada setelah sebagian kecil pekerjaan selesai
+                "eta": elapsed * (1 - fraction) / fraction if fraction > 0 else None,
+            }
+        if self.children:
+            stats["shops"] = {name: sub.snapshot() for name, sub in self.children.items()}
+        return stats
+
+
+def format_eta(seconds):
+    """ETA ringkas untuk status line: 42s / 3m05s / 1j02m, '-' kalau belum ada"""
+    if seconds is None:
+        return "-"
+    seconds = int(round(seconds))
+    if seconds < 60:
+        return f"{seconds}s"
+    if seconds < 3600:
+        return f"{seconds // 60}m{seconds % 60:02d}s"
+    return f"{seconds // 3600}j{(seconds % 3600) // 60:02d}m"
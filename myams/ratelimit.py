@@ -0,0 +1,80 @@
+"""Rate limiter token-bucket adaptif + backoff untuk request Shopee."""
+
+import random
+import threading
+import time
+
+DEFAULT_RATE = 5.0       # request per detik per key (shop)
+DEFAULT_BURST = 5
+MIN_RATE = 0.5
+RECOVERY_STEP = 0.1      # kenaikan rate per request sukses setelah throttle
+
+BACKOFF_BASE = 0.5
+BACKOFF_CAP = 30.0
+
+
+class TokenBucket:
+    """Token bucket thread-safe.
+
+    Rate dipotong setengah setiap kena throttle dan naik pelan lagi (+RECOVERY_STEP)
+    per request sukses sampai kembali ke rate awal (AIMD).
+    """
+
+    def __init__(self, rate=DEFAULT_RATE, capacity=DEFAULT_BURST, min_rate=MIN_RATE):
+        self.max_rate = float(rate)
+        self.rate = float(rate)
+        self.min_rate = min(float(min_rate), self.max_rate)
+        self.capacity = float(capacity)
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self):
+        """Blok sampai ada token"""
+        while True:
+            with self._lock:
+                self._refill(time.monotonic())
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait_s = (1 - self.tokens) / self.rate
+            time.sleep(wait_s)
+
+    def on_throttle(self):
+        with self._lock:
+            self.rate = max(self.min_rate, self.rate / 2)
+            self.tokens = min(self.tokens, 0.0)
+
+    def on_success(self):
+        with self._lock:
+            if self.rate < self.max_rate:
+                self.rate = min(self.max_rate, self.rate + RECOVERY_STEP)
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(key, rate=DEFAULT_RATE, capacity=DEFAULT_BURST):
+    """Limiter bersama per key (mis. shop_id), dibuat sekali per proses"""
+    with _limiters_lock:
+        limiter = _limiters.get(key)
+        if limiter is None:
+            limiter = _limiters[key] = TokenBucket(rate, capacity)
+        return limiter
+
+
+def configure_limiter(key, rate=DEFAULT_RATE, capacity=DEFAULT_BURST):
+    """Pasang limiter baru untuk key (mis. rate khusus per shop)"""
+    with _limiters_lock:
+        limiter = _limiters[key] = TokenBucket(rate, capacity)
+        return limiter
+
+
+def backoff_delay(attempt, base=BACKOFF_BASE, cap=BACKOFF_CAP):
+    """Exponential backoff dengan full jitter (attempt mulai dari 0)"""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
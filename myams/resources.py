@@ -0,0 +1,35 @@
+"""Resource bersama per proses: HTTP session (connection pool) & client Supabase."""
+
+import functools
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+POOL_CONNECTIONS = 4     # jumlah host yang di-pool (Shopee, Supabase, ...)
+POOL_MAXSIZE = 16        # koneksi keep-alive per host, >= total request paralel
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_http_session():
+    """requests.Session bersama dengan keep-alive, dipakai semua thread fetch"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            # Retry ditangani shopee.call, adapter cukup pooling saja
+            adapter = HTTPAdapter(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE,
+                                  max_retries=0, pool_block=True)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _session = session
+        return _session
+
+
+@functools.lru_cache(maxsize=None)
+def get_supabase(url, key):
+    """Client Supabase per (url, key), dibuat sekali per proses"""
+    from supabase import create_client
+    return create_client(url, key)
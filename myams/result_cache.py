@@ -0,0 +1,127 @@
+"""Cache hasil tarikan per (shop, start, end) dengan batas memori (LRU).
+
+Dipegang per sesi UI supaya rerun (klik simpan, buka expander, ganti filter)
+memakai order & DataFrame yang sama tanpa tarik ulang dari API. Hasil export
+(xlsx/parquet/...) ikut di-cache per entri dan dihitung hanya saat diminta.
+"""
+
+import json
+import threading
+from collections import OrderedDict
+
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+DERIVED_LIMIT = 32
+ORDER_SAMPLE = 50
+# Order sebagai dict Python jauh lebih gemuk dari JSON-nya
+PY_OVERHEAD = 3
+
+
+def estimate_orders_bytes(orders):
+    """Perkiraan memori list order dari ukuran JSON sampel (bukan deep-size yang mahal)"""
+    if not orders:
+        return 0
+    step = max(len(orders) // ORDER_SAMPLE, 1)
+    sample = orders[::step][:ORDER_SAMPLE]
+    avg = sum(len(json.dumps(o, default=str)) for o in sample) / len(sample)
+    return int(avg * len(orders) * PY_OVERHEAD)
+
+
+def estimate_frame_bytes(df):
+    return int(df.memory_usage(deep=True).sum()) if df is not None else 0
+
+
+class ResultEntry:
+    """Satu hasil tarikan: order mentah, DataFrame laporan, error window, export ter-cache"""
+
+    def __init__(self, orders, df, errors=(), meta=None):
+        self.orders = orders
+        self.df = df
+        self.errors = list(errors)
+        self.meta = dict(meta or {})
+        self.exports = {}
+        # Turunan kecil (mask filter, ringkasan, index order), LRU per entri
+        self.derived = OrderedDict()
+        # Ukuran dihitung sekali (deep memory_usage mahal untuk frame besar)
+        self._orders_bytes = estimate_orders_bytes(orders)
+        self._frame_bytes = estimate_frame_bytes(df)
+
+    @property
+    def nbytes(self):
+        return self._orders_bytes + self._frame_bytes + sum(len(b) for b in self.exports.values())
+
+    def export(self, fmt, build):
+        """Bytes export fmt; build() hanya dipanggil sekali per entri"""
+        if fmt not in self.exports:
+            self.exports[fmt] = build()
+        return self.exports[fmt]
+
+    def derive(self, key, build):
+        """Hasil turunan yang di-cache per entri (build() hanya saat belum ada)"""
+        if key in self.derived:
+            self.derived.move_to_end(key)
+            return self.derived[key]
+        value = self.derived[key] = build()
+        while len(self.derived) > DERIVED_LIMIT:
+            self.derived.popitem(last=False)
+        return value
+
+    def replace_frame(self, df):
+        # DataFrame berubah (mis. faktor pengeluaran) → export lama tidak berlaku
+        self.df = df
+        self._frame_bytes = estimate_frame_bytes(df)
+        self.exports.clear()
+        self.derived.clear()
+
+
+class ResultCache:
+    """LRU dengan batas total byte; entri terbaru tidak pernah di-evict"""
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            self._evict()
+        return entry
+
+    def trim(self):
+        """Evict ulang setelah entri membesar (mis. export baru di-cache)"""
+        with self._lock:
+            self._evict()
+
+    def _evict(self):
+        total = sum(e.nbytes for e in self._entries.values())
+        while total > self.max_bytes and len(self._entries) > 1:
+            _, old = self._entries.popitem(last=False)
+            total -= old.nbytes
+
+    def discard(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def keys(self):
+        with self._lock:
+            return list(self._entries)
+
+    @property
+    def nbytes(self):
+        with self._lock:
+            return sum(e.nbytes for e in self._entries.values())
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+
+    def __len__(self):
+        return len(self._entries)
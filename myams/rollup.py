@@ -0,0 +1,253 @@
+"""Rollup harian per shop × affiliate × produk × status untuk tren & total periode panjang.
+
+Setiap pull mengganti baris rollup untuk hari-hari di periodenya (kecuali hari
+di window yang gagal), jadi tabel tetap konsisten dengan data terbaru tanpa
+menarik ulang order mentah. Dashboard membaca tabel kecil ini, bukan laporan penuh.
+
+Catatan: `orders` = order unik di dalam satu grup; satu order dengan beberapa
+produk terhitung di tiap grup produknya, jadi kolom ini tidak aditif antar produk.
+Pengeluaran disimpan dengan faktor pengeluaran saat rollup dibuat.
+
+Tabel Supabase yang dipakai SupabaseRollupStore:
+
+    create table shopee_daily_rollup (
+        shop_id bigint not null,
+        day date not null,
+        affiliate_username text not null,
+        affiliate_name text,
+        item_id text not null,
+        item_name text,
+        order_status text not null,
+        items integer,
+        qty integer,
+        orders integer,
+        purchase numeric,
+        commission numeric,
+        commission_affiliate numeric,
+        commission_mcn numeric,
+        pengeluaran numeric,
+        primary key (shop_id, day, affiliate_username, item_id, order_status)
+    );
+"""
+
+import os
+import sqlite3
+import threading
+from datetime import datetime as dt, timedelta
+
+import pandas as pd
+
+from . import periods
+
+ROLLUP_TABLE = "shopee_daily_rollup"
+DEFAULT_LOCAL_PATH = os.path.join(".myams", "rollup.db")
+SUPABASE_PAGE_SIZE = 1000
+INSERT_CHUNK_SIZE = 500
+
+KEY_COLUMNS = ["day", "affiliate_username", "item_id", "order_status"]
+ROLLUP_COLUMNS = [
+    "day", "affiliate_username", "affiliate_name", "item_id", "item_name", "order_status",
+    "items", "qty", "orders", "purchase", "commission", "commission_affiliate", "commission_mcn", "pengeluaran"
+]
+MEASURES = ["items", "qty", "orders", "purchase", "commission", "commission_affiliate", "commission_mcn", "pengeluaran"]
+
+# Kolom laporan → kolom rollup
+SOURCE_COLUMNS = {
+    "Username Affiliate": "affiliate_username",
+    "Nama Affiliate": "affiliate_name",
+    "Kode Produk": "item_id",
+    "Nama Produk": "item_name",
+    "Status Pesanan": "order_status",
+    "Kode Pesanan": "order_sn",
+    "Jumlah": "qty",
+    "Nilai Pembelian(Rp)": "purchase",
+    "Estimasi Komisi per Produk(Rp)": "commission",
+    "Estimasi Komisi Affiliate per Produk(Rp)": "commission_affiliate",
+    "Estimasi Komisi MCN per Produk(Rp)": "commission_mcn",
+    "Pengeluaran(Rp)": "pengeluaran",
+}
+
+
+# ===============================
+# AGREGASI
+# ===============================
+def _text(s):
+    return s.astype("string").fillna("")
+
+def aggregate(df):
+    """Laporan (flatten_orders) → baris rollup harian, satu baris per kunci KEY_COLUMNS"""
+    if not len(df):
+        return pd.DataFrame(columns=ROLLUP_COLUMNS)
+    frame = df[list(SOURCE_COLUMNS)].rename(columns=SOURCE_COLUMNS)
+    frame["day"] = df["Waktu Pesanan"].dt.strftime("%Y-%m-%d")
+    frame = frame[frame["day"].notna()]
+    for col in ("affiliate_username", "affiliate_name", "item_id", "item_name", "order_status"):
+        frame[col] = _text(frame[col])
+    frame["qty"] = pd.to_numeric(frame["qty"], errors="coerce").fillna(0)
+
+    grouped = frame.groupby(KEY_COLUMNS, sort=False, observed=True)
+    out = grouped[["qty", "purchase", "commission", "commission_affiliate", "commission_mcn", "pengeluaran"]].sum()
+    out["items"] = grouped.size()
+    out["orders"] = grouped["order_sn"].nunique()
+    out["affiliate_name"] = grouped["affiliate_name"].first()
+    out["item_name"] = grouped["item_name"].first()
+    out = out.reset_index()
+    out[["items", "qty", "orders"]] = out[["items", "qty", "orders"]].astype("int64")
+    return out[ROLLUP_COLUMNS]
+
+
+def combine(partials):
+    """Gabung beberapa hasil aggregate() (mis. per chunk streaming) jadi satu.
+
+    orders ikut dijumlahkan: benar selama satu order tidak terbelah antar bagian.
+    """
+    partials = [p for p in partials if len(p)]
+    if not partials:
+        return pd.DataFrame(columns=ROLLUP_COLUMNS)
+    if len(partials) == 1:
+        return partials[0]
+    frame = pd.concat(partials, ignore_index=True)
+    grouped = frame.groupby(KEY_COLUMNS, sort=False)
+    out = grouped[MEASURES].sum()
+    out["affiliate_name"] = grouped["affiliate_name"].first()
+    out["item_name"] = grouped["item_name"].first()
+    return out.reset_index()[ROLLUP_COLUMNS]
+
+
+def affected_days(start_date, end_date, errors=()):
+    """Hari yang boleh diganti: seluruh periode kecuali hari di window yang gagal"""
+    failed = set()
+    for err in errors:
+        day = dt.fromtimestamp(err.window[0], periods.WIB).date()
+        last = dt.fromtimestamp(err.window[1], periods.WIB).date()
+        while day <= last:
+            failed.add(day)
+            day += timedelta(days=1)
+    days, day = [], start_date
+    while day <= end_date:
+        if day not in failed:
+            days.append(day.isoformat())
+        day += timedelta(days=1)
+    return days
+
+
+def update_rollup(store, shop_id, df, start_date, end_date, errors=(), rows=None):
+    """Ganti rollup shop untuk hari-hari periode dengan agregat dari laporan, return jumlah baris.
+
+    rows: hasil aggregate()/combine() yang sudah ada (pipeline streaming), df diabaikan.
+    """
+    days = affected_days(start_date, end_date, errors)
+    if not days:
+        return 0
+    if rows is None:
+        rows = aggregate(df)
+    rows = rows[rows["day"].isin(days)]
+    store.replace_days(shop_id, days, rows)
+    return len(rows)
+
+
+def daily_totals(rows):
+    """Total per hari dari baris rollup (untuk grafik tren)"""
+    if not len(rows):
+        return pd.DataFrame(columns=["day"] + MEASURES)
+    out = rows.groupby("day", sort=True)[MEASURES].sum().reset_index()
+    out["day"] = pd.to_datetime(out["day"])
+    return out
+
+
+def top(rows, by, n=10, measure="purchase"):
+    """Grup teratas (mis. affiliate_name / item_name) menurut measure"""
+    if not len(rows):
+        return pd.DataFrame(columns=[by] + MEASURES)
+    return rows.groupby(by, sort=False)[MEASURES].sum().nlargest(n, measure).reset_index()
+
+
+# ===============================
+# LOCAL (SQLITE)
+# ===============================
+class LocalRollupStore:
+    """Stand-in lokal berbasis SQLite"""
+
+    def __init__(self, path=DEFAULT_LOCAL_PATH):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute(f"""
+                create table if not exists {ROLLUP_TABLE} (
+                    shop_id integer not null,
+                    day text not null,
+                    affiliate_username text not null,
+                    affiliate_name text,
+                    item_id text not null,
+                    item_name text,
+                    order_status text not null,
+                    items integer,
+                    qty integer,
+                    orders integer,
+                    purchase real,
+                    commission real,
+                    commission_affiliate real,
+                    commission_mcn real,
+                    pengeluaran real,
+                    primary key (shop_id, day, affiliate_username, item_id, order_status)
+                )""")
+
+    def replace_days(self, shop_id, days, rows):
+        # astype(object) → nilai Python biasa (sqlite3 tidak menerima numpy int64)
+        records = rows[ROLLUP_COLUMNS].astype(object).itertuples(index=False, name=None)
+        values = [(int(shop_id), *r) for r in records]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                f"delete from {ROLLUP_TABLE} where shop_id = ? and day = ?", [(int(shop_id), d) for d in days]
+            )
+            self._conn.executemany(
+                f"insert into {ROLLUP_TABLE} (shop_id, {', '.join(ROLLUP_COLUMNS)}) "
+                f"values ({', '.join('?' for _ in range(len(ROLLUP_COLUMNS) + 1))})",
+                values,
+            )
+
+    def load(self, shop_id, start_date, end_date):
+        with self._lock:
+            cur = self._conn.execute(
+                f"select {', '.join(ROLLUP_COLUMNS)} from {ROLLUP_TABLE} "
+                "where shop_id = ? and day between ? and ? order by day",
+                (int(shop_id), str(start_date), str(end_date)),
+            )
+            return pd.DataFrame(cur.fetchall(), columns=ROLLUP_COLUMNS)
+
+
+# ===============================
+# SUPABASE
+# ===============================
+class SupabaseRollupStore:
+    """Rollup di tabel shopee_daily_rollup (lihat docstring modul)"""
+
+    def __init__(self, client):
+        self.client = client
+
+    def replace_days(self, shop_id, days, rows):
+        for i in range(0, len(days), INSERT_CHUNK_SIZE):
+            self.client.table(ROLLUP_TABLE).delete().eq("shop_id", int(shop_id)).in_(
+                "day", days[i:i + INSERT_CHUNK_SIZE]
+            ).execute()
+        records = [dict(r, shop_id=int(shop_id)) for r in rows[ROLLUP_COLUMNS].to_dict("records")]
+        for i in range(0, len(records), INSERT_CHUNK_SIZE):
+            self.client.table(ROLLUP_TABLE).insert(records[i:i + INSERT_CHUNK_SIZE]).execute()
+
+    def load(self, shop_id, start_date, end_date):
+        records, offset = [], 0
+        while True:
+            res = (
+                self.client.table(ROLLUP_TABLE).select(",".join(ROLLUP_COLUMNS))
+                .eq("shop_id", int(shop_id)).gte("day", str(start_date)).lte("day", str(end_date))
+                .order("day").range(offset, offset + SUPABASE_PAGE_SIZE - 1)
+                .execute()
+            )
+            data = res.data or []
+            records.extend(data)
+            if len(data) < SUPABASE_PAGE_SIZE:
+                return pd.DataFrame(records, columns=ROLLUP_COLUMNS)
+            offset += SUPABASE_PAGE_SIZE
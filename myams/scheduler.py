@@ -0,0 +1,116 @@
+"""Scheduler multi-shop: satu pool bersama dengan batas total request, adil antar shop.
+
+Window tiap shop antre di queue masing-masing; dispatcher mengambil round-robin
+antar shop dan membatasi window yang jalan per shop, jadi shop besar tidak
+menghabiskan slot shop lain. Pacing per shop tetap lewat token bucket per shop_id.
+"""
+
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+from . import dedup, fetcher, ratelimit
+from .progress import FetchProgress
+
+DEFAULT_TOTAL_WORKERS = 8
+DEFAULT_PER_SHOP_WORKERS = 2
+
+
+def fetch_shops(jobs, max_workers=DEFAULT_TOTAL_WORKERS, per_shop_workers=DEFAULT_PER_SHOP_WORKERS,
+                per_shop_rate=None, page_size=fetcher.DEFAULT_PAGE_SIZE, on_progress=None,
+                poll_interval=0.25, progress=None, reconcile_rounds=fetcher.DEFAULT_RECONCILE_ROUNDS):
+    """Tarik window beberapa shop sekaligus.
+
+    jobs: list dict {"shop_name", "shop_id", "access_token", "windows"}; access_token boleh
+    string atau tokens.ShopToken (refresh otomatis).
+    Return dict shop_name → (orders, errors), orders urut per window & di-dedup seperti
+    fetch_windows; window yang order uniknya < total_count ikut antre ulang di pool bersama.
+    on_progress(stats) dipanggil dari thread pemanggil; stats = FetchProgress.snapshot()
+    gabungan, dengan stats["shops"][shop_name] per shop.
+    """
+    if per_shop_rate:
+        for job in jobs:
+            ratelimit.configure_limiter(job["shop_id"], rate=per_shop_rate)
+
+    progress = progress or FetchProgress()
+    queues, in_flight, results, totals, errors, indexes, shop_progress = {}, {}, {}, {}, {}, {}, {}
+    for job in jobs:
+        name = job["shop_name"]
+        queues[name] = deque(job["windows"])
+        in_flight[name] = 0
+        results[name] = {}
+        totals[name] = {}
+        errors[name] = []
+        indexes[name] = dedup.OrderIndex(job["windows"])
+        shop_progress[name] = progress.child(name, len(job["windows"]))
+    by_name = {job["shop_name"]: job for job in jobs}
+    names = list(queues)
+    futures = {}
+    cursor = 0
+    settled = set()
+
+    def dispatch(pool):
+        # Round-robin: isi slot kosong, maksimal per_shop_workers window per shop
+        nonlocal cursor
+        while len(futures) < max_workers:
+            for step in range(len(names)):
+                name = names[(cursor + step) % len(names)]
+                if queues[name] and in_flight[name] < per_shop_workers:
+                    ws, we = window = queues[name].popleft()
+                    job = by_name[name]
+                    stats = {}
+                    fut = pool.submit(fetcher.fetch_window, job["shop_id"], job["access_token"], ws, we,
+                                      page_size, shop_progress[name], stats)
+                    futures[fut] = (name, window, stats)
+                    in_flight[name] += 1
+                    cursor = (cursor + step + 1) % len(names)
+                    break
+            else:
+                return
+
+    def reconcile(first, final):
+        # Masukkan hasil putaran ini ke index (urut window), antre ulang window yang tidak cocok
+        queued = False
+        for name in names:
+            for window in by_name[name]["windows"]:
+                if window in results[name]:
+                    merged = indexes[name].add(results[name].pop(window), window)
+                    if first:
+                        shop_progress[name].duplicates_merged(merged)
+            failed = {e.window for e in errors[name]}
+            stale = dedup.stale_windows(indexes[name], totals[name], failed)
+            if (final or not stale) and name not in settled:
+                settled.add(name)
+                dedup.log_overshoot(dedup.overshoot_windows(indexes[name], totals[name], failed),
+                                    indexes[name].count, totals[name], by_name[name]["shop_id"])
+            if stale and final:
+                errors[name].extend(fetcher.mismatch_error(w, indexes[name].count(w), totals[name][w])
+                                    for w in stale)
+            elif stale:
+                shop_progress[name].windows_refetched(len(stale))
+                queues[name].extend(stale)
+                queued = True
+        return queued
+
+    if names:
+        with ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="ams-shops") as pool:
+            for round_no in range(reconcile_rounds + 1):
+                dispatch(pool)
+                while futures:
+                    done, _ = wait(futures, timeout=poll_interval, return_when=FIRST_COMPLETED)
+                    for fut in done:
+                        name, window, stats = futures.pop(fut)
+                        in_flight[name] -= 1
+                        try:
+                            results[name][window] = fut.result()
+                        except fetcher.WindowFetchError as e:
+                            results[name][window] = e.orders
+                            errors[name].append(e)
+                        totals[name][window] = stats.get("total_count")
+                        shop_progress[name].window_done(window)
+                    dispatch(pool)
+                    if on_progress:
+                        on_progress(progress.snapshot())
+                if not reconcile(first=round_no == 0, final=round_no == reconcile_rounds):
+                    break
+
+    return {name: (indexes[name].orders(), sorted(errors[name], key=lambda e: e.window)) for name in names}
@@ -0,0 +1,130 @@
+"""Helper signature & request ke Shopee Open Platform (API v2)."""
+
+import hmac
+import hashlib
+import time
+
+import requests
+
+from . import ratelimit, resources
+
+BASE_URL = "https://partner.shopeemobile.com"
+REQUEST_TIMEOUT = 30
+MAX_RETRIES = 4
+
+# Error Shopee yang layak di-retry (server sibuk / gangguan sementara)
+TRANSIENT_ERRORS = {"error_server", "error_inner", "error_busy", "error_network", "error_system", "error_unknown"}
+# Error karena access token invalid / expired → perlu refresh token, bukan retry biasa
+AUTH_ERRORS = {"error_auth", "invalid_access_token", "invalid_acceess_token", "error_token"}
+NETWORK_ERRORS = (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError)
+
+# Diisi lewat configure() saat app / worker start
+PARTNER_ID = ""
+PARTNER_KEY = ""
+
+
+def configure(partner_id, partner_key, base_url=None):
+    """Set kredensial partner (dipanggil sekali saat start)"""
+    global PARTNER_ID, PARTNER_KEY, BASE_URL
+    PARTNER_ID = str(partner_id or "")
+    PARTNER_KEY = partner_key or ""
+    if base_url:
+        BASE_URL = base_url.rstrip("/")
+
+
+class ShopeeAPIError(Exception):
+    """Response Shopee dengan field `error` terisi"""
+
+    def __init__(self, error, message="", response=None):
+        self.error = error
+        self.message = message or error
+        self.response = response or {}
+        super().__init__(f"{error}: {self.message}")
+
+
+# ===============================
+# SIGNATURE HELPERS
+# ===============================
+def generate_sign_basic(path, timestamp):
+    base = f"{PARTNER_ID}{path}{timestamp}"
+    return hmac.new(PARTNER_KEY.encode(), base.encode(), hashlib.sha256).hexdigest()
+
+def generate_sign_full(path, timestamp, access_token, shop_id):
+    base = f"{PARTNER_ID}{path}{timestamp}{access_token}{shop_id}"
+    return hmac.new(PARTNER_KEY.encode(), base.encode(), hashlib.sha256).hexdigest()
+
+
+# ===============================
+# REQUEST
+# ===============================
+def is_throttled(err):
+    """True kalau error berarti kena rate limit"""
+    text = f"{err.error} {err.message}".lower()
+    return err.error == "http_429" or "too_many" in text or "too many" in text or "rate limit" in text
+
+def is_auth_error(err):
+    """True kalau error berarti access token invalid / expired"""
+    text = f"{err.error} {err.message}".lower()
+    return err.error in AUTH_ERRORS or ("access_token" in text and ("invalid" in text or "expire" in text))
+
+def is_transient(err):
+    return err.error in TRANSIENT_ERRORS or err.error.startswith("http_5") or is_throttled(err)
+
+def _send(method, path, params, json, access_token, shop_id, timeout):
+    ts = int(time.time())
+    query = {"partner_id": PARTNER_ID, "timestamp": ts}
+    if access_token:
+        query["access_token"] = access_token
+        query["shop_id"] = int(shop_id)
+        query["sign"] = generate_sign_full(path, ts, access_token, shop_id)
+    else:
+        query["sign"] = generate_sign_basic(path, ts)
+    query.update(params or {})
+
+    http = resources.get_http_session().request(method, BASE_URL + path, params=query, json=json, timeout=timeout)
+    try:
+        resp = http.json()
+    except ValueError:
+        resp = {}
+    if not isinstance(resp, dict):
+        resp = {}
+    # Status HTTP gagal tanpa field error (mis. halaman HTML 403/404 dari gateway) → error, bukan page kosong;
+    # yang di-retry tetap hanya 429 / 5xx (is_transient)
+    if http.status_code >= 400 and not resp.get("error"):
+        resp["error"] = f"http_{http.status_code}"
+        resp.setdefault("message", http.reason or "")
+    return resp
+
+def call(method, path, params=None, json=None, access_token=None, shop_id=None,
+         timeout=REQUEST_TIMEOUT, retries=MAX_RETRIES, limiter=None, on_retry=None):
+    """Panggil endpoint Shopee dengan signature otomatis, return JSON response.
+
+    Tanpa access_token → signature basic (endpoint auth), selain itu signature
+    full level shop. Request dijatah lewat token bucket per shop; network error,
+    throttle dan error server di-retry dengan backoff (signature dibuat ulang
+    tiap percobaan). Raise ShopeeAPIError kalau response berisi `error`.
+    """
+    limiter = limiter or ratelimit.get_limiter(shop_id or "partner")
+    attempt = 0
+    while True:
+        limiter.acquire()
+        try:
+            resp = _send(method, path, params, json, access_token, shop_id, timeout)
+        except NETWORK_ERRORS as e:
+            failure = e
+        else:
+            if not resp.get("error"):
+                limiter.on_success()
+                return resp
+            failure = ShopeeAPIError(resp["error"], resp.get("message", ""), resp)
+            if not is_transient(failure):
+                raise failure
+            if is_throttled(failure):
+                limiter.on_throttle()
+
+        if attempt >= retries:
+            raise failure
+        if on_retry:
+            on_retry(attempt + 1, failure)
+        time.sleep(ratelimit.backoff_delay(attempt))
+        attempt += 1
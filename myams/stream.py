@@ -0,0 +1,198 @@
+"""Pipeline streaming: page API → chunk kolom → writer inkremental, memori terbatas.
+
+Jalur biasa menyimpan order mentah, DataFrame laporan, dan bytes export
+sekaligus; di sini tiap chunk page langsung di-flatten, ditulis ke semua
+writer (export.*ChunkWriter), lalu dibuang. Memori puncak ~ order satu window
++ prefetch page per window aktif + satu chunk, tidak bergantung pada panjang
+periode.
+"""
+
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from . import commission, dedup, explore, fetcher, flatten, rollup
+from .progress import FetchProgress
+
+DEFAULT_CHUNK_ORDERS = 2000
+# Page yang boleh antre per window yang sedang ditarik
+DEFAULT_PREFETCH_PAGES = 4
+PUT_TIMEOUT = 0.1
+
+_WINDOW_DONE = object()
+
+
+class PageStream:
+    """Iterable page (list order) urut window, ditarik paralel dengan antrean terbatas.
+
+    Paling banyak max_workers window ditarik sekaligus; tiap window punya
+    antrean maks prefetch page, jadi producer berhenti menunggu kalau konsumen
+    (flatten/export) lebih lambat. Window gagal dicatat di `errors`
+    (WindowFetchError), page yang sempat ditarik tetap di-yield.
+
+    Page satu window ditahan di dedup.OrderIndex sampai window selesai (termasuk
+    tarik ulang kalau order uniknya < total_count), jadi duplikat di dalam
+    window digabung dengan status terakhir seperti jalur biasa; setelah itu
+    order window di-yield per page_size. Order yang muncul lagi di window lain
+    setelah window asalnya ditulis tidak bisa diperbarui: salinan pertama
+    dipakai dan jumlahnya dicatat di `skipped`. Kelebihan (> total_count)
+    hanya dicatat di log.
+    """
+
+    def __init__(self, shop_id, access_token, windows, max_workers=fetcher.DEFAULT_MAX_WORKERS,
+                 page_size=fetcher.DEFAULT_PAGE_SIZE, prefetch=DEFAULT_PREFETCH_PAGES, progress=None,
+                 reconcile_rounds=fetcher.DEFAULT_RECONCILE_ROUNDS):
+        self.shop_id = shop_id
+        self.access_token = access_token
+        self.windows = list(windows)
+        self.max_workers = max(1, int(max_workers))
+        self.page_size = page_size
+        self.prefetch = max(1, int(prefetch))
+        self.progress = progress or FetchProgress()
+        self.reconcile_rounds = reconcile_rounds
+        self.errors = []
+        # Duplikat lintas window yang tidak digabung (window asalnya sudah ditulis)
+        self.skipped = 0
+        # order_sn yang sudah di-yield (hanya kunci, order mentahnya tidak ditahan)
+        self._seen = set()
+
+    def _produce(self, window, out, stop):
+        def put(item):
+            while not stop.is_set():
+                try:
+                    out.put(item, timeout=PUT_TIMEOUT)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        error, stats = None, {}
+        try:
+            for page in fetcher.iter_window(self.shop_id, self.access_token, window[0], window[1],
+                                            self.page_size, self.progress, stats):
+                if not put(page):
+                    return
+        except fetcher.WindowFetchError as e:
+            error = e
+        except Exception as e:
+            # Jangan biarkan konsumen menunggu selamanya di antrean window ini
+            error = fetcher.WindowFetchError(window, e)
+        put((_WINDOW_DONE, error, stats))
+
+    def __iter__(self):
+        self.progress.add_windows(len(self.windows))
+        if not self.windows:
+            return
+        stop = threading.Event()
+        queues = [queue.Queue(maxsize=self.prefetch) for _ in self.windows]
+        workers = min(self.max_workers, len(self.windows))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ams-stream") as pool:
+            submitted = 0
+            try:
+                for i, window in enumerate(self.windows):
+                    while submitted < len(self.windows) and submitted < i + workers:
+                        pool.submit(self._produce, self.windows[submitted], queues[submitted], stop)
+                        submitted += 1
+                    index = dedup.OrderIndex([window])
+                    while True:
+                        item = queues[i].get()
+                        if isinstance(item, tuple) and item[0] is _WINDOW_DONE:
+                            _, error, stats = item
+                            self.progress.window_done(window)
+                            total, count = stats.get("total_count"), index.count(window)
+                            if error is not None:
+                                self.errors.append(error)
+                            elif total is not None and count < total:
+                                self._reconcile(window, index, total)
+                            elif total is not None and count > total:
+                                dedup.log_overshoot([window], index.count, {window: total}, self.shop_id)
+                            break
+                        self._add(index, window, item)
+                    yield from self._emit(index)
+            finally:
+                # Konsumen berhenti lebih awal → producer keluar dari put() yang menunggu
+                stop.set()
+
+    def _add(self, index, window, page, count_duplicates=True):
+        # Gabung page ke index window; order yang window asalnya sudah ditulis dilewati
+        fresh = [o for o in page if o.get("order_sn") is None or o.get("order_sn") not in self._seen]
+        skipped = len(page) - len(fresh)
+        self.skipped += skipped
+        merged = index.add(fresh, window)
+        if count_duplicates and merged + skipped:
+            self.progress.duplicates_merged(merged + skipped)
+
+    def _emit(self, index):
+        # Order window yang sudah final → page berukuran page_size, kuncinya diingat untuk window berikutnya
+        orders = index.orders()
+        self._seen.update(o["order_sn"] for o in orders if o.get("order_sn") is not None)
+        for start in range(0, len(orders), self.page_size):
+            yield orders[start:start + self.page_size]
+
+    def _reconcile(self, window, index, total):
+        # Tarik ulang window (sequential, jarang terjadi); salinan baru digabung ke index
+        for _ in range(self.reconcile_rounds):
+            self.progress.windows_refetched(1)
+            stats = {}
+            try:
+                for page in fetcher.iter_window(self.shop_id, self.access_token, window[0], window[1],
+                                                self.page_size, self.progress, stats):
+                    self._add(index, window, page, count_duplicates=False)
+            except fetcher.WindowFetchError as e:
+                self.progress.window_done(window)
+                self.errors.append(e)
+                return
+            self.progress.window_done(window)
+            total = stats.get("total_count", total)
+            if index.count(window) >= total:
+                return
+        self.errors.append(fetcher.mismatch_error(window, index.count(window), total))
+
+
+def iter_chunks(pages, chunk_orders=DEFAULT_CHUNK_ORDERS):
+    """Gabungkan page jadi chunk berisi ±chunk_orders order (batas per page)"""
+    chunk = []
+    for page in pages:
+        chunk.extend(page)
+        if len(chunk) >= chunk_orders:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def stream_report(pages, writers=(), pengeluaran_multiplier=commission.PENGELUARAN_MULTIPLIER,
+                  chunk_orders=DEFAULT_CHUNK_ORDERS, with_rollup=False, on_chunk=None):
+    """Flatten page per chunk dan tulis ke semua writer; return ringkasan.
+
+    Ringkasan: orders, items, chunks, total SUM_COLUMNS (explore) dan, kalau
+    with_rollup, baris rollup harian (rollup.combine dari agregat per chunk).
+    on_chunk(summary) dipanggil setelah tiap chunk ditulis.
+    """
+    summary = {"orders": 0, "items": 0, "chunks": 0}
+    summary.update({name: 0.0 for name in explore.SUM_COLUMNS.values()})
+    partials = []
+    for orders in iter_chunks(pages, chunk_orders):
+        df = flatten.flatten_orders(orders, pengeluaran_multiplier=pengeluaran_multiplier)
+        for writer in writers:
+            writer.write(df, orders)
+        summary["orders"] += len(orders)
+        summary["items"] += len(df)
+        summary["chunks"] += 1
+        for col, name in explore.SUM_COLUMNS.items():
+            if len(df):
+                summary[name] += float(df[col].sum())
+        if with_rollup and len(df):
+            partials.append(rollup.aggregate(df))
+        if on_chunk:
+            on_chunk(summary)
+        del orders, df
+
+    if not summary["chunks"]:
+        # Tetap tulis header / file kosong yang valid
+        empty = flatten.flatten_orders([], pengeluaran_multiplier=pengeluaran_multiplier)
+        for writer in writers:
+            writer.write(empty, [])
+    if with_rollup:
+        summary["rollup"] = rollup.combine(partials)
+    return summary
@@ -0,0 +1,114 @@
+"""Sinkronisasi inkremental: hari yang sudah tutup dilayani dari sync store, API hanya untuk delta."""
+
+import time
+
+from . import fetcher
+from .fetcher import DAY_SECONDS
+
+# Order dengan status ini tidak akan berubah lagi → tidak perlu ditarik ulang
+FINAL_ORDER_STATUSES = {"Completed", "Cancelled"}
+FINAL_VERIFIED_STATUSES = {"Valid", "Invalid"}
+
+
+def is_settled(order):
+    return (order.get("order_status") in FINAL_ORDER_STATUSES
+            and order.get("verified_status") in FINAL_VERIFIED_STATUSES)
+
+
+def _day_start(ts, anchor_ts):
+    # Awal hari (relatif ke anchor jam 00:00 WIB) yang memuat ts
+    return anchor_ts + ((int(ts) - anchor_ts) // DAY_SECONDS) * DAY_SECONDS
+
+
+def plan_windows(state, stored_orders, start_ts, end_ts, closed_before_ts,
+                 window_days=fetcher.DEFAULT_WINDOW_DAYS):
+    """Daftar window yang harus ditarik dari API.
+
+    Satu hari ditarik kalau: di luar watermark, masih terbuka (>= closed_before_ts),
+    atau memuat order tersimpan yang statusnya belum final. Hari berurutan
+    digabung jadi window maksimal window_days hari.
+    """
+    low = state["low_water"] if state else None
+    high = state["high_water"] if state else None
+    unsettled_days = {
+        _day_start(o.get("place_order_time") or 0, start_ts)
+        for o in stored_orders if not is_settled(o)
+    }
+
+    windows = []
+    day = int(start_ts)
+    while day <= end_ts:
+        day_end = min(day + DAY_SECONDS - 1, int(end_ts))
+        covered = low is not None and low <= day and day_end <= high
+        if not covered or day >= closed_before_ts or day in unsettled_days:
+            prev = windows[-1] if windows else None
+            if prev and prev[1] + 1 == day and (day_end - prev[0] + 1) <= window_days * DAY_SECONDS:
+                windows[-1] = (prev[0], day_end)
+            else:
+                windows.append((day, day_end))
+        day += DAY_SECONDS
+    return windows
+
+
+def _merge_watermark(state, low, high):
+    # Gabungkan rentang baru dengan watermark lama kalau bersinggungan,
+    # kalau terpisah pakai rentang terbaru saja (store tetap menyimpan order lama)
+    if state and state["low_water"] <= high + 1 and low <= state["high_water"] + 1:
+        return min(low, state["low_water"]), max(high, state["high_water"])
+    return low, high
+
+
+def plan_sync(store, shop_id, start_ts, end_ts, now_ts=None, window_days=fetcher.DEFAULT_WINDOW_DAYS):
+    """Rencana sync satu shop: window yang harus ditarik + state watermark saat ini.
+
+    start_ts harus jam 00:00 WIB (hasil to_ts) supaya batas hari sejajar.
+    """
+    now_ts = int(now_ts or time.time())
+    closed_before = _day_start(now_ts, start_ts) if now_ts >= start_ts else start_ts
+    state = store.get_state(shop_id)
+    stored = store.load_orders(shop_id, start_ts, end_ts)
+    return {
+        "start_ts": int(start_ts),
+        "end_ts": int(end_ts),
+        "closed_before": closed_before,
+        "state": state,
+        "windows": plan_windows(state, stored, start_ts, end_ts, closed_before, window_days),
+    }
+
+
+def apply_sync(store, shop_id, plan, fetched, errors):
+    """Simpan hasil fetch ke store, majukan watermark, return (orders periode, info)"""
+    if fetched:
+        store.upsert_orders(shop_id, fetched)
+
+    # Majukan watermark hanya untuk hari yang sudah tutup dan semua window sukses
+    start_ts, end_ts = plan["start_ts"], plan["end_ts"]
+    closed_end = min(end_ts, plan["closed_before"] - 1)
+    if not errors and closed_end >= start_ts:
+        low, high = _merge_watermark(plan["state"], start_ts, closed_end)
+        store.set_state(shop_id, low, high)
+
+    windows = plan["windows"]
+    info = {
+        "days_total": (end_ts - start_ts) // DAY_SECONDS + 1,
+        "days_fetched": sum((we - ws) // DAY_SECONDS + 1 for ws, we in windows),
+        "windows": windows,
+    }
+    return store.load_orders(shop_id, start_ts, end_ts), info
+
+
+def sync_conversion_orders(store, shop_id, access_token, start_ts, end_ts, now_ts=None,
+                           window_days=fetcher.DEFAULT_WINDOW_DAYS, max_workers=fetcher.DEFAULT_MAX_WORKERS,
+                           on_progress=None, progress=None):
+    """Tarik delta dari API, simpan ke store, lalu return order periode dari store.
+
+    Return (orders, errors, info); info berisi jumlah hari total / yang ditarik dari API.
+    """
+    plan = plan_sync(store, shop_id, start_ts, end_ts, now_ts, window_days)
+    fetched, errors = [], []
+    if plan["windows"]:
+        fetched, errors = fetcher.fetch_windows(shop_id, access_token, plan["windows"],
+                                                max_workers=max_workers, on_progress=on_progress,
+                                                progress=progress)
+    orders, info = apply_sync(store, shop_id, plan, fetched, errors)
+    return orders, errors, info
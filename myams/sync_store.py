@@ -0,0 +1,169 @@
+"""Sync store: order conversion mentah per (shop_id, order_sn) + watermark per shop.
+
+Watermark = rentang [low_water, high_water] (epoch detik) yang sudah ditarik
+lengkap dan harinya sudah tutup. Order di dalam rentang ini boleh dilayani
+dari store; yang statusnya belum final tetap ditarik ulang (lihat sync.py).
+
+Tabel Supabase yang dipakai SupabaseSyncStore:
+
+    create table shopee_conversion_orders (
+        shop_id bigint not null,
+        order_sn text not null,
+        place_order_time bigint not null,
+        order_status text,
+        verified_status text,
+        payload jsonb not null,
+        updated_at timestamptz default now(),
+        primary key (shop_id, order_sn)
+    );
+    create index on shopee_conversion_orders (shop_id, place_order_time);
+
+    create table shopee_sync_state (
+        shop_id bigint primary key,
+        low_water bigint not null,
+        high_water bigint not null,
+        updated_at timestamptz default now()
+    );
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+
+ORDERS_TABLE = "shopee_conversion_orders"
+STATE_TABLE = "shopee_sync_state"
+DEFAULT_LOCAL_PATH = os.path.join(".myams", "sync.db")
+
+SUPABASE_PAGE_SIZE = 1000
+UPSERT_CHUNK_SIZE = 500
+
+
+def _order_row(shop_id, order):
+    return {
+        "shop_id": int(shop_id),
+        "order_sn": str(order.get("order_sn")),
+        "place_order_time": int(order.get("place_order_time") or 0),
+        "order_status": order.get("order_status"),
+        "verified_status": order.get("verified_status"),
+    }
+
+
+# ===============================
+# LOCAL (SQLITE)
+# ===============================
+class LocalSyncStore:
+    """Stand-in lokal berbasis SQLite, satu file untuk semua shop"""
+
+    def __init__(self, path=DEFAULT_LOCAL_PATH):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute(f"""
+                create table if not exists {ORDERS_TABLE} (
+                    shop_id integer not null,
+                    order_sn text not null,
+                    place_order_time integer not null,
+                    order_status text,
+                    verified_status text,
+                    payload text not null,
+                    updated_at integer,
+                    primary key (shop_id, order_sn)
+                )""")
+            self._conn.execute(f"""
+                create index if not exists idx_orders_time
+                on {ORDERS_TABLE} (shop_id, place_order_time)""")
+            self._conn.execute(f"""
+                create table if not exists {STATE_TABLE} (
+                    shop_id integer primary key,
+                    low_water integer not null,
+                    high_water integer not null,
+                    updated_at integer
+                )""")
+
+    def load_orders(self, shop_id, start_ts, end_ts):
+        with self._lock:
+            cur = self._conn.execute(
+                f"select payload from {ORDERS_TABLE} where shop_id = ? and place_order_time between ? and ? "
+                "order by place_order_time, order_sn",
+                (int(shop_id), int(start_ts), int(end_ts)),
+            )
+            return [json.loads(payload) for (payload,) in cur]
+
+    def upsert_orders(self, shop_id, orders):
+        now = int(time.time())
+        rows = []
+        for order in orders:
+            row = _order_row(shop_id, order)
+            rows.append((row["shop_id"], row["order_sn"], row["place_order_time"], row["order_status"],
+                         row["verified_status"], json.dumps(order, separators=(",", ":")), now))
+        with self._lock, self._conn:
+            self._conn.executemany(
+                f"insert or replace into {ORDERS_TABLE} values (?, ?, ?, ?, ?, ?, ?)", rows
+            )
+
+    def get_state(self, shop_id):
+        with self._lock:
+            row = self._conn.execute(
+                f"select low_water, high_water from {STATE_TABLE} where shop_id = ?", (int(shop_id),)
+            ).fetchone()
+        return {"low_water": row[0], "high_water": row[1]} if row else None
+
+    def set_state(self, shop_id, low_water, high_water):
+        with self._lock, self._conn:
+            self._conn.execute(
+                f"insert or replace into {STATE_TABLE} values (?, ?, ?, ?)",
+                (int(shop_id), int(low_water), int(high_water), int(time.time())),
+            )
+
+
+# ===============================
+# SUPABASE
+# ===============================
+class SupabaseSyncStore:
+    """Sync store di Supabase (tabel lihat docstring modul)"""
+
+    def __init__(self, client):
+        self.client = client
+
+    def load_orders(self, shop_id, start_ts, end_ts):
+        orders = []
+        offset = 0
+        while True:
+            res = (
+                self.client.table(ORDERS_TABLE).select("payload")
+                .eq("shop_id", int(shop_id))
+                .gte("place_order_time", int(start_ts))
+                .lte("place_order_time", int(end_ts))
+                .order("place_order_time").order("order_sn")
+                .range(offset, offset + SUPABASE_PAGE_SIZE - 1)
+                .execute()
+            )
+            data = res.data or []
+            orders.extend(r["payload"] for r in data)
+            if len(data) < SUPABASE_PAGE_SIZE:
+                return orders
+            offset += SUPABASE_PAGE_SIZE
+
+    def upsert_orders(self, shop_id, orders):
+        rows = [dict(_order_row(shop_id, o), payload=o, updated_at="now()") for o in orders]
+        for i in range(0, len(rows), UPSERT_CHUNK_SIZE):
+            self.client.table(ORDERS_TABLE).upsert(
+                rows[i:i + UPSERT_CHUNK_SIZE], on_conflict="shop_id,order_sn"
+            ).execute()
+
+    def get_state(self, shop_id):
+        res = self.client.table(STATE_TABLE).select("low_water,high_water").eq("shop_id", int(shop_id)).execute()
+        return res.data[0] if res.data else None
+
+    def set_state(self, shop_id, low_water, high_water):
+        self.client.table(STATE_TABLE).upsert({
+            "shop_id": int(shop_id),
+            "low_water": int(low_water),
+            "high_water": int(high_water),
+            "updated_at": "now()"
+        }).execute()
@@ -0,0 +1,139 @@
+"""Cache access token per shop dengan refresh otomatis sebelum kedaluwarsa.
+
+Access token Shopee berlaku 4 jam. Cache menyimpan token + perkiraan waktu
+expired per shop, me-refresh lewat /api/v2/auth/access_token/get sebelum
+expired (atau saat page kena auth error), lalu menyimpan hasilnya ke DB.
+"""
+
+import threading
+import time
+from datetime import datetime as dt
+
+from . import shopee
+
+REFRESH_PATH = "/api/v2/auth/access_token/get"
+ACCESS_TOKEN_TTL = 4 * 60 * 60     # default expire_in Shopee (detik)
+REFRESH_MARGIN = 10 * 60           # refresh 10 menit sebelum expired
+
+
+def _parse_updated_at(value):
+    # updated_at dari Supabase: ISO 8601 (timestamptz)
+    if not value:
+        return None
+    try:
+        return dt.fromisoformat(str(value).replace("Z", "+00:00")).timestamp()
+    except ValueError:
+        return None
+
+
+class ShopToken:
+    """Sumber access token satu shop untuk fetcher (get / refresh)"""
+
+    def __init__(self, cache, shop_name):
+        self.cache = cache
+        self.shop_name = shop_name
+
+    def get(self):
+        return self.cache.access_token(self.shop_name)
+
+    def refresh(self, stale_token=None):
+        return self.cache.refresh(self.shop_name, stale_token)
+
+
+class TokenCache:
+    """Token per shop di memori proses, refresh proaktif & thread-safe.
+
+    load_token(shop_name) → baris shopee_tokens (atau None),
+    save_token(shop_name, shop_id, access_token, refresh_token) dipanggil setelah refresh.
+    """
+
+    def __init__(self, load_token, save_token, ttl=ACCESS_TOKEN_TTL, margin=REFRESH_MARGIN, clock=time.time):
+        self.load_token = load_token
+        self.save_token = save_token
+        self.ttl = ttl
+        self.margin = margin
+        self.clock = clock
+        self._entries = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def _shop_lock(self, shop_name):
+        with self._lock:
+            return self._locks.setdefault(shop_name, threading.Lock())
+
+    def _load(self, shop_name):
+        row = self.load_token(shop_name)
+        if not row:
+            return None
+        updated = _parse_updated_at(row.get("updated_at"))
+        return {
+            "shop_name": shop_name,
+            "shop_id": row["shop_id"],
+            "access_token": row["access_token"],
+            "refresh_token": row.get("refresh_token"),
+            # Tanpa updated_at waktu expired tidak diketahui → andalkan refresh saat auth error
+            "expires_at": updated + self.ttl if updated else None,
+        }
+
+    def entry(self, shop_name):
+        """Data token shop (dimuat dari DB sekali), None kalau shop belum punya token"""
+        with self._shop_lock(shop_name):
+            if shop_name not in self._entries:
+                loaded = self._load(shop_name)
+                if not loaded:
+                    return None
+                self._entries[shop_name] = loaded
+            return self._entries[shop_name]
+
+    def token(self, shop_name):
+        """Pengganti baris shopee_tokens untuk pipeline: access_token berupa ShopToken"""
+        entry = self.entry(shop_name)
+        if not entry:
+            return None
+        return {"shop_name": shop_name, "shop_id": entry["shop_id"], "access_token": ShopToken(self, shop_name)}
+
+    def access_token(self, shop_name):
+        entry = self.entry(shop_name)
+        if entry is None:
+            raise KeyError(f"Token tidak ditemukan untuk toko {shop_name}")
+        expires_at = entry["expires_at"]
+        if expires_at is not None and self.clock() >= expires_at - self.margin:
+            return self.refresh(shop_name, entry["access_token"])
+        return entry["access_token"]
+
+    def refresh(self, shop_name, stale_token=None):
+        """Refresh token shop; kalau thread lain sudah refresh duluan, pakai hasilnya"""
+        with self._shop_lock(shop_name):
+            entry = self._entries.get(shop_name) or self._load(shop_name)
+            if entry is None:
+                raise KeyError(f"Token tidak ditemukan untuk toko {shop_name}")
+            if stale_token and entry["access_token"] != stale_token:
+                return entry["access_token"]
+
+            try:
+                res = shopee.call("POST", REFRESH_PATH, json={
+                    "refresh_token": entry["refresh_token"],
+                    "shop_id": int(entry["shop_id"]),
+                    "partner_id": int(shopee.PARTNER_ID),
+                })
+            except shopee.ShopeeAPIError:
+                # Proses lain (CLI / pod lain) mungkin sudah refresh → refresh_token lama hangus
+                latest = self._load(shop_name)
+                if latest and latest["access_token"] != entry["access_token"]:
+                    self._entries[shop_name] = latest
+                    return latest["access_token"]
+                raise
+
+            entry = dict(
+                entry,
+                access_token=res["access_token"],
+                refresh_token=res.get("refresh_token", entry["refresh_token"]),
+                expires_at=self.clock() + int(res.get("expire_in") or self.ttl),
+            )
+            self._entries[shop_name] = entry
+            self.save_token(shop_name, entry["shop_id"], entry["access_token"], entry["refresh_token"])
+            return entry["access_token"]
+
+    def invalidate(self, shop_name):
+        with self._shop_lock(shop_name):
+            self._entries.pop(shop_name, None)
@@ -0,0 +1,86 @@
+"""Tes kalkulasi komisi per pesanan & Pengeluaran (myams/commission.py)."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from myams import commission, flatten
+
+
+def test_first_item_mask_marks_first_item_of_each_order():
+    mask = commission.first_item_mask([0, 0, 1, 2, 2, 2])
+    assert mask.tolist() == [True, False, True, True, False, False]
+
+
+def test_first_item_mask_keeps_item_order_for_unsorted_keys():
+    mask = commission.first_item_mask(["b", "a", "b", "a"])
+    assert mask.tolist() == [True, True, False, False]
+
+
+def test_order_totals_broadcasts_sum_to_every_item():
+    totals = commission.order_totals([0, 0, 1], [100.0, 50.0, 20.0])
+    assert totals.tolist() == [150.0, 150.0, 20.0]
+
+
+def test_order_totals_uses_fallback_only_when_item_sum_is_zero():
+    totals = commission.order_totals([0, 0, 1], [0.0, 0.0, 20.0], order_fallback=[300.0, 300.0, 999.0])
+    assert totals.tolist() == [300.0, 300.0, 20.0]
+
+
+def test_order_totals_empty():
+    assert commission.order_totals([], []).tolist() == []
+
+
+def test_allocate_order_commission_goes_to_first_item_only():
+    values = commission.allocate_order_commission([0, 0, 0, 1, 1], [10.0, 20.0, 30.0, 5.0, 5.0])
+    assert values.tolist() == [60.0, 0.0, 0.0, 10.0, 0.0]
+
+
+def test_allocate_order_commission_falls_back_to_order_total():
+    values = commission.allocate_order_commission([0, 0, 1], [0.0, 0.0, 7.0], [250.0, 250.0, 400.0])
+    assert values.tolist() == [250.0, 0.0, 7.0]
+
+
+def test_missing_item_commission_uses_total_brand_commission():
+    # Item tanpa item_brand_commission* → total_brand_commission* level order di item pertama
+    orders = [{
+        "order_sn": "A1",
+        "total_brand_commission": 1200,
+        "total_brand_commission_to_affiliate": 1000,
+        "total_brand_commission_to_mcn": 200,
+        "items": [{"item_id": 1}, {"item_id": 2}],
+    }]
+    df = flatten.flatten_orders(orders)
+    assert df["Estimasi Komisi per Pesanan(Rp)"].tolist() == [1200.0, 0.0]
+    assert df["Estimasi Komisi Affiliate per Pesanan(Rp)"].tolist() == [1000.0, 0.0]
+    assert df["Estimasi Komisi MCN per Pesanan(Rp)"].tolist() == [200.0, 0.0]
+
+
+@pytest.mark.parametrize("aff", [0.0, -5.0, -0.01, 0.01, 0.9, 1.0, 99.99, 1234.5, 1e9 + 0.7])
+def test_compute_pengeluaran_matches_int_of_aff_times_multiplier(aff):
+    # Rumus lama per item: int(aff * 1.11) kalau aff > 0, selain itu 0
+    expected = int(aff * 1.11) if aff > 0 else 0
+    assert commission.compute_pengeluaran([aff]).tolist() == [expected]
+
+
+def test_compute_pengeluaran_vectorized_matches_loop():
+    aff = np.random.default_rng(7).uniform(-100, 100_000, 1000)
+    expected = [int(a * commission.PENGELUARAN_MULTIPLIER) if a > 0 else 0 for a in aff]
+    result = commission.compute_pengeluaran(aff)
+    assert result.dtype == np.int64
+    assert result.tolist() == expected
+
+
+def test_compute_pengeluaran_custom_multiplier():
+    assert commission.compute_pengeluaran([100.0, 0.0, 333.0], multiplier=1.5).tolist() == [150, 0, 499]
+
+
+def test_recompute_pengeluaran_on_existing_frame():
+    df = pd.DataFrame({
+        "Estimasi Komisi Affiliate per Produk(Rp)": [1000.0, 0.0, 50.5],
+        "Pengeluaran(Rp)": [1110, 0, 56],
+    })
+    out = commission.recompute_pengeluaran(df, multiplier=1.2)
+    assert out["Pengeluaran(Rp)"].tolist() == [1200, 0, 60]
+    # Frame asli tidak diubah
+    assert df["Pengeluaran(Rp)"].tolist() == [1110, 0, 56]